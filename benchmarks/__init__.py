@@ -0,0 +1,6 @@
+"""Performance benchmarks.
+
+Run from the repository root with ``src`` on the path, e.g.:
+
+    PYTHONPATH=src python -m benchmarks.hot_paths --size 100k
+"""
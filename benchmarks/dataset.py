@@ -0,0 +1,199 @@
+"""Generate synthetic task databases for benchmarks.
+
+The data is shaped like a real todo list rather than uniform noise:
+- titles and details are drawn from a small vocabulary, so text searches
+  match anything from a handful to a large share of the tasks
+- tag popularity follows a Zipf distribution: a few tags are on a large
+  share of the tasks, most are rare, and a task has 0 to 4 of them
+- 30% of the tasks have no due date; the rest are spread around a fixed
+  reference date, mostly within a few weeks of it
+- 40% of the tasks are completed, and about a quarter have 1 to 3 reminders
+  shortly before their due date
+
+The same size and seed always produce the same database. Rows are written
+with executemany inserts in one transaction, with the FTS, posting log and
+version triggers active, so the generated file is exactly what the app
+would have built.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.dataset --size 100k --out bench.db
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, insert
+
+# Imported for the triggers they install when the tables are created
+import kairix_todo.utils.fts_utils  # noqa: F401
+import kairix_todo.utils.tag_index  # noqa: F401
+import kairix_todo.utils.versioning  # noqa: F401
+from kairix_todo.models import Base, Reminder, Tag, Task, task_tags
+from kairix_todo.utils.storage import apply_storage_profile
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+WORDS = [
+    "report", "meeting", "email", "invoice", "review", "plan", "call", "fix",
+    "budget", "design", "deploy", "draft", "order", "renew", "schedule",
+    "update", "write", "book", "clean", "pay", "prepare", "send", "test",
+    "migrate", "backup", "contract", "dentist", "groceries", "quarterly",
+    "roadmap", "release", "security", "training", "travel", "vendor",
+]  # fmt: skip
+
+DEFAULT_TAGS = 200
+_CHUNK = 10_000
+
+# Fixed reference point so the same seed gives the same dates on any day
+EPOCH = datetime(2025, 1, 1)
+
+
+def parse_size(size: str) -> int:
+    """Turn a size name ("10k", "100k", "1m") or a number into a task count.
+
+    Args:
+        size: Size name or number of tasks
+
+    Returns:
+        Number of tasks
+
+    Raises:
+        ValueError: If the size is neither
+    """
+    if size.lower() in SIZES:
+        return SIZES[size.lower()]
+    try:
+        return int(size)
+    except ValueError:
+        raise ValueError(
+            f"Unknown dataset size '{size}'. Expected a number or one of: "
+            + ", ".join(SIZES)
+        )
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _due_date(rng: random.Random) -> Optional[date]:
+    if rng.random() < 0.3:
+        return None
+    return (EPOCH + timedelta(days=round(rng.gauss(0, 20)))).date()
+
+
+def generate_dataset(
+    engine: Any, tasks: int, tags: int = DEFAULT_TAGS, seed: int = 0
+) -> Dict[str, int]:
+    """Create the schema and fill it with synthetic tasks.
+
+    Args:
+        engine: Engine of an empty database
+        tasks: Number of tasks
+        tags: Number of distinct tags
+        seed: Random seed
+
+    Returns:
+        Number of rows written per table
+    """
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+
+    tag_rows = [{"id": _uuid(rng), "name": f"tag-{n:04d}"} for n in range(tags)]
+    tag_weights = list(accumulate(1 / (rank + 1) for rank in range(tags)))
+    counts = {"tasks": 0, "tags": len(tag_rows), "task_tags": 0, "reminders": 0}
+
+    with engine.begin() as connection:
+        connection.execute(insert(Tag.__table__), tag_rows)
+        for start in range(0, tasks, _CHUNK):
+            task_rows: List[Dict[str, Any]] = []
+            link_rows: List[Dict[str, Any]] = []
+            reminder_rows: List[Dict[str, Any]] = []
+            for _ in range(min(_CHUNK, tasks - start)):
+                task_id = _uuid(rng)
+                due = _due_date(rng)
+                task_rows.append(
+                    {
+                        "id": task_id,
+                        "title": " ".join(rng.sample(WORDS, rng.randint(2, 5))),
+                        "additional_details": (
+                            " ".join(rng.choices(WORDS, k=rng.randint(5, 20)))
+                            if rng.random() < 0.5
+                            else None
+                        ),
+                        "completed": rng.random() < 0.4,
+                        "created_at": EPOCH
+                        - timedelta(seconds=rng.randint(0, 2 * 365 * 86400)),
+                        "due_date": due,
+                    }
+                )
+                chosen = {
+                    tag_rows[i]["id"]
+                    for i in rng.choices(
+                        range(tags),
+                        cum_weights=tag_weights,
+                        k=rng.choice((0, 1, 1, 2, 2, 3, 4)),
+                    )
+                }
+                link_rows.extend({"task_id": task_id, "tag_id": t} for t in chosen)
+                if due is not None and rng.random() < 0.35:
+                    for _ in range(rng.randint(1, 3)):
+                        reminder_rows.append(
+                            {
+                                "id": _uuid(rng),
+                                "task_id": task_id,
+                                "remind_at": datetime.combine(due, datetime.min.time())
+                                - timedelta(hours=rng.randint(1, 72)),
+                                "completed": False,
+                            }
+                        )
+            connection.execute(insert(Task.__table__), task_rows)
+            if link_rows:
+                connection.execute(insert(task_tags), link_rows)
+            if reminder_rows:
+                connection.execute(insert(Reminder.__table__), reminder_rows)
+            counts["tasks"] += len(task_rows)
+            counts["task_tags"] += len(link_rows)
+            counts["reminders"] += len(reminder_rows)
+    return counts
+
+
+def create_dataset(path: str, tasks: int, seed: int = 0) -> Dict[str, int]:
+    """Generate a dataset into a new SQLite file.
+
+    Args:
+        path: Database file to create
+        tasks: Number of tasks
+        seed: Random seed
+
+    Returns:
+        Number of rows written per table
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    apply_storage_profile(engine, "balanced")
+    try:
+        return generate_dataset(engine, tasks, seed=seed)
+    finally:
+        engine.dispose()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m or a number")
+    parser.add_argument("--out", required=True, help="database file to create")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = create_dataset(args.out, parse_size(args.size), args.seed)
+    elapsed = time.perf_counter() - started
+    rows = ", ".join(f"{count} {table}" for table, count in counts.items())
+    print(f"Wrote {rows} to {args.out} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""Measure latency and throughput of the API's hot paths.
+
+A synthetic dataset (see ``benchmarks.dataset``) is generated once per size
+and seed and cached; each run works on a fresh copy of it, so writes made
+by one run never leak into the next. Every operation goes through the app
+built by ``create_app()``, with its writer thread and read-only engine as
+deployed (``--write-mode`` picks another write mode), via Flask's test
+client without any network in between. The search result cache is
+disabled, so searches measure the database and not a dictionary lookup.
+
+Each operation is warmed up, then timed call by call. The results report
+p50/p90/p99/max latency in milliseconds and single-threaded throughput, in
+JSON with ``--json`` or ``--out``. Passing an earlier result as
+``--baseline`` compares p50 latencies and exits with status 1 when any
+operation got slower than ``--tolerance`` allows. ``--ids compact``
+migrates the copy to 16-byte ids first (see ``kairix_todo.utils.ids``).
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.hot_paths [--size 100k]
+        [--iterations 200] [--only get_task,search_text] [--out result.json]
+        [--baseline previous.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import sqlalchemy
+from flask.testing import FlaskClient
+from sqlalchemy import create_engine, select
+
+from benchmarks.dataset import EPOCH, WORDS, create_dataset, parse_size
+from kairix_todo.app import EXTENSION_KEY, create_app
+from kairix_todo.models import Tag, Task
+from kairix_todo.utils.ids import ID_STORAGES, TEXT_IDS, migrate_id_storage
+from kairix_todo.utils.storage import DEFAULT_PROFILE
+from kairix_todo.utils.writer import SERIALIZED_MODE
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), ".data")
+
+# Ids sampled from the dataset for point lookups and updates
+_SAMPLE_IDS = 2000
+
+
+class Bench:
+    """The app under test plus the ids and names operations pick from."""
+
+    def __init__(self, path: str, profile: str, write_mode: str, seed: int):
+        """Build the app on a database file.
+
+        Args:
+            path: Database file
+            profile: Storage profile name
+            write_mode: Write mode name
+            seed: Seed for the operations' random choices
+        """
+        # The app as deployed, with its writer and read engine; only the
+        # search result cache and the background jobs are off
+        self.app = create_app(
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+                "STORAGE_PROFILE": profile,
+                "WRITE_MODE": write_mode,
+                "ARCHIVE_AFTER_DAYS": None,
+                "SLOW_QUERY_MS": None,
+                "SEARCH_CACHE_ENTRIES": 0,
+            }
+        )
+        self.services = self.app.extensions[EXTENSION_KEY]
+        # Datasets generated by older versions get the current indexes here
+        self.services.init_database()
+        self.engine = self.services.engine
+        self.engines = self.services.engines
+        self.registry = self.services.Session
+        self.writer = self.services.writer
+        self.client: FlaskClient = self.app.test_client()
+
+        self.rng = random.Random(seed)
+        self.task_ids = list(
+            self.registry.scalars(select(Task.id).order_by(Task.id).limit(_SAMPLE_IDS))
+        )
+        self.tags = [
+            tuple(row)
+            for row in self.registry.execute(
+                select(Tag.id, Tag.name).order_by(Tag.name)
+            )
+        ]
+        self.registry.remove()
+
+    def close(self) -> None:
+        """Stop the writer and close every connection."""
+        self.services.shutdown()
+        for engine in self.engines:
+            engine.dispose()
+
+
+def _check(response: Any, status: int) -> None:
+    if response.status_code != status:
+        raise RuntimeError(
+            f"Expected {status}, got {response.status_code}: {response.data[:200]!r}"
+        )
+
+
+def _tag_name(bench: Bench) -> str:
+    # Popular tags first, as in the dataset
+    rank = min(int(bench.rng.paretovariate(1.2)) - 1, len(bench.tags) - 1)
+    return bench.tags[rank][1]
+
+
+def op_get_task(bench: Bench) -> None:
+    _check(bench.client.get(f"/tasks/{bench.rng.choice(bench.task_ids)}"), 200)
+
+
+def op_list_tasks(bench: Bench) -> None:
+    _check(bench.client.get("/tasks/?limit=50"), 200)
+
+
+def op_list_tasks_page(bench: Bench) -> None:
+    # A page deep into the list, reached through its cursor
+    response = bench.client.get("/tasks/?limit=50")
+    for _ in range(5):
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = bench.client.get(f"/tasks/?limit=50&cursor={cursor}")
+        _check(response, 200)
+
+
+def op_search_text(bench: Bench) -> None:
+    query = " ".join(bench.rng.sample(WORDS, bench.rng.randint(1, 2)))
+    _check(bench.client.get("/tasks/search", query_string={"q": query}), 200)
+
+
+def op_search_tags(bench: Bench) -> None:
+    tags = {_tag_name(bench) for _ in range(2)}
+    operator = bench.rng.choice(("AND", "OR"))
+    _check(
+        bench.client.get(
+            "/tasks/search",
+            query_string={"tags": ",".join(tags), "tags_operator": operator},
+        ),
+        200,
+    )
+
+
+def op_search_combined(bench: Bench) -> None:
+    _check(
+        bench.client.get(
+            "/tasks/search",
+            query_string={
+                "q": bench.rng.choice(WORDS),
+                "tags": _tag_name(bench),
+                "completed": "false",
+                "from_date": "2024-12-01",
+            },
+        ),
+        200,
+    )
+
+
+def op_search_due(bench: Bench) -> None:
+    # Open tasks due within a two-week window
+    start = EPOCH.date() + timedelta(days=bench.rng.randint(-30, 30))
+    _check(
+        bench.client.get(
+            "/tasks/search",
+            query_string={
+                "completed": "false",
+                "from_date": start.isoformat(),
+                "to_date": (start + timedelta(days=14)).isoformat(),
+            },
+        ),
+        200,
+    )
+
+
+def op_create_task(bench: Bench) -> None:
+    body = {
+        "title": " ".join(bench.rng.sample(WORDS, 3)),
+        "tags": [_tag_name(bench) for _ in range(2)],
+    }
+    _check(bench.client.post("/tasks/", json=body), 201)
+
+
+def op_complete_task(bench: Bench) -> None:
+    task_id = bench.rng.choice(bench.task_ids)
+    _check(bench.client.patch(f"/tasks/{task_id}/complete"), 200)
+
+
+def op_list_tags(bench: Bench) -> None:
+    _check(bench.client.get("/tags/"), 200)
+
+
+def op_get_tag(bench: Bench) -> None:
+    _check(bench.client.get(f"/tags/{bench.rng.choice(bench.tags)[0]}"), 200)
+
+
+def op_create_tag(bench: Bench) -> None:
+    name = f"bench-{bench.rng.getrandbits(64):016x}"
+    _check(bench.client.post("/tags/", json={"name": name}), 201)
+
+
+# Reads first, so that they see the dataset as generated
+OPERATIONS: Dict[str, Callable[[Bench], None]] = {
+    "get_task": op_get_task,
+    "list_tasks": op_list_tasks,
+    "list_tasks_page": op_list_tasks_page,
+    "search_text": op_search_text,
+    "search_tags": op_search_tags,
+    "search_combined": op_search_combined,
+    "search_due": op_search_due,
+    "list_tags": op_list_tags,
+    "get_tag": op_get_tag,
+    "create_task": op_create_task,
+    "complete_task": op_complete_task,
+    "create_tag": op_create_tag,
+}
+
+
+def measure(
+    bench: Bench, operation: Callable[[Bench], None], iterations: int, warmup: int
+) -> Dict[str, float]:
+    """Time an operation call by call.
+
+    Args:
+        bench: App under test
+        operation: Operation to run
+        iterations: Timed calls
+        warmup: Untimed calls made first
+
+    Returns:
+        Latency percentiles in milliseconds and calls per second
+    """
+    for _ in range(warmup):
+        operation(bench)
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        operation(bench)
+        timings.append((time.perf_counter() - call_started) * 1000)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+
+    def percentile(fraction: float) -> float:
+        return timings[min(int(fraction * len(timings)), len(timings) - 1)]
+
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(0.50), 3),
+        "p90_ms": round(percentile(0.90), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "ops_per_sec": round(iterations / elapsed, 1),
+    }
+
+
+def dataset_path(size: int, seed: int, data_dir: str = DATA_DIR) -> str:
+    """Return the cached dataset file for a size and seed, generating it once.
+
+    Args:
+        size: Number of tasks
+        seed: Dataset seed
+        data_dir: Directory holding generated datasets
+
+    Returns:
+        Path of the dataset file
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"tasks-{size}-seed{seed}.db")
+    if not os.path.exists(path):
+        partial = f"{path}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        create_dataset(partial, size, seed)
+        os.replace(partial, path)
+    return path
+
+
+def run(
+    size: int,
+    iterations: int,
+    warmup: int = 20,
+    only: Optional[List[str]] = None,
+    seed: int = 0,
+    profile: str = DEFAULT_PROFILE,
+    write_mode: str = SERIALIZED_MODE,
+    data_dir: str = DATA_DIR,
+    id_storage: str = TEXT_IDS,
+) -> Dict[str, Any]:
+    """Run the benchmark on a fresh copy of a dataset.
+
+    Args:
+        size: Number of tasks in the dataset
+        iterations: Timed calls per operation
+        warmup: Untimed calls per operation
+        only: Operations to run; all when omitted
+        seed: Dataset and operation seed
+        profile: Storage profile name
+        write_mode: Write mode name
+        data_dir: Directory holding generated datasets
+        id_storage: Id storage mode of the copy
+
+    Returns:
+        Run metadata and one result per operation
+
+    Raises:
+        ValueError: If an operation does not exist
+    """
+    names = only or list(OPERATIONS)
+    unknown = [name for name in names if name not in OPERATIONS]
+    if unknown:
+        raise ValueError(
+            f"Unknown operations: {', '.join(unknown)}. Expected any of: "
+            + ", ".join(OPERATIONS)
+        )
+
+    source = dataset_path(size, seed, data_dir)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        shutil.copyfile(source, path)
+        if id_storage != TEXT_IDS:
+            engine = create_engine(f"sqlite:///{path}")
+            migrate_id_storage(engine, id_storage)
+            engine.dispose()
+        bench = Bench(path, profile, write_mode, seed)
+        try:
+            results = {
+                name: measure(bench, OPERATIONS[name], iterations, warmup)
+                for name in names
+            }
+        finally:
+            bench.close()
+
+    return {
+        "meta": {
+            "tasks": size,
+            "seed": seed,
+            "iterations": iterations,
+            "storage_profile": profile,
+            "write_mode": write_mode,
+            "id_storage": id_storage,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """List the operations whose p50 latency regressed against a baseline.
+
+    Args:
+        current: Result of this run
+        baseline: Result of an earlier run
+        tolerance: Allowed slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        One line per regressed operation
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None or not before["p50_ms"]:
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        if change > tolerance:
+            regressions.append(
+                f"{name}: p50 {before['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms "
+                f"(+{change:.0%})"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m or a number")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", help="comma-separated operations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", default=DEFAULT_PROFILE)
+    parser.add_argument("--write-mode", default=SERIALIZED_MODE)
+    parser.add_argument("--ids", choices=ID_STORAGES, default=TEXT_IDS)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    parser.add_argument("--out", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="earlier JSON result to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    result = run(
+        parse_size(args.size),
+        args.iterations,
+        warmup=args.warmup,
+        only=args.only.split(",") if args.only else None,
+        seed=args.seed,
+        profile=args.profile,
+        write_mode=args.write_mode,
+        data_dir=args.data_dir,
+        id_storage=args.ids,
+    )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['meta']['tasks']} tasks, {args.iterations} iterations")
+        print(
+            f"{'operation':<16} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+            f"{'max ms':>8} {'ops/s':>8}"
+        )
+        for name, r in result["results"].items():
+            print(
+                f"{name:<16} {r['p50_ms']:>8.2f} {r['p90_ms']:>8.2f} "
+                f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['ops_per_sec']:>8.0f}"
+            )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""Check that the hot paths' queries are served by indexes.
+
+Runs every benchmark operation (see ``benchmarks.hot_paths``) on a copy of
+the dataset, captures the statements each one executes and runs them
+through SQLite's ``EXPLAIN QUERY PLAN``. A step reading a whole table
+without an index (``SCAN tasks``) is reported as a full scan, and the
+command exits with status 1 if any operation has one that is not in
+``EXPECTED_SCANS``. Steps walking a whole index (``SCAN tasks USING INDEX
+...``) are not full scans: they read rows in index order and stop at the
+page limit. Sorts through a temporary B-tree are listed as notes.
+
+Each operation runs once untraced first, so one-time work such as loading
+the tag posting index is not mistaken for its steady state.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.query_plans [--size 100k] [--verbose]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from benchmarks.dataset import parse_size
+from benchmarks.hot_paths import DATA_DIR, OPERATIONS, Bench, dataset_path
+from kairix_todo.utils.slow_queries import explain_query_plan
+from kairix_todo.utils.storage import DEFAULT_PROFILE
+from kairix_todo.utils.writer import INLINE_MODE
+
+# Operations that read a whole table by design
+EXPECTED_SCANS = {
+    ("list_tags", "tags"),
+}
+
+_FULL_SCAN = re.compile(r"SCAN (\w+)$")
+_TEMP_SORT = "USE TEMP B-TREE"
+
+Statement = Tuple[str, Any]
+
+
+def plan_issues(plan: List[str]) -> Tuple[List[str], List[str]]:
+    """Find full table scans and temporary sorts in a query plan.
+
+    Args:
+        plan: Plan steps as returned by explain_query_plan
+
+    Returns:
+        Tuple of (scanned table names, temporary sort steps)
+    """
+    scans = []
+    sorts = []
+    for step in plan:
+        step = step.strip()
+        match = _FULL_SCAN.fullmatch(step)
+        if match:
+            scans.append(match.group(1))
+        elif step.startswith(_TEMP_SORT):
+            sorts.append(step)
+    return scans, sorts
+
+
+def capture_statements(bench: Bench, name: str) -> List[Statement]:
+    """Run an operation once and collect the statements it executed.
+
+    Args:
+        bench: App under test
+        name: Operation name
+
+    Returns:
+        Distinct (statement, parameters) pairs, in order of first execution
+    """
+    statements: Dict[str, Any] = {}
+
+    def _capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        sample = parameters[0] if executemany and parameters else parameters
+        statements.setdefault(statement, sample)
+
+    for engine in bench.engines:
+        event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        OPERATIONS[name](bench)
+    finally:
+        for engine in bench.engines:
+            event.remove(engine, "before_cursor_execute", _capture)
+    return list(statements.items())
+
+
+def check_plans(
+    size: int,
+    seed: int = 0,
+    only: Optional[List[str]] = None,
+    data_dir: str = DATA_DIR,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Explain every statement of the benchmark operations.
+
+    Args:
+        size: Number of tasks in the dataset
+        seed: Dataset and operation seed
+        only: Operations to check; all when omitted
+        data_dir: Directory holding generated datasets
+
+    Returns:
+        Per operation, one entry per statement with its plan, full scans
+        and temporary sorts
+    """
+    names = only or list(OPERATIONS)
+    source = dataset_path(size, seed, data_dir)
+    report: Dict[str, List[Dict[str, Any]]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "plans.db")
+        shutil.copyfile(source, path)
+        bench = Bench(path, DEFAULT_PROFILE, INLINE_MODE, seed)
+        try:
+            for name in names:
+                OPERATIONS[name](bench)
+            for name in names:
+                statements = capture_statements(bench, name)
+                connection = bench.engine.raw_connection()
+                try:
+                    entries = []
+                    for statement, parameters in statements:
+                        plan = explain_query_plan(
+                            connection.driver_connection, statement, parameters
+                        )
+                        scans, sorts = plan_issues(plan)
+                        entries.append(
+                            {
+                                "statement": statement,
+                                "plan": plan,
+                                "scans": scans,
+                                "sorts": sorts,
+                            }
+                        )
+                finally:
+                    connection.close()
+                report[name] = entries
+        finally:
+            bench.close()
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m or a number")
+    parser.add_argument("--only", help="comma-separated operations")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args(argv)
+
+    report = check_plans(
+        parse_size(args.size),
+        seed=args.seed,
+        only=args.only.split(",") if args.only else None,
+        data_dir=args.data_dir,
+    )
+
+    unexpected = 0
+    for name, entries in report.items():
+        print(name)
+        for entry in entries:
+            scans = [
+                table for table in entry["scans"] if (name, table) not in EXPECTED_SCANS
+            ]
+            unexpected += len(scans)
+            if not (args.verbose or scans or entry["sorts"]):
+                continue
+            print(f"  {' '.join(entry['statement'].split())[:100]}")
+            if args.verbose:
+                for step in entry["plan"]:
+                    print(f"      {step}")
+            for table in scans:
+                print(f"    FULL SCAN of {table}")
+            for step in entry["sorts"]:
+                print(f"    note: {step}")
+
+    if unexpected:
+        print(f"{unexpected} unexpected full scans", file=sys.stderr)
+        sys.exit(1)
+    print("No unexpected full scans")
+
+
+if __name__ == "__main__":
+    main()
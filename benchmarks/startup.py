@@ -0,0 +1,156 @@
+"""Measure how long the app takes to start.
+
+Each run starts a fresh interpreter, like a new server worker, and times
+three steps on a copy of the dataset:
+
+- ``import``: importing ``kairix_todo.app``
+- ``create_app``: building the application with ``create_app()``
+- ``first_request``: the first ``GET /tasks/?limit=1``, which also prepares
+  the database (schema check, upgrades, tag cache)
+
+The median of each step over the runs is compared with its budget, and the
+command exits with status 1 if any step is over.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.startup [--size 10k] [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+from benchmarks.dataset import parse_size
+from benchmarks.hot_paths import DATA_DIR, dataset_path
+
+# Median milliseconds allowed per step
+BUDGETS_MS = {
+    "import": 1000.0,
+    "create_app": 100.0,
+    "first_request": 500.0,
+}
+
+# Run in the child interpreter; prints the step times as JSON
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from kairix_todo.app import EXTENSION_KEY, create_app
+imported = time.perf_counter()
+app = create_app({
+    "SQLALCHEMY_DATABASE_URI": "sqlite:///" + sys.argv[1],
+    "SLOW_QUERY_LOG": sys.argv[2],
+    "ARCHIVE_AFTER_DAYS": None,
+})
+created = time.perf_counter()
+response = app.test_client().get("/tasks/?limit=1")
+finished = time.perf_counter()
+assert response.status_code == 200, response.status_code
+app.extensions[EXTENSION_KEY].shutdown()
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "create_app": (created - imported) * 1000,
+    "first_request": (finished - created) * 1000,
+}))
+"""
+
+
+def measure_startup(path: str, directory: str) -> Dict[str, float]:
+    """Start the app once in a new interpreter.
+
+    Args:
+        path: Database file
+        directory: Scratch directory for the slow query log
+
+    Returns:
+        Milliseconds per step
+    """
+    src = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, (src, os.environ.get("PYTHONPATH")))
+    )
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _CHILD,
+            path,
+            os.path.join(directory, "slow_queries.log"),
+        ],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(
+    size: int, runs: int, seed: int = 0, data_dir: str = DATA_DIR
+) -> Dict[str, float]:
+    """Measure startup over several runs.
+
+    Every run gets its own copy of the dataset, so none finds the database
+    already prepared by an earlier one.
+
+    Args:
+        size: Number of tasks in the dataset
+        runs: Number of interpreters to start
+        seed: Dataset seed
+        data_dir: Directory holding generated datasets
+
+    Returns:
+        Median milliseconds per step
+    """
+    source = dataset_path(size, seed, data_dir)
+    samples: Dict[str, List[float]] = {name: [] for name in BUDGETS_MS}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.db")
+        for _ in range(runs):
+            shutil.copyfile(source, path)
+            for name, elapsed in measure_startup(path, directory).items():
+                samples[name].append(elapsed)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="10k", help="10k, 100k, 1m or a number")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    for name, budget in BUDGETS_MS.items():
+        parser.add_argument(
+            f"--{name.replace('_', '-')}-budget",
+            type=float,
+            default=budget,
+            help=f"milliseconds (default {budget:g})",
+        )
+    args = parser.parse_args(argv)
+
+    medians = run(parse_size(args.size), args.runs, args.seed, args.data_dir)
+
+    over = 0
+    print(f"{'step':<15}{'median ms':>12}{'budget ms':>12}")
+    for name, elapsed in medians.items():
+        budget = getattr(args, f"{name}_budget")
+        flag = ""
+        if elapsed > budget:
+            over += 1
+            flag = "  OVER BUDGET"
+        print(f"{name:<15}{elapsed:>12.1f}{budget:>12.0f}{flag}")
+
+    if over:
+        print(f"{over} steps over budget", file=sys.stderr)
+        sys.exit(1)
+    print("Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Compare SQLite storage profiles under a mixed read/write load.
+
+For each profile a fresh database file is seeded, then reader threads list
+and search tasks while writer threads create and complete tasks, each write
+in its own transaction, for a fixed time. Throughput is reported per
+operation type.
+
+Usage:
+    PYTHONPATH=src python benchmarks/storage_profiles.py [--duration 5]
+        [--readers 4] [--writers 2] [--profiles default,balanced] [--json]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine
+
+from kairix_todo.models import Base, Task
+from kairix_todo.utils.search_utils import search_tasks
+from kairix_todo.utils.sessions import create_session_registry, engine_options
+from kairix_todo.utils.storage import STORAGE_PROFILES, apply_storage_profile
+
+WORDS = ["report", "meeting", "email", "invoice", "review", "plan", "call", "fix"]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(3))
+
+
+def run_profile(
+    profile: str, duration: float, readers: int, writers: int, seed_rows: int
+) -> Dict[str, float]:
+    """Run the mixed load against a fresh database using one profile.
+
+    Args:
+        profile: Storage profile name
+        duration: Seconds to run the load for
+        readers: Number of reader threads
+        writers: Number of writer threads
+        seed_rows: Tasks inserted before the load starts
+
+    Returns:
+        Operations per second for reads, writes and both together, plus the
+        number of failed operations
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_engine(uri, **engine_options(uri))
+        apply_storage_profile(engine, profile)
+        Base.metadata.create_all(engine)
+        registry = create_session_registry(engine)
+
+        rng = random.Random(0)
+        registry.add_all(Task(title=_title(rng)) for _ in range(seed_rows))
+        registry.commit()
+        registry.remove()
+
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def reader(index: int) -> None:
+            local = random.Random(index)
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                try:
+                    if done % 2:
+                        search_tasks(registry, query=local.choice(WORDS), limit=20)
+                    else:
+                        registry.query(Task).order_by(Task.created_at).limit(50).all()
+                    done += 1
+                except Exception:
+                    errors += 1
+                finally:
+                    registry.remove()
+            with lock:
+                counts["reads"] += done
+                counts["errors"] += errors
+
+        def writer(index: int) -> None:
+            local = random.Random(1000 + index)
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                try:
+                    task = Task(title=_title(local))
+                    registry.add(task)
+                    registry.commit()
+                    task.completed = True
+                    registry.commit()
+                    done += 2
+                except Exception:
+                    registry.rollback()
+                    errors += 1
+                finally:
+                    registry.remove()
+            with lock:
+                counts["writes"] += done
+                counts["errors"] += errors
+
+        threads = [
+            threading.Thread(target=reader, args=(i,)) for i in range(readers)
+        ] + [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "reads_per_sec": counts["reads"] / elapsed,
+        "writes_per_sec": counts["writes"] / elapsed,
+        "ops_per_sec": (counts["reads"] + counts["writes"]) / elapsed,
+        "errors": counts["errors"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seed-rows", type=int, default=2000)
+    parser.add_argument("--profiles", default=",".join(STORAGE_PROFILES))
+    parser.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args(argv)
+
+    results = {
+        profile: run_profile(
+            profile, args.duration, args.readers, args.writers, args.seed_rows
+        )
+        for profile in args.profiles.split(",")
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'profile':<10} {'reads/s':>10} {'writes/s':>10} {'total/s':>10} errors")
+    for profile, result in results.items():
+        print(
+            f"{profile:<10} {result['reads_per_sec']:>10.0f} "
+            f"{result['writes_per_sec']:>10.0f} {result['ops_per_sec']:>10.0f} "
+            f"{result['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,303 @@
-import json
+"""Application factory.
+
+``create_app()`` only builds the application: it reads the configuration,
+creates the engines (which do not connect until first used), starts the
+writer and registers the controllers. Everything that needs the database
+(resolving the id storage, creating and upgrading the schema, warming the
+tag cache, starting the archiver) runs once, before the first request, and
+the OpenAPI spec is read when it is first requested. Importing this module,
+booting a server worker or running a command that only needs the models
+therefore does not touch the database.
+
+``kairix_todo.app:app`` is created with the default configuration on first
+access, for servers and tools that expect an application object.
+"""
+
 import os
+import threading
+from typing import Any, Mapping, Optional
 
-from flask import Flask, jsonify, render_template
+from flask import Flask, Response, render_template, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_swagger_ui import get_swaggerui_blueprint
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy import create_engine
 
+from kairix_todo.controller.admin_controller import AdminController
+from kairix_todo.controller.bulk_controller import BulkController
 from kairix_todo.controller.search_controller import SearchController
 from kairix_todo.controller.tag_controller import TagController
 from kairix_todo.controller.task_controller import TaskController
 from kairix_todo.models import Base
+from kairix_todo.utils.archive import (
+    Archiver,
+    archive_after_days,
+    archive_interval,
+    install_archive,
+)
+from kairix_todo.utils.fts_utils import install_fts_index
+from kairix_todo.utils.ids import id_storage_name, resolve_id_storage, use_id_storage
+from kairix_todo.utils.metrics import PROMETHEUS_CONTENT_TYPE, Metrics, init_metrics
+from kairix_todo.utils.openapi import OpenApiSpec
+from kairix_todo.utils.schema import upgrade_schema
+from kairix_todo.utils.search_cache import DEFAULT_MAX_ENTRIES, SearchCache
+from kairix_todo.utils.sessions import (
+    create_session_registry,
+    engine_options,
+    init_session_scope,
+    is_memory_database,
+)
+from kairix_todo.utils.slow_queries import (
+    SLOW_QUERY_LOG_ENV,
+    SlowQueryLog,
+    slow_query_threshold_ms,
+)
+from kairix_todo.utils.storage import apply_storage_profile, storage_profile_name
+from kairix_todo.utils.tag_cache import TagCache
+from kairix_todo.utils.tag_index import TagIndex, install_posting_log
+from kairix_todo.utils.versioning import install_versioning
+from kairix_todo.utils.writer import (
+    INLINE_MODE,
+    create_writer,
+    read_only_engine,
+    write_mode_name,
+)
 
-app = Flask(__name__)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///tasks.db"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.url_map.strict_slashes = False  # Handle trailing slashes consistently
+# Key of the Services in app.extensions
+EXTENSION_KEY = "kairix_todo"
 
-db = SQLAlchemy(app, model_class=Base)
+OPENAPI_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "openapi.json"
+)
 
-with app.app_context():
-    session_factory = sessionmaker(bind=db.engine)
-    Session = scoped_session(session_factory)
-    session = Session()
+SWAGGER_URL = "/api/docs"  # URL for exposing Swagger UI
+API_URL = "/api/swagger.json"  # Our API url
 
-    # Register controllers
-    task_controller = TaskController(session)
-    tag_controller = TagController(session)
-    search_controller = SearchController(session)
+db = SQLAlchemy(model_class=Base)
+
+
+class Services:
+    """What the app's requests share, and its one-time database setup."""
+
+    def __init__(self, app: Flask):
+        """Create the engines, writer and caches of an app.
+
+        Nothing here connects to the database.
+
+        Args:
+            app: Flask application, with db initialized on it
+        """
+        self.app = app
+        self.engine = db.engine
+        # Pragmas for every pooled connection; must precede the first connect
+        apply_storage_profile(self.engine, app.config["STORAGE_PROFILE"])
+
+        # In serialized and group mode all writes go through one writer
+        # thread on db.engine, and request sessions read from a separate pool
+        # of read-only connections; in inline mode requests write themselves
+        self.read_engine = self.engine
+        if app.config["WRITE_MODE"] != INLINE_MODE:
+            self.read_engine = create_engine(
+                self.engine.url, **app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+            )
+            apply_storage_profile(self.read_engine, app.config["STORAGE_PROFILE"])
+            read_only_engine(self.read_engine)
+        self.engines = list(dict.fromkeys((self.engine, self.read_engine)))
+
+        # Controllers get the registry, not a session: each request thread
+        # works with its own session, removed when the request ends
+        self.Session = create_session_registry(self.read_engine)
+        self.writer = create_writer(app.config["WRITE_MODE"], self.engine, self.Session)
+
+        # Task writes resolve tag names through a cache the tag endpoints
+        # keep current; search and bulk filters share one tag posting index
+        self.tag_cache = TagCache()
+        self.tag_index = TagIndex()
+        self.metrics = Metrics()
+        self.slow_query_log: Optional[SlowQueryLog] = None
+        self.archiver: Optional[Archiver] = None
+        self.openapi_spec = OpenApiSpec(app.config["OPENAPI_PATH"])
+
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def init_database(self) -> None:
+        """Prepare the database for requests, once.
+
+        Called before the first request; safe to call again or from several
+        threads.
+        """
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            config = self.app.config
+            # Where the default database and slow query log live
+            os.makedirs(self.app.instance_path, exist_ok=True)
+
+            # Ids are stored as text or as 16-byte blobs (see utils.ids);
+            # existing databases keep the mode they were created or migrated in
+            config["ID_STORAGE"] = resolve_id_storage(self.engine, id_storage_name())
+            for engine in self.engines:
+                use_id_storage(engine, config["ID_STORAGE"])
+
+            Base.metadata.create_all(self.engine)
+
+            # Databases created before the FTS index, tag posting log and
+            # version counters existed get them here; new databases already
+            # have them from create_all(). The same goes for primary keys and
+            # indexes added to existing tables, which create_all() skips (see
+            # utils.schema).
+            with self.engine.begin() as connection:
+                install_fts_index(connection)
+                install_posting_log(connection)
+                install_versioning(connection)
+                upgrade_schema(connection)
+                install_archive(connection)
 
-    app.register_blueprint(task_controller.blueprint)
-    app.register_blueprint(tag_controller.blueprint)
-    app.register_blueprint(search_controller.blueprint)
+            self.tag_cache.warm(self.Session)
+            self.Session.remove()
 
-    # Load OpenAPI schema
-    openapi_path = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "openapi.json"
+            # Tasks completed long ago move to the archive tables in the
+            # background, in small batches through the writer (see
+            # utils.archive)
+            if config["ARCHIVE_AFTER_DAYS"] is not None:
+                self.archiver = Archiver(
+                    self.writer,
+                    config["ARCHIVE_AFTER_DAYS"],
+                    interval=archive_interval(),
+                )
+                self.archiver.start()
+            self._ready = True
+
+    def shutdown(self) -> None:
+        """Stop the background threads, finishing the queued writes."""
+        # Stop between archive batches, before the writer they run on goes away
+        if self.archiver is not None:
+            self.archiver.stop()
+        stop = getattr(self.writer, "stop", None)
+        if stop is not None:
+            stop()
+
+
+def create_app(config: Optional[Mapping[str, Any]] = None) -> Flask:
+    """Create the application.
+
+    Args:
+        config: Settings overriding the defaults, e.g. SQLALCHEMY_DATABASE_URI
+
+    Returns:
+        Flask application; its Services are in app.extensions["kairix_todo"]
+    """
+    app = Flask(__name__)
+    # tasks.db in the instance folder, as an absolute path: Flask-SQLAlchemy
+    # creates the folder for relative ones when the app is created
+    app.config["SQLALCHEMY_DATABASE_URI"] = (
+        f"sqlite:///{os.path.join(app.instance_path, 'tasks.db')}"
     )
-    with open(openapi_path, "r") as f:
-        openapi_spec = json.load(f)
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["STORAGE_PROFILE"] = storage_profile_name()
+    app.config["WRITE_MODE"] = write_mode_name()
+    app.config["ARCHIVE_AFTER_DAYS"] = archive_after_days()
+    app.config["SLOW_QUERY_MS"] = slow_query_threshold_ms()
+    app.config["SLOW_QUERY_LOG"] = os.environ.get(
+        SLOW_QUERY_LOG_ENV, os.path.join(app.instance_path, "slow_queries.log")
+    )
+    app.config["SEARCH_CACHE_ENTRIES"] = DEFAULT_MAX_ENTRIES
+    app.config["OPENAPI_PATH"] = OPENAPI_PATH
+    app.config.update(config or {})
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS",
+        engine_options(app.config["SQLALCHEMY_DATABASE_URI"]),
+    )
+    # An in-memory database lives in one connection: a writer thread and a
+    # separate read engine would each see their own, empty database
+    if is_memory_database(app.config["SQLALCHEMY_DATABASE_URI"]):
+        app.config["WRITE_MODE"] = INLINE_MODE
+    app.url_map.strict_slashes = False  # Handle trailing slashes consistently
+
+    db.init_app(app)
+
+    with app.app_context():
+        services = Services(app)
+    app.extensions[EXTENSION_KEY] = services
+    app.before_request(services.init_database)
+    init_session_scope(app, services.Session)
+
+    # Request latency, size and SQL metrics, served at /metrics
+    init_metrics(app, services.metrics, services.engines)
+
+    # Statements slower than the threshold are logged with their query plan
+    # and listed at /admin/slow-queries
+    if app.config["SLOW_QUERY_MS"] is not None:
+        services.slow_query_log = SlowQueryLog(
+            app.config["SLOW_QUERY_MS"], app.config["SLOW_QUERY_LOG"]
+        )
+        for engine in services.engines:
+            services.slow_query_log.instrument(engine)
+
+    # Register controllers
+    Session, writer = services.Session, services.writer
+    for controller in (
+        TaskController(Session, tag_cache=services.tag_cache, writer=writer),
+        TagController(Session, tag_cache=services.tag_cache, writer=writer),
+        SearchController(
+            Session,
+            cache=SearchCache(max_entries=app.config["SEARCH_CACHE_ENTRIES"]),
+            tag_index=services.tag_index,
+        ),
+        BulkController(Session, tag_index=services.tag_index, writer=writer),
+    ):
+        app.register_blueprint(controller.blueprint)
+    if services.slow_query_log is not None:
+        app.register_blueprint(AdminController(services.slow_query_log).blueprint)
 
     # Add endpoint to serve OpenAPI schema
-    @app.route("/api/swagger.json")
-    def swagger_json():
-        return jsonify(openapi_spec)
+    @app.route(API_URL)
+    def swagger_json() -> Response:
+        return services.openapi_spec.response(request)
 
     # Configure Swagger UI
-    SWAGGER_URL = "/api/docs"  # URL for exposing Swagger UI
-    API_URL = "/api/swagger.json"  # Our API url
-
-    # Call factory function to create our blueprint
     swaggerui_blueprint = get_swaggerui_blueprint(
         SWAGGER_URL,
         API_URL,
         config={"app_name": "Kairix Todo API"},  # Swagger UI config overrides
     )
-
-    # Register blueprint at URL
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
-    db.create_all()
+    @app.route("/")
+    def index():
+        return render_template("web_app.html")
+
+    @app.route("/health")
+    def health() -> dict:
+        return {"status": "running"}
+
+    @app.route("/metrics")
+    def metrics_text() -> Response:
+        return Response(services.metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
 
+    @app.route("/web-app")
+    def web_app():
+        return render_template("web_app.html")
 
-@app.route("/")
-def index():
-    return render_template("web_app.html")
+    return app
 
 
-@app.route("/health")
-def health() -> dict:
-    return {"status": "running"}
+_app: Optional[Flask] = None
+_app_lock = threading.Lock()
 
 
-@app.route("/web-app")
-def web_app():
-    return render_template("web_app.html")
+def __getattr__(name: str) -> Any:
+    # Module attribute "app", created on first access (PEP 562)
+    global _app
+    if name != "app":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _app_lock:
+        if _app is None:
+            _app = create_app()
+    return _app
 
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5001)
+    create_app().run(debug=True, port=5001)
@@ -0,0 +1,25 @@
+"""ASGI entry point.
+
+Serves the same Flask application as ``kairix_todo.app:app``, with
+connection handling on an event loop (see ``utils.asgi``):
+
+    uvicorn --app-dir src kairix_todo.asgi:app
+"""
+
+import os
+
+from kairix_todo.app import EXTENSION_KEY, create_app
+from kairix_todo.utils.asgi import DEFAULT_MAX_BODY_SIZE, DEFAULT_WORKERS, AsgiAdapter
+
+ASGI_WORKERS_ENV = "KAIRIX_ASGI_WORKERS"
+ASGI_MAX_BODY_ENV = "KAIRIX_ASGI_MAX_BODY"
+
+flask_app = create_app()
+
+app = AsgiAdapter(
+    flask_app,
+    workers=int(os.environ.get(ASGI_WORKERS_ENV, DEFAULT_WORKERS)),
+    max_body_size=int(os.environ.get(ASGI_MAX_BODY_ENV, DEFAULT_MAX_BODY_SIZE)),
+    # Let the writer thread finish the queued writes before the process exits
+    on_shutdown=[flask_app.extensions[EXTENSION_KEY].shutdown],
+)
@@ -0,0 +1,35 @@
+from flask import Blueprint, jsonify, request
+
+from kairix_todo.utils.slow_queries import SlowQueryLog
+
+
+class AdminController:
+    def __init__(self, slow_query_log: SlowQueryLog):
+        self.slow_query_log = slow_query_log
+        self.blueprint = Blueprint("admin", __name__, url_prefix="/admin")
+
+        # Route definitions
+        self.blueprint.route("/slow-queries", methods=["GET"])(self.list_slow_queries)
+        self.blueprint.route("/slow-queries", methods=["DELETE"])(
+            self.clear_slow_queries
+        )
+
+    def list_slow_queries(self):
+        """Recent slow statements, newest first.
+
+        Query parameters:
+            limit: Most entries to return (default 50)
+            endpoint: Only statements run for this endpoint, e.g. search.search
+        """
+        limit = request.args.get("limit", 50, type=int)
+        endpoint = request.args.get("endpoint")
+        return jsonify(
+            {
+                "threshold_ms": self.slow_query_log.threshold_ms,
+                "entries": self.slow_query_log.entries(max(limit, 0), endpoint),
+            }
+        )
+
+    def clear_slow_queries(self):
+        self.slow_query_log.clear()
+        return "", 204
@@ -0,0 +1,200 @@
+"""Controller for bulk task operations."""
+
+from typing import List, Optional
+
+from flask import Blueprint, Response, abort, request, stream_with_context
+from sqlalchemy.orm import Session
+
+from kairix_todo.utils.bulk_utils import (
+    BULK_MAX_ITEMS,
+    bulk_complete,
+    bulk_create_tasks,
+    bulk_delete,
+    bulk_retag,
+    select_task_ids,
+)
+from kairix_todo.utils.serializers import json_response
+from kairix_todo.utils.tag_index import TagIndex
+from kairix_todo.utils.transfer import (
+    CSV_FORMAT,
+    JSONL_FORMAT,
+    TRANSFER_FORMATS,
+    TRANSFER_MIMETYPES,
+    encode_records,
+    export_records,
+    import_records,
+    read_records,
+)
+from kairix_todo.utils.writer import InlineWriter, Writer
+
+
+class BulkController:
+    """Controller for creating and changing many tasks per request."""
+
+    def __init__(
+        self,
+        session: Session,
+        tag_index: Optional[TagIndex] = None,
+        writer: Optional[Writer] = None,
+    ):
+        """Initialize the bulk controller.
+
+        Args:
+            session: SQLAlchemy database session used for reads
+            tag_index: Tag posting index for filters; a new one is created if
+                omitted
+            writer: Writer for the changes; defaults to writing on session
+        """
+        self.session = session
+        self.tag_index = tag_index if tag_index is not None else TagIndex()
+        self.writer = writer if writer is not None else InlineWriter(session)
+        self.blueprint = Blueprint("bulk", __name__, url_prefix="/tasks")
+
+        # Route definitions
+        self.blueprint.route("/bulk", methods=["POST"])(self.create_tasks)
+        self.blueprint.route("/bulk/complete", methods=["POST"])(self.complete_tasks)
+        self.blueprint.route("/bulk/retag", methods=["POST"])(self.retag_tasks)
+        self.blueprint.route("/bulk/delete", methods=["POST"])(self.delete_tasks)
+        self.blueprint.route("/export", methods=["GET"])(self.export_tasks)
+        self.blueprint.route("/import", methods=["POST"])(self.import_tasks)
+
+    def create_tasks(self):
+        """Create every task in a JSON array with a single commit.
+
+        Returns:
+            JSON array with one result per item: the new task id or the
+            reason the item was rejected. The status is 201 if every item was
+            created, 207 if only some were, and 400 if none were.
+        """
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            abort(400, description="Expected a JSON array of tasks.")
+        if len(items) > BULK_MAX_ITEMS:
+            abort(
+                400,
+                description=f"At most {BULK_MAX_ITEMS} tasks can be created at once.",
+            )
+
+        results = self.writer.run(lambda session: bulk_create_tasks(session, items))
+        failed = sum(1 for result in results if "error" in result)
+        if not failed:
+            status = 201
+        elif failed < len(results):
+            status = 207
+        else:
+            status = 400
+        return json_response(results, status=status)
+
+    def _selected_task_ids(self, data: dict) -> List[str]:
+        """Resolve the ``ids`` or ``filter`` selector of a bulk change."""
+        try:
+            return select_task_ids(
+                self.session,
+                ids=data.get("ids"),
+                filters=data.get("filter"),
+                tag_index=self.tag_index,
+            )
+        except ValueError as e:
+            abort(400, description=str(e))
+
+    def _json_object(self) -> dict:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            abort(400, description="Expected a JSON object.")
+        return data
+
+    def complete_tasks(self):
+        """Mark every selected task as completed (or not, with completed=false).
+
+        Returns:
+            JSON object with the number of matched and changed tasks
+        """
+        data = self._json_object()
+        completed = data.get("completed", True)
+        if not isinstance(completed, bool):
+            abort(400, description="completed must be a boolean.")
+
+        task_ids = self._selected_task_ids(data)
+        updated = bulk_complete(
+            self.session, task_ids, completed=completed, writer=self.writer
+        )
+        return json_response({"matched": len(task_ids), "updated": updated})
+
+    def retag_tasks(self):
+        """Add and remove tags on every selected task.
+
+        Returns:
+            JSON object with the number of matched tasks and of tag links
+            added and removed
+        """
+        data = self._json_object()
+        add = data.get("add", [])
+        remove = data.get("remove", [])
+        for names in (add, remove):
+            if not isinstance(names, list) or not all(
+                isinstance(name, str) and name.strip() for name in names
+            ):
+                abort(400, description="add and remove must be lists of tag names.")
+        if not add and not remove:
+            abort(400, description="Nothing to do: add or remove some tags.")
+
+        task_ids = self._selected_task_ids(data)
+        added, removed = bulk_retag(
+            self.session, task_ids, add=add, remove=remove, writer=self.writer
+        )
+        return json_response(
+            {"matched": len(task_ids), "added": added, "removed": removed}
+        )
+
+    def delete_tasks(self):
+        """Delete every selected task with its reminders and tag links.
+
+        Returns:
+            JSON object with the number of matched and deleted tasks
+        """
+        data = self._json_object()
+        task_ids = self._selected_task_ids(data)
+        deleted = bulk_delete(self.session, task_ids, writer=self.writer)
+        return json_response({"matched": len(task_ids), "deleted": deleted})
+
+    def _transfer_format(self, default: str) -> str:
+        """Read the ``format`` query parameter of an export or import."""
+        name = request.args.get("format", default).lower()
+        if name not in TRANSFER_FORMATS:
+            abort(400, description="format must be jsonl or csv.")
+        return name
+
+    def export_tasks(self):
+        """Stream every task with its tags and reminders as JSONL or CSV.
+
+        Query parameters:
+            format: jsonl (default) or csv
+            archived: false to leave out archived tasks
+
+        Returns:
+            Streaming response, sent as an attachment
+        """
+        name = self._transfer_format(JSONL_FORMAT)
+        include_archived = request.args.get("archived", "true").lower() != "false"
+        records = export_records(self.session, include_archived=include_archived)
+        return Response(
+            stream_with_context(encode_records(records, name)),
+            mimetype=TRANSFER_MIMETYPES[name],
+            headers={"Content-Disposition": f'attachment; filename="tasks.{name}"'},
+        )
+
+    def import_tasks(self):
+        """Add the tasks of a JSONL or CSV export, read as the body arrives.
+
+        The format comes from the ``format`` query parameter, or else from
+        the Content-Type (``text/csv`` for CSV, JSONL otherwise).
+
+        Returns:
+            JSON object with the number of tasks imported, skipped because
+            they already exist and rejected, and the first rejections. The
+            status is 200 even if some records were rejected.
+        """
+        default = CSV_FORMAT if request.mimetype == "text/csv" else JSONL_FORMAT
+        name = self._transfer_format(default)
+        report = import_records(self.writer, read_records(request.stream, name))
+        return json_response(report)
@@ -1,27 +1,63 @@
 """Controller for task search functionality."""
 
+import heapq
+import itertools
 from datetime import date
+from typing import Optional
 
-from flask import Blueprint, jsonify, request
-from sqlalchemy.orm import Session
+from flask import Blueprint, abort, current_app, jsonify, request
+from sqlalchemy.orm import Session, selectinload
 
-from kairix_todo.utils.search_utils import search_tasks
+from kairix_todo.models import ArchivedTask, Task
+from kairix_todo.utils.generation import current_generation
+from kairix_todo.utils.pagination import NEXT_CURSOR_HEADER, check_limit
+from kairix_todo.utils.search_cache import SearchCache, make_cache_key
+from kairix_todo.utils.search_utils import (
+    TOTAL_ESTIMATE,
+    TOTAL_EXACT,
+    TOTAL_NONE,
+    build_search_query,
+    search_tasks_page,
+    served_by_fts,
+)
+from kairix_todo.utils.serializers import json_response
+from kairix_todo.utils.streaming import (
+    STREAM_BATCH_SIZE,
+    ndjson_response,
+    wants_ndjson,
+)
+from kairix_todo.utils.tag_index import TagIndex
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+# include_total query parameter values
+_TOTAL_MODES = {"true": TOTAL_EXACT, "false": TOTAL_NONE, "estimate": TOTAL_ESTIMATE}
 
 
 class SearchController:
     """Controller for task search functionality."""
 
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        cache: Optional[SearchCache] = None,
+        tag_index: Optional[TagIndex] = None,
+    ):
         """Initialize the search controller.
 
         Args:
             session: SQLAlchemy database session
+            cache: Result cache; a default-sized one is created if omitted
+            tag_index: Tag posting index; a new one is created if omitted
         """
         self.session = session
+        self.cache = cache if cache is not None else SearchCache()
+        self.tag_index = tag_index if tag_index is not None else TagIndex()
         self.blueprint = Blueprint("search", __name__, url_prefix="/tasks")
 
         # Route definitions
         self.blueprint.route("/search", methods=["GET"])(self.search)
+        self.blueprint.route("/search/cache", methods=["GET"])(self.cache_stats)
 
     def search(self):
         """Search for tasks with various filters.
@@ -31,6 +67,12 @@ class SearchController:
         """
         # Parse query parameters
         query = request.args.get("q")
+        match_mode = request.args.get("match_mode", "all")
+
+        tags = request.args.get("tags")
+        if tags:
+            tags = [name.strip() for name in tags.split(",") if name.strip()]
+        tags_operator = request.args.get("tags_operator", "AND").upper()
 
         from_date = request.args.get("from_date")
         if from_date:
@@ -44,22 +86,154 @@ class SearchController:
         if completed is not None:
             completed = completed.lower() == "true"
 
+        # Completed tasks may have been moved to the archive (see
+        # utils.archive), so searches for them look there as well
+        archive = completed is True
+
+        if wants_ndjson(request):
+            try:
+                queries = [
+                    build_search_query(
+                        self.session,
+                        query=query,
+                        from_date=from_date,
+                        to_date=to_date,
+                        completed=completed,
+                        match_mode=match_mode,
+                        tags=tags,
+                        tags_operator=tags_operator,
+                        tag_index=self.tag_index,
+                        archived=archived,
+                    )
+                    for archived in ((False, True) if archive else (False,))
+                ]
+            except ValueError as e:
+                abort(400, description=str(e))
+            # Both orderings match unless the archive FTS index is missing
+            queries = [entry for entry in queries if entry[1] == queries[0][1]]
+            return self._stream([(entry[0], entry[2]) for entry in queries])
+
         limit = request.args.get("limit", 100, type=int)
         offset = request.args.get("offset", 0, type=int)
+        cursor = request.args.get("cursor")
 
-        # Execute search
-        tasks, total = search_tasks(
-            self.session,
+        include_total = request.args.get("include_total", "false").lower()
+        if include_total not in _TOTAL_MODES:
+            abort(400, description="include_total must be true, false or estimate.")
+
+        total_mode = _TOTAL_MODES[include_total]
+
+        cache_key = make_cache_key(
+            fts=served_by_fts(self.session, query, match_mode),
             query=query,
+            match_mode=match_mode,
             from_date=from_date,
             to_date=to_date,
             completed=completed,
             limit=limit,
             offset=offset,
+            cursor=cursor,
+            total_mode=total_mode,
+            tags=tuple(sorted(set(tags))) if tags else None,
+            tags_operator=tags_operator if tags else None,
         )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            body, headers = cached
+            return current_app.response_class(
+                body, mimetype="application/json", headers=headers
+            )
+
+        # Read before querying so a commit racing the search discards the result
+        generation = current_generation()
+
+        # Execute search
+        try:
+            page = search_tasks_page(
+                self.session,
+                query=query,
+                from_date=from_date,
+                to_date=to_date,
+                completed=completed,
+                limit=limit,
+                offset=offset,
+                match_mode=match_mode,
+                cursor=cursor,
+                total_mode=total_mode,
+                tags=tags,
+                tags_operator=tags_operator,
+                tag_index=self.tag_index,
+                options=[selectinload(Task.reminders)],
+                archive=archive,
+                archive_options=[selectinload(ArchivedTask.reminders)],
+            )
+        except ValueError as e:
+            abort(400, description=str(e))
 
         # Format response
-        return jsonify([self._format_task(task) for task in tasks])
+        headers = {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor else {}
+        if page.total is not None:
+            headers[TOTAL_COUNT_HEADER] = (
+                str(page.total) if page.total_exact else f"{page.total}+"
+            )
+        response = json_response(
+            [self._format_task(task) for task in page.tasks], headers=headers
+        )
+        self.cache.put(cache_key, (response.get_data(), headers), generation)
+        return response
+
+    def _stream(self, queries):
+        """Stream every match as NDJSON, honouring limit/offset if given.
+
+        Args:
+            queries: (filtered query, sort key) pairs, live tasks first and
+                then, if searched, archived ones
+
+        Returns:
+            Streaming NDJSON response
+        """
+        limit = request.args.get("limit", type=int)
+        offset = request.args.get("offset", 0, type=int)
+        if limit is not None:
+            try:
+                check_limit(limit)
+            except ValueError as e:
+                abort(400, description=str(e))
+
+        if len(queries) == 1:
+            task_query, key = queries[0]
+            task_query = task_query.options(selectinload(Task.reminders)).order_by(*key)
+            if limit is not None:
+                task_query = task_query.limit(limit)
+            if offset:
+                task_query = task_query.offset(offset)
+            return ndjson_response(
+                task_query.yield_per(STREAM_BATCH_SIZE), self._format_task
+            )
+
+        # Merge the live and archived matches by sort key as they stream
+        streams = []
+        for (task_query, key), model in zip(queries, (Task, ArchivedTask)):
+            task_query = (
+                task_query.options(selectinload(model.reminders))
+                .add_columns(*key)
+                .order_by(*key)
+            )
+            if limit is not None:
+                task_query = task_query.limit(offset + limit)
+            streams.append(task_query.yield_per(STREAM_BATCH_SIZE))
+        rows = heapq.merge(*streams, key=lambda row: tuple(row[1:]))
+        stop = offset + limit if limit is not None else None
+        tasks = (row[0] for row in itertools.islice(rows, offset, stop))
+        return ndjson_response(tasks, self._format_task)
+
+    def cache_stats(self):
+        """Report search cache effectiveness.
+
+        Returns:
+            JSON response with hit/miss counters and occupancy
+        """
+        return jsonify(self.cache.stats())
 
     def _format_task(self, task):
         """Format a task for JSON response.
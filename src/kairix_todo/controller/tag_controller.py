@@ -1,15 +1,35 @@
+from typing import Optional
+
 from flask import Blueprint, abort, jsonify, request
 from sqlalchemy.orm import Session
 
 from kairix_todo.models import Tag, TagSchema
+from kairix_todo.utils.serializers import compile_serializer, json_response
+from kairix_todo.utils.tag_cache import TagCache
+from kairix_todo.utils.versioning import (
+    TAGS_COLLECTION,
+    collection_version,
+    make_etag,
+    not_modified,
+    row_version,
+)
+from kairix_todo.utils.writer import InlineWriter, Writer
 
 
 class TagController:
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        tag_cache: Optional[TagCache] = None,
+        writer: Optional[Writer] = None,
+    ):
         self.session = session
+        self.tag_cache = tag_cache if tag_cache is not None else TagCache()
+        self.writer = writer if writer is not None else InlineWriter(session)
         self.blueprint = Blueprint("tags", __name__, url_prefix="/tags")
         self.tag_schema = TagSchema()
         self.tags_schema = TagSchema(many=True)
+        self.serialize_tag = compile_serializer(self.tag_schema)
 
         # Route definitions
         self.blueprint.route("/", methods=["GET"])(self.list_tags)
@@ -19,40 +39,76 @@ class TagController:
         self.blueprint.route("/<tag_id>", methods=["DELETE"])(self.delete_tag)
 
     def list_tags(self):
+        version = collection_version(self.session, TAGS_COLLECTION)
+        etag = None
+        if version is not None:
+            etag = make_etag(request, TAGS_COLLECTION, version)
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+
         tags = self.session.query(Tag).all()
-        return jsonify(self.tags_schema.dump(tags)), 200
+        response = json_response([self.serialize_tag(tag) for tag in tags])
+        if etag is not None:
+            response.set_etag(etag)
+        return response
 
     def create_tag(self):
         data = request.json
-        tag = Tag(**data)
-        self.session.add(tag)
-        self.session.commit()
-        return jsonify(self.tag_schema.dump(tag)), 201
+
+        def write(session):
+            tag = Tag(**data)
+            session.add(tag)
+            session.commit()
+            return self.tag_schema.dump(tag)
+
+        return jsonify(self.writer.run(write)), 201
 
     def get_tag(self, tag_id: str):
-        tag = self.session.get(Tag, tag_id)
-        if not tag:
-            abort(404, description="Tag not found.")
-        return jsonify(self.tag_schema.dump(tag)), 200
+        if request.if_none_match:
+            version = row_version(self.session, Tag, tag_id)
+            if version is None:
+                abort(404, description="Tag not found.")
+            response = not_modified(request, make_etag(request, "tag", tag_id, version))
+            if response is not None:
+                return response
 
-    def update_tag(self, tag_id: str):
         tag = self.session.get(Tag, tag_id)
         if not tag:
             abort(404, description="Tag not found.")
+        response = json_response(self.serialize_tag(tag))
+        response.set_etag(make_etag(request, "tag", tag_id, tag.version))
+        return response
 
+    def update_tag(self, tag_id: str):
         data = request.json
-        if data:  # Check if data is not empty
-            for key, value in data.items():
-                setattr(tag, key, value)
 
-        self.session.commit()
-        return jsonify(self.tag_schema.dump(tag)), 200
+        def write(session):
+            tag = session.get(Tag, tag_id)
+            if not tag:
+                abort(404, description="Tag not found.")
+
+            old_name = tag.name
+            if data:  # Check if data is not empty
+                for key, value in data.items():
+                    setattr(tag, key, value)
+
+            session.commit()
+            self.tag_cache.invalidate(session, old_name)
+            return self.tag_schema.dump(tag)
+
+        return jsonify(self.writer.run(write)), 200
 
     def delete_tag(self, tag_id: str):
-        tag = self.session.get(Tag, tag_id)
-        if not tag:
-            abort(404, description="Tag not found.")
+        def write(session):
+            tag = session.get(Tag, tag_id)
+            if not tag:
+                abort(404, description="Tag not found.")
+
+            name = tag.name
+            session.delete(tag)
+            session.commit()
+            self.tag_cache.invalidate(session, name)
 
-        self.session.delete(tag)
-        self.session.commit()
+        self.writer.run(write)
         return jsonify({"message": "Tag deleted"}), 204
@@ -1,19 +1,90 @@
 from datetime import datetime
+from typing import Any, Optional
 
 from flask import Blueprint, abort, jsonify, request
-from sqlalchemy.orm import Session
-
-from kairix_todo.models import Reminder, ReminderSchema, Tag, Task, TaskSchema
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload
+
+from kairix_todo.models import (
+    ArchivedTask,
+    Reminder,
+    ReminderSchema,
+    Tag,
+    Task,
+    TaskSchema,
+    archived_task_tags,
+    task_tags,
+)
+from kairix_todo.utils.archive import delete_archived_task
+from kairix_todo.utils.pagination import (
+    CREATED_ORDER,
+    NEXT_CURSOR_HEADER,
+    created_order_key,
+    keyset_page,
+)
+from kairix_todo.utils.serializers import compile_serializer, json_response
+from kairix_todo.utils.streaming import (
+    STREAM_BATCH_SIZE,
+    ndjson_response,
+    wants_ndjson,
+)
+from kairix_todo.utils.tag_cache import TagCache
+from kairix_todo.utils.versioning import (
+    TASKS_COLLECTION,
+    collection_version,
+    make_etag,
+    not_modified,
+    row_version,
+)
+from kairix_todo.utils.writer import InlineWriter, Writer
+
+# Loader options for serializing tasks with their tags and reminders: one
+# extra IN query per relationship for lists (a single joined query for one
+# task, see detail_query)
+LIST_LOAD_OPTIONS = (selectinload(Task.tags), selectinload(Task.reminders))
+
+
+def detail_query(task_id: str, model: Any = Task) -> Select:
+    """Select one task joined with its tags and reminders.
+
+    The tag joins are written out flat: joinedload() would nest them as
+    ``LEFT JOIN (task_tags JOIN tags)``, which SQLite materializes for every
+    tag link in the database instead of looking up the task's own.
+
+    Args:
+        task_id: Id of the task
+        model: Task, or ArchivedTask to look in the archive
+    """
+    links = archived_task_tags if model is ArchivedTask else task_tags
+    return (
+        select(model)
+        .outerjoin(links, links.c.task_id == model.id)
+        .outerjoin(Tag, Tag.id == links.c.tag_id)
+        .options(contains_eager(model.tags), joinedload(model.reminders))
+        .where(model.id == task_id)
+    )
 
 
 class TaskController:
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        tag_cache: Optional[TagCache] = None,
+        writer: Optional[Writer] = None,
+    ):
         self.session = session
+        # Shared with TagController, which invalidates renamed/deleted tags
+        self.tag_cache = tag_cache if tag_cache is not None else TagCache()
+        # Mutations run as functions of a write session (see utils.writer);
+        # reads use self.session
+        self.writer = writer if writer is not None else InlineWriter(session)
         self.blueprint = Blueprint("tasks", __name__, url_prefix="/tasks")
         self.task_schema = TaskSchema()
         self.tasks_schema = TaskSchema(many=True)
         self.reminder_schema = ReminderSchema()
         self.reminders_schema = ReminderSchema(many=True)
+        # Read endpoints serialize through compiled dumps of the same schemas
+        self.serialize_task = compile_serializer(self.task_schema)
 
         # Route definitions
         self.blueprint.route("/", methods=["POST"])(self.create_task)
@@ -37,83 +108,160 @@ class TaskController:
             self.delete_reminder
         )
 
-    def get_or_create_tags(self, tag_names: list[str]) -> list[Tag]:
-        tags = []
-        for name in tag_names:
-            tag = self.session.query(Tag).filter_by(name=name).first()
-            if not tag:
-                tag = Tag(name=name)
-                self.session.add(tag)
-        # Flush here to ensure tags have IDs if needed
-        self.session.flush()
-        tags = self.session.query(Tag).filter(Tag.name.in_(tag_names)).all()
-        return tags
+    def get_or_create_tags(
+        self, tag_names: list[str], session: Optional[Session] = None
+    ) -> list[Tag]:
+        # Known names come from the cache; the rest are looked up and
+        # created in one go
+        return self.tag_cache.get_tags(
+            session if session is not None else self.session, tag_names
+        )
 
     def create_task(self):
         data = request.json
         if data is None:  # Check if data is not None
             abort(400, description="Invalid input data.")
 
-        tag_names = data.pop("tags", [])
-        tags = self.get_or_create_tags(tag_names)
+        def write(session):
+            tag_names = data.pop("tags", [])
+            tags = self.get_or_create_tags(tag_names, session)
 
-        task = Task(**data)
-        task.tags = tags
+            task = Task(**data)
+            task.tags = tags
 
-        self.session.add(task)
-        self.session.commit()
+            session.add(task)
+            session.commit()
+            return self.task_schema.dump(task)
 
-        return jsonify(self.task_schema.dump(task)), 201
+        return jsonify(self.writer.run(write)), 201
 
     def complete_task(self, task_id: str):
-        task = self.session.get(Task, task_id)
-        if not task:
-            abort(404, description="Task not found.")
+        def write(session):
+            task = session.get(Task, task_id)
+            if not task:
+                abort(404, description="Task not found.")
 
-        task.completed = True
-        self.session.commit()
+            task.completed = True
+            session.commit()
+            return self.task_schema.dump(task)
 
-        return jsonify(self.task_schema.dump(task)), 200
+        return jsonify(self.writer.run(write)), 200
 
     def edit_task(self, task_id: str):
-        task = self.session.get(Task, task_id)
-        if not task:
-            abort(404, description="Task not found.")
-
         data = request.json
-        if data is None:  # Check if data is not None
-            abort(400, description="Invalid input data.")
 
-        tag_names = data.pop("tags", [])
-        if tag_names:  # Check if tag_names is not empty
-            task.tags = self.get_or_create_tags(tag_names)
+        def write(session):
+            task = session.get(Task, task_id)
+            if not task:
+                abort(404, description="Task not found.")
 
-        for key, value in data.items():
-            setattr(task, key, value)
+            if data is None:  # Check if data is not None
+                abort(400, description="Invalid input data.")
 
-        self.session.commit()
-        return jsonify(self.task_schema.dump(task)), 200
+            tag_names = data.pop("tags", [])
+            if tag_names:  # Check if tag_names is not empty
+                task.tags = self.get_or_create_tags(tag_names, session)
 
-    def delete_task(self, task_id: str):
-        task = self.session.get(Task, task_id)
-        if not task:
-            abort(404, description="Task not found.")
+            for key, value in data.items():
+                setattr(task, key, value)
 
-        self.session.delete(task)
-        self.session.commit()
+            session.commit()
+            return self.task_schema.dump(task)
 
+        return jsonify(self.writer.run(write)), 200
+
+    def delete_task(self, task_id: str):
+        def write(session):
+            task = session.get(Task, task_id)
+            if task:
+                session.delete(task)
+            elif not delete_archived_task(session, task_id):
+                abort(404, description="Task not found.")
+            session.commit()
+
+        self.writer.run(write)
         return jsonify({"message": "Task deleted"}), 204
 
     def get_task(self, task_id: str):
-        task = self.session.get(Task, task_id)
+        # Revalidation checks the row version before loading anything;
+        # tasks no longer live may have been archived (see utils.archive)
+        if request.if_none_match:
+            version = row_version(self.session, Task, task_id)
+            if version is None:
+                version = row_version(self.session, ArchivedTask, task_id)
+            if version is None:
+                abort(404, description="Task not found.")
+            response = not_modified(
+                request, make_etag(request, "task", task_id, version)
+            )
+            if response is not None:
+                return response
+
+        task = self.session.execute(detail_query(task_id)).unique().scalar()
+        if not task:
+            task = (
+                self.session.execute(detail_query(task_id, ArchivedTask))
+                .unique()
+                .scalar()
+            )
         if not task:
             abort(404, description="Task not found.")
 
-        return jsonify(self.task_schema.dump(task)), 200
+        response = json_response(self.serialize_task(task))
+        response.set_etag(make_etag(request, "task", task_id, task.version))
+        return response
 
     def list_tasks(self):
-        tasks = self.session.query(Task).all()
-        return jsonify(self.tasks_schema.dump(tasks)), 200
+        stream = wants_ndjson(request)
+        version = collection_version(self.session, TASKS_COLLECTION)
+        etag = None
+        if version is not None:
+            etag = make_etag(
+                request, TASKS_COLLECTION, version, "ndjson" if stream else "json"
+            )
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+
+        response = self.stream_tasks() if stream else self._list_tasks()
+        if etag is not None:
+            response.set_etag(etag)
+        return response
+
+    def _list_tasks(self):
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit", type=int)
+        task_query = self.session.query(Task).options(*LIST_LOAD_OPTIONS)
+
+        # Unpaginated requests keep returning every task
+        if limit is None and not cursor:
+            tasks = task_query.order_by(*created_order_key()).all()
+            return json_response([self.serialize_task(task) for task in tasks])
+
+        try:
+            tasks, next_cursor, _ = keyset_page(
+                task_query,
+                CREATED_ORDER,
+                created_order_key(),
+                limit if limit is not None else 100,
+                cursor=cursor,
+            )
+        except ValueError as e:
+            abort(400, description=str(e))
+
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return json_response(
+            [self.serialize_task(task) for task in tasks], headers=headers
+        )
+
+    def stream_tasks(self):
+        tasks = (
+            self.session.query(Task)
+            .options(*LIST_LOAD_OPTIONS)
+            .order_by(*created_order_key())
+            .yield_per(STREAM_BATCH_SIZE)
+        )
+        return ndjson_response(tasks, self.serialize_task)
 
     def list_task_reminders(self, task_id: str):
         task = self.session.get(Task, task_id)
@@ -124,54 +272,64 @@ class TaskController:
         return jsonify(self.reminders_schema.dump(reminders)), 200
 
     def create_task_reminder(self, task_id: str):
-        task = self.session.get(Task, task_id)
-        if not task:
-            abort(404, description="Task not found.")
+        data = request.json
+
+        def write(session):
+            task = session.get(Task, task_id)
+            if not task:
+                abort(404, description="Task not found.")
+
+            if data.get("remind_at") is not None:
+                if isinstance(data.get("remind_at"), str):
+                    data["remind_at"] = datetime.fromisoformat(
+                        data["remind_at"].replace("Z", "+00:00")
+                    )
+                else:
+                    abort(
+                        400,
+                        description="Invalid remind_at format. Expected ISO 8601 string.",
+                    )
+
+            reminder = Reminder(**data)
+            reminder.task_id = task_id
+            session.add(reminder)
+            session.commit()
+            return self.reminder_schema.dump(reminder)
+
+        return jsonify(self.writer.run(write)), 201
 
+    def update_reminder(self, reminder_id: str):
         data = request.json
-        if data.get("remind_at") is not None:
+
+        def write(session):
+            reminder = session.get(Reminder, reminder_id)
+            if not reminder:
+                abort(404, description="Reminder not found.")
+
+            if data is None:  # Check if data is not None
+                abort(400, description="Invalid input data.")
+
             if isinstance(data.get("remind_at"), str):
                 data["remind_at"] = datetime.fromisoformat(
                     data["remind_at"].replace("Z", "+00:00")
                 )
-            else:
-                abort(
-                    400,
-                    description="Invalid remind_at format. Expected ISO 8601 string.",
-                )
-
-        reminder = Reminder(**data)
-        reminder.task_id = task_id
-        self.session.add(reminder)
-        self.session.commit()
-
-        return jsonify(self.reminder_schema.dump(reminder)), 201
-
-    def update_reminder(self, reminder_id: str):
-        reminder = self.session.get(Reminder, reminder_id)
-        if not reminder:
-            abort(404, description="Reminder not found.")
 
-        data = request.json
-        if data is None:  # Check if data is not None
-            abort(400, description="Invalid input data.")
+            for key, value in data.items():
+                setattr(reminder, key, value)
 
-        if isinstance(data.get("remind_at"), str):
-            data["remind_at"] = datetime.fromisoformat(
-                data["remind_at"].replace("Z", "+00:00")
-            )
-
-        for key, value in data.items():
-            setattr(reminder, key, value)
+            session.commit()
+            return self.reminder_schema.dump(reminder)
 
-        self.session.commit()
-        return jsonify(self.reminder_schema.dump(reminder)), 200
+        return jsonify(self.writer.run(write)), 200
 
     def delete_reminder(self, reminder_id: str):
-        reminder = self.session.get(Reminder, reminder_id)
-        if not reminder:
-            abort(404, description="Reminder not found.")
+        def write(session):
+            reminder = session.get(Reminder, reminder_id)
+            if not reminder:
+                abort(404, description="Reminder not found.")
+
+            session.delete(reminder)
+            session.commit()
 
-        self.session.delete(reminder)
-        self.session.commit()
+        self.writer.run(write)
         return jsonify({"message": "Reminder deleted"}), 204
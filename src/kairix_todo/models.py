@@ -1,19 +1,92 @@
+import re
 import uuid
 from datetime import date, datetime
+from typing import Any
 
 from marshmallow import Schema, fields, post_load
-from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Index, String, Table
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    TypeDecorator,
+    text,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, validates
 
 Base = declarative_base()
 
-# Association table for many-to-many relationship between Task and Tag
+# Canonical UUID strings, the only ids stored compactly
+_CANONICAL_UUID = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+)
+
+
+def compact_uuid(value: Any) -> Any:
+    """Turn a canonical UUID string into its 16 bytes.
+
+    Args:
+        value: Id as stored in text mode
+
+    Returns:
+        The UUID's bytes, or the value unchanged if it is not a lowercase,
+        hyphenated UUID string
+    """
+    if isinstance(value, str) and _CANONICAL_UUID.fullmatch(value):
+        return bytes.fromhex(value.replace("-", ""))
+    return value
+
+
+def expand_uuid(value: Any) -> Any:
+    """Turn 16 UUID bytes back into the canonical string.
+
+    Args:
+        value: Id as stored in compact mode
+
+    Returns:
+        The UUID string, or the value unchanged if it is not 16 bytes
+    """
+    if isinstance(value, bytes) and len(value) == 16:
+        return str(uuid.UUID(bytes=value))
+    return value
+
+
+class UUIDString(TypeDecorator):
+    """UUID primary and foreign keys, always strings in Python.
+
+    Stored as the 36-character string unless the engine uses compact ids
+    (see utils.ids), in which case they are stored as 16-byte blobs. Values
+    read back are strings either way.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Any:
+        if getattr(dialect, "kairix_compact_ids", False):
+            return compact_uuid(value)
+        return value
+
+    def process_result_value(self, value: Any, dialect: Any) -> Any:
+        return expand_uuid(value)
+
+
+# Association table for many-to-many relationship between Task and Tag. The
+# primary key is the table itself (no rowid), so finding a task's tags reads
+# one range of it; the tag_id index does the same for a tag's tasks.
 task_tags = Table(
     "task_tags",
     Base.metadata,
-    Column("task_id", String, ForeignKey("tasks.id")),
-    Column("tag_id", String, ForeignKey("tags.id")),
+    Column("task_id", UUIDString, ForeignKey("tasks.id"), primary_key=True),
+    Column("tag_id", UUIDString, ForeignKey("tags.id"), primary_key=True),
+    Index("idx_task_tags_tag_id", "tag_id"),
+    sqlite_with_rowid=False,
 )
 
 
@@ -23,15 +96,27 @@ class Task(Base):
         Index("idx_task_title", "title"),
         Index("idx_task_due_date", "due_date"),
         Index("idx_task_completed", "completed"),
+        Index("idx_task_created_at", "created_at", "id"),
+        # Open tasks by due date, the most common search
+        Index("idx_task_open_due_date", "due_date", sqlite_where=text("completed = 0")),
+        # Completed tasks due for archival (see utils.archive)
+        Index(
+            "idx_task_completed_at", "completed_at", sqlite_where=text("completed = 1")
+        ),
         {"sqlite_autoincrement": True, "sqlite_with_rowid": True},
     )
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid.uuid4()))
     title = Column(String, nullable=False)
     additional_details = Column(String, nullable=True)
     completed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     due_date = Column(Date, nullable=True)
+    # Set and cleared as the task is completed and reopened; archival picks
+    # tasks by it (see utils.archive)
+    completed_at = Column(DateTime, nullable=True)
+    # Incremented by database triggers on every change (see utils.versioning)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
     # Relationships
     reminders = relationship("Reminder", back_populates="task")
@@ -43,6 +128,14 @@ class Task(Base):
             raise ValueError("Title cannot be empty")
         return value
 
+    @validates("completed")
+    def validate_completed(self, key, value):
+        if not value:
+            self.completed_at = None
+        elif not self.completed:
+            self.completed_at = datetime.utcnow()
+        return value
+
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', completed={self.completed})>"
 
@@ -50,8 +143,9 @@ class Task(Base):
 class Tag(Base):
     __tablename__ = "tags"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String, nullable=False, unique=True)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
     # Relationships
     tasks = relationship("Task", secondary=task_tags, back_populates="tags")
@@ -68,11 +162,16 @@ class Tag(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (
+        Index("idx_reminder_task_id", "task_id"),
+        Index("idx_reminder_remind_at", "remind_at"),
+    )
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    task_id = Column(String, ForeignKey("tasks.id"), nullable=False)
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid.uuid4()))
+    task_id = Column(UUIDString, ForeignKey("tasks.id"), nullable=False)
     remind_at = Column(DateTime, nullable=False)
     completed = Column(Boolean, default=False)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
 
     # Relationships
     task = relationship("Task", back_populates="reminders")
@@ -81,6 +180,55 @@ class Reminder(Base):
         return f"<Reminder(id={self.id}, task_id='{self.task_id}', remind_at='{self.remind_at}')>"
 
 
+# Archive of tasks completed long ago, with their tag links and reminders
+# (see utils.archive). Archived tasks are read-only and have the same
+# attributes as tasks, so they serialize the same way.
+archived_task_tags = Table(
+    "archived_task_tags",
+    Base.metadata,
+    Column("task_id", UUIDString, ForeignKey("archived_tasks.id"), primary_key=True),
+    Column("tag_id", UUIDString, ForeignKey("tags.id"), primary_key=True),
+    Index("idx_archived_task_tags_tag_id", "tag_id"),
+    sqlite_with_rowid=False,
+)
+
+
+class ArchivedTask(Base):
+    __tablename__ = "archived_tasks"
+    __table_args__ = (
+        Index("idx_archived_task_created_at", "created_at", "id"),
+        Index("idx_archived_task_due_date", "due_date"),
+    )
+
+    id = Column(UUIDString, primary_key=True)
+    title = Column(String, nullable=False)
+    additional_details = Column(String, nullable=True)
+    completed = Column(Boolean, default=True)
+    created_at = Column(DateTime)
+    due_date = Column(Date, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+    archived_at = Column(DateTime, nullable=False)
+
+    # Relationships
+    reminders = relationship("ArchivedReminder", viewonly=True)
+    tags = relationship("Tag", secondary=archived_task_tags, viewonly=True)
+
+    def __repr__(self):
+        return f"<ArchivedTask(id={self.id}, title='{self.title}')>"
+
+
+class ArchivedReminder(Base):
+    __tablename__ = "archived_reminders"
+    __table_args__ = (Index("idx_archived_reminder_task_id", "task_id"),)
+
+    id = Column(UUIDString, primary_key=True)
+    task_id = Column(UUIDString, ForeignKey("archived_tasks.id"), nullable=False)
+    remind_at = Column(DateTime, nullable=False)
+    completed = Column(Boolean, default=False)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
+
+
 # Marshmallow schemas for serialization/deserialization
 class TagSchema(Schema):
     id = fields.Str(dump_only=True)
@@ -0,0 +1,335 @@
+"""Hot/cold archival of completed tasks.
+
+Tasks completed long ago are rarely read but still sit in ``tasks`` and its
+indexes, next to the open tasks every listing and search walks through.
+Archival moves them, with their tag links and reminders, into
+``archived_tasks``, ``archived_task_tags`` and ``archived_reminders``, so the
+live tables and their indexes only hold the working set.
+
+Tasks are moved in small batches, each one short transaction through the
+writer, so requests are never blocked for long. The ``Archiver`` runs the
+batches in a background thread; ``archive_completed`` runs them once, e.g.
+from cron through the command below.
+
+Archived tasks stay searchable: a search for completed tasks also returns
+the archived ones (see ``search_utils.search_tasks_page``), and
+``GET /tasks/<id>`` falls back to the archive. They are read-only, except
+that ``DELETE /tasks/<id>`` removes them (see ``delete_archived_task``).
+
+Archival is off unless ``KAIRIX_ARCHIVE_AFTER_DAYS`` is set.
+
+The command works on a database the app has already opened, which creates
+the archive tables.
+
+Usage:
+    PYTHONPATH=src python -m kairix_todo.utils.archive --days 90 instance/tasks.db
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, List, Optional
+
+from sqlalchemy import (
+    DateTime,
+    create_engine,
+    delete,
+    event,
+    insert,
+    literal,
+    select,
+    true,
+)
+from sqlalchemy.orm import sessionmaker
+
+from kairix_todo.models import (
+    ArchivedReminder,
+    ArchivedTask,
+    Reminder,
+    Task,
+    archived_task_tags,
+    task_tags,
+)
+from kairix_todo.utils.fts_utils import ARCHIVE_FTS_TABLE, install_fts_index
+from kairix_todo.utils.ids import resolve_id_storage, use_id_storage
+from kairix_todo.utils.writer import InlineWriter, Writer
+
+ARCHIVE_AFTER_DAYS_ENV = "KAIRIX_ARCHIVE_AFTER_DAYS"
+ARCHIVE_INTERVAL_ENV = "KAIRIX_ARCHIVE_INTERVAL"
+
+# Seconds between archival runs of the Archiver
+DEFAULT_INTERVAL = 3600.0
+
+# Tasks moved per transaction
+ARCHIVE_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+# Deleting a tag removes its links to archived tasks as well; the ORM only
+# knows about the live links. Renaming a tag or removing a link changes the
+# archived tasks' representation, so their versions (and ETags) move on, like
+# the live tasks' do (see utils.versioning).
+_ARCHIVE_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS tags_archive_ad AFTER DELETE ON tags BEGIN
+        DELETE FROM archived_task_tags WHERE tag_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tags_archive_version_au AFTER UPDATE ON tags
+    BEGIN
+        UPDATE archived_tasks SET version = version + 1
+        WHERE id IN (SELECT task_id FROM archived_task_tags WHERE tag_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS archived_task_tags_version_ad
+    AFTER DELETE ON archived_task_tags BEGIN
+        UPDATE archived_tasks SET version = version + 1 WHERE id = old.task_id;
+    END
+    """,
+)
+
+
+def archive_after_days() -> Optional[float]:
+    """Return the archival age selected for this deployment.
+
+    Returns:
+        Value of KAIRIX_ARCHIVE_AFTER_DAYS, or None if unset (archival off)
+    """
+    days = os.environ.get(ARCHIVE_AFTER_DAYS_ENV)
+    return float(days) if days else None
+
+
+def archive_interval() -> float:
+    """Return the seconds between archival runs selected for this deployment.
+
+    Returns:
+        Value of KAIRIX_ARCHIVE_INTERVAL, or DEFAULT_INTERVAL if unset
+    """
+    return float(os.environ.get(ARCHIVE_INTERVAL_ENV, DEFAULT_INTERVAL))
+
+
+def install_archive(connection: Any) -> None:
+    """Install the archive's FTS index and tag trigger if missing.
+
+    Args:
+        connection: SQLAlchemy connection
+    """
+    if connection.dialect.name != "sqlite":
+        return
+
+    for statement in _ARCHIVE_DDL:
+        connection.exec_driver_sql(statement)
+    install_fts_index(connection, ARCHIVE_FTS_TABLE, ArchivedTask.__tablename__)
+
+
+def archive_batch(
+    session: Any, cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """Move one batch of tasks completed before a cutoff to the archive.
+
+    Commits the batch.
+
+    Args:
+        session: SQLAlchemy database session
+        cutoff: Tasks completed before this time are archived
+        batch_size: Most tasks to move
+
+    Returns:
+        Number of tasks moved
+    """
+    ids = (
+        session.execute(
+            select(Task.id)
+            .where(Task.completed == true(), Task.completed_at < cutoff)
+            .order_by(Task.completed_at)
+            .limit(batch_size)
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        return 0
+
+    tasks = Task.__table__
+    reminders = Reminder.__table__
+    archived_at = literal(datetime.utcnow(), DateTime())
+    session.execute(
+        insert(ArchivedTask.__table__).from_select(
+            [column.name for column in tasks.columns] + ["archived_at"],
+            select(*tasks.columns, archived_at).where(tasks.c.id.in_(ids)),
+        )
+    )
+    session.execute(
+        insert(archived_task_tags).from_select(
+            ["task_id", "tag_id"],
+            select(task_tags.c.task_id, task_tags.c.tag_id).where(
+                task_tags.c.task_id.in_(ids)
+            ),
+        )
+    )
+    session.execute(
+        insert(ArchivedReminder.__table__).from_select(
+            [column.name for column in reminders.columns],
+            select(*reminders.columns).where(reminders.c.task_id.in_(ids)),
+        )
+    )
+    session.execute(delete(task_tags).where(task_tags.c.task_id.in_(ids)))
+    session.execute(delete(reminders).where(reminders.c.task_id.in_(ids)))
+    session.execute(delete(tasks).where(tasks.c.id.in_(ids)))
+    session.commit()
+    return len(ids)
+
+
+def delete_archived_task(session: Any, task_id: str) -> bool:
+    """Delete an archived task with its tag links and reminders.
+
+    Does not commit.
+
+    Args:
+        session: SQLAlchemy database session
+        task_id: Id of the archived task
+
+    Returns:
+        True if the task was in the archive
+    """
+    task = session.get(ArchivedTask, task_id)
+    if task is None:
+        return False
+    # The archive relationships are view-only, so nothing cascades
+    session.execute(
+        delete(ArchivedReminder.__table__).where(
+            ArchivedReminder.__table__.c.task_id == task_id
+        )
+    )
+    session.execute(
+        delete(archived_task_tags).where(archived_task_tags.c.task_id == task_id)
+    )
+    session.execute(
+        delete(ArchivedTask.__table__).where(ArchivedTask.__table__.c.id == task_id)
+    )
+    session.expunge(task)
+    return True
+
+
+def archive_completed(
+    writer: Writer,
+    after_days: float,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    now: Optional[datetime] = None,
+    stop: Optional[threading.Event] = None,
+) -> int:
+    """Archive every task completed more than after_days ago.
+
+    Args:
+        writer: Writer to run the batches on
+        after_days: Age of completion after which tasks are archived
+        batch_size: Tasks moved per transaction
+        now: Current time; defaults to the clock
+        stop: Event that ends the run after the current batch
+
+    Returns:
+        Number of tasks moved
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=after_days)
+    moved = 0
+    while stop is None or not stop.is_set():
+        count = writer.run(lambda session: archive_batch(session, cutoff, batch_size))
+        moved += count
+        if count < batch_size:
+            break
+    return moved
+
+
+class Archiver:
+    """Archives completed tasks in a background thread at a fixed interval."""
+
+    def __init__(
+        self,
+        writer: Writer,
+        after_days: float,
+        interval: float = DEFAULT_INTERVAL,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+    ):
+        """Initialize the archiver.
+
+        Args:
+            writer: Writer to run the batches on, shared with the requests
+            after_days: Age of completion after which tasks are archived
+            interval: Seconds between runs
+            batch_size: Tasks moved per transaction
+        """
+        self.writer = writer
+        self.after_days = after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._serve, name="kairix-archiver", daemon=True
+        )
+
+    def start(self) -> None:
+        """Start archiving; the first run starts right away."""
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop after the current batch and wait for the thread to finish.
+
+        Args:
+            timeout: Most seconds to wait
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _serve(self) -> None:
+        while not self._stop.is_set():
+            try:
+                moved = archive_completed(
+                    self.writer, self.after_days, self.batch_size, stop=self._stop
+                )
+                if moved:
+                    logger.info("Archived %d completed tasks", moved)
+            except Exception:
+                logger.exception("Archiving completed tasks failed")
+            self._stop.wait(self.interval)
+
+
+@event.listens_for(archived_task_tags, "after_create")
+def _install_after_create(target: Any, connection: Any, **kwargs: Any) -> None:
+    # Created after archived_tasks and tags, which the trigger and index use
+    install_archive(connection)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("database", help="SQLite database file")
+    parser.add_argument(
+        "--days", type=float, required=True, help="archive tasks completed before"
+    )
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    started = time.perf_counter()
+    try:
+        use_id_storage(engine, resolve_id_storage(engine))
+        session = sessionmaker(bind=engine)()
+        try:
+            moved = archive_completed(
+                InlineWriter(session), args.days, batch_size=args.batch_size
+            )
+        finally:
+            session.close()
+    finally:
+        engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"Archived {moved} tasks in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""Serve a WSGI application over ASGI.
+
+Under a threaded WSGI server every open connection holds a thread, including
+connections that are still sending their request or sit idle between
+requests. ``AsgiAdapter`` keeps all connection handling on the event loop:
+the request body is received asynchronously, and only the view itself runs
+on a bounded pool of worker threads. The response is handed back to the
+event loop chunk by chunk, so streamed responses are sent as they are
+produced and a slow reader holds back its own worker only.
+
+Bodies up to ``BODY_BUFFER_SIZE`` arrive in full before the view starts.
+Larger ones are streamed to the view through a bounded queue, so an upload
+such as ``POST /tasks/import`` is never held in memory as a whole. Bodies
+over the adapter's ``max_body_size`` get a 413.
+
+The Flask views, models and response shapes are unchanged; this is a
+transport, not a second implementation of the API.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Union
+
+from werkzeug.exceptions import ClientDisconnected, RequestEntityTooLarge
+
+# Views running at once; connections waiting for their request or for a
+# worker cost no thread
+DEFAULT_WORKERS = 32
+
+# Largest request body accepted, in bytes
+DEFAULT_MAX_BODY_SIZE = 256 * 1024 * 1024
+
+# Bodies up to this many bytes are received in full before the view runs
+BODY_BUFFER_SIZE = 1024 * 1024
+
+# Body chunks received ahead of a view reading a streamed body
+BODY_QUEUE_CHUNKS = 16
+
+Message = Dict[str, Any]
+Receive = Callable[[], Any]
+Send = Callable[[Message], Any]
+
+
+class BodyStream(io.RawIOBase):
+    """Request body read by a worker thread as the event loop receives it."""
+
+    def __init__(
+        self, head: bytes, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop
+    ):
+        """Initialize the stream.
+
+        Args:
+            head: Body bytes received before the view started
+            queue: Further body chunks, then None at the end or an exception
+            loop: Event loop filling the queue
+        """
+        self._buffer = head
+        self._queue = queue
+        self._loop = loop
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._buffer and not self._done:
+            chunk = asyncio.run_coroutine_threadsafe(
+                self._queue.get(), self._loop
+            ).result()
+            if isinstance(chunk, Exception):
+                self._done = True
+                raise chunk
+            if chunk is None:
+                self._done = True
+            else:
+                self._buffer = chunk
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def build_environ(
+    scope: Dict[str, Any], body: Union[bytes, BinaryIO]
+) -> Dict[str, Any]:
+    """Build the WSGI environ for an ASGI HTTP request.
+
+    Args:
+        scope: ASGI connection scope
+        body: Complete request body, or a stream of a body still arriving
+
+    Returns:
+        WSGI environ
+    """
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": str(client[0]),
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body) if isinstance(body, bytes) else body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    if isinstance(body, bytes):
+        # The body is already complete; chunked uploads have no Content-Length
+        environ["CONTENT_LENGTH"] = str(len(body))
+    else:
+        # The stream ends with the body, whether or not its length was given
+        environ["wsgi.input_terminated"] = True
+    return environ
+
+
+class AsgiAdapter:
+    """ASGI application running a WSGI application on worker threads."""
+
+    def __init__(
+        self,
+        wsgi_app: Callable[..., Iterable[bytes]],
+        workers: int = DEFAULT_WORKERS,
+        on_shutdown: Optional[List[Callable[[], None]]] = None,
+        max_body_size: int = DEFAULT_MAX_BODY_SIZE,
+    ):
+        """Initialize the adapter.
+
+        Args:
+            wsgi_app: WSGI application to serve
+            workers: Most views running at once
+            on_shutdown: Functions called when the server shuts down
+            max_body_size: Largest request body accepted, in bytes
+        """
+        self.wsgi_app = wsgi_app
+        self.on_shutdown = list(on_shutdown or [])
+        self.max_body_size = max_body_size
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="kairix-asgi")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send):
+        """Handle one ASGI connection."""
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+
+    async def _http(self, scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+        length = dict(scope.get("headers", [])).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_body_size:
+            await self._send_too_large(send)
+            return
+
+        # Receive a small body in full before taking a worker
+        chunks: List[bytes] = []
+        received = 0
+        more_body = True
+        while more_body and received < BODY_BUFFER_SIZE:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return  # Client went away before sending the whole request
+            chunk = message.get("body", b"")
+            chunks.append(chunk)
+            received += len(chunk)
+            more_body = message.get("more_body", False)
+            if received > self.max_body_size:
+                await self._send_too_large(send)
+                return
+
+        loop = asyncio.get_running_loop()
+        if not more_body:
+            await loop.run_in_executor(
+                self._executor,
+                self._run,
+                build_environ(scope, b"".join(chunks)),
+                loop,
+                send,
+            )
+            return
+
+        # Stream the rest; the queue bounds what is held for a slow view
+        queue: asyncio.Queue = asyncio.Queue(BODY_QUEUE_CHUNKS)
+        pump = asyncio.ensure_future(self._pump_body(receive, queue, received))
+        body = BodyStream(b"".join(chunks), queue, loop)
+        try:
+            await loop.run_in_executor(
+                self._executor, self._run, build_environ(scope, body), loop, send
+            )
+        finally:
+            pump.cancel()
+
+    async def _pump_body(
+        self, receive: Receive, queue: asyncio.Queue, received: int
+    ) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                await queue.put(ClientDisconnected())
+                return
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > self.max_body_size:
+                await queue.put(RequestEntityTooLarge())
+                return
+            if chunk:
+                await queue.put(chunk)
+            if not message.get("more_body", False):
+                await queue.put(None)
+                return
+
+    async def _send_too_large(self, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"text/plain"),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"Request body too large",
+                "more_body": False,
+            }
+        )
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                loop = asyncio.get_running_loop()
+                for callback in self.on_shutdown:
+                    await loop.run_in_executor(self._executor, callback)
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _run(
+        self, environ: Dict[str, Any], loop: asyncio.AbstractEventLoop, send: Send
+    ) -> None:
+        # Runs on a worker thread. Every message goes through the event loop
+        # and the thread waits until it is sent, so a slow client slows down
+        # only its own response.
+        def emit(message: Message) -> None:
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response: Dict[str, Any] = {}
+
+        def start_response(status: str, headers: Any, exc_info: Any = None) -> Any:
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+            return write
+
+        def send_start() -> None:
+            if not response.get("started"):
+                response["started"] = True
+                emit(
+                    {
+                        "type": "http.response.start",
+                        "status": response["status"],
+                        "headers": response["headers"],
+                    }
+                )
+
+        def write(data: bytes) -> None:
+            send_start()
+            emit({"type": "http.response.body", "body": data, "more_body": True})
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    write(chunk)
+            send_start()
+            emit({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
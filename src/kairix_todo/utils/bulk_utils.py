@@ -0,0 +1,428 @@
+"""Set-based bulk writes for tasks.
+
+Creating tasks one ORM object at a time costs a tag lookup per tag name, a
+flush and a re-query per task. The functions here validate a whole batch up
+front and then write it with a handful of statements: one ``IN`` query for
+all tag names, one multi-row insert for the missing tags, and executemany
+inserts for the tasks and their ``task_tags`` rows.
+
+Changes to existing tasks (complete, re-tag, delete) run as UPDATE/DELETE
+statements over chunks of task ids, committing after each chunk so that no
+single transaction holds SQLite's write lock for long, however many tasks
+are affected.
+"""
+
+import uuid
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, exists, insert, literal, select, update
+
+from kairix_todo.models import Reminder, Tag, Task, task_tags
+from kairix_todo.utils.search_utils import build_search_query
+from kairix_todo.utils.tag_index import TagIndex
+from kairix_todo.utils.writer import InlineWriter, Writer
+
+# Largest number of items accepted by one bulk request
+BULK_MAX_ITEMS = 10000
+
+# Bound parameters per IN list / multi-row VALUES, well below SQLite's limit
+_PARAM_CHUNK = 500
+
+# Tasks changed per transaction by the chunked bulk updates and deletes
+BULK_CHUNK_SIZE = 500
+
+# Search criteria accepted as a bulk filter (see build_search_query)
+FILTER_FIELDS = (
+    "q",
+    "match_mode",
+    "from_date",
+    "to_date",
+    "completed",
+    "tags",
+    "tags_operator",
+)
+
+_TASK_FIELDS = ("title", "additional_details", "completed", "due_date", "tags")
+
+
+def _chunks(values: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def validate_task_item(item: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """Check one bulk item and convert it into a ``tasks`` row.
+
+    Args:
+        item: Decoded JSON object describing a task
+
+    Returns:
+        Tuple of (row values without id, tag names)
+
+    Raises:
+        ValueError: If the item is not a valid task
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Expected a JSON object.")
+
+    unknown = sorted(set(item) - set(_TASK_FIELDS))
+    if unknown:
+        raise ValueError("Unknown fields: " + ", ".join(unknown))
+
+    title = item.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("Title cannot be empty")
+
+    details = item.get("additional_details")
+    if details is not None and not isinstance(details, str):
+        raise ValueError("additional_details must be a string.")
+
+    completed = item.get("completed", False)
+    if not isinstance(completed, bool):
+        raise ValueError("completed must be a boolean.")
+
+    due_date = item.get("due_date")
+    if due_date is not None:
+        try:
+            due_date = date.fromisoformat(due_date)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid due_date format. Expected YYYY-MM-DD.")
+
+    tag_names = item.get("tags") or []
+    if not isinstance(tag_names, list) or not all(
+        isinstance(name, str) and name.strip() for name in tag_names
+    ):
+        raise ValueError("tags must be a list of non-empty names.")
+
+    row = {
+        "title": title,
+        "additional_details": details,
+        "completed": completed,
+        "completed_at": datetime.utcnow() if completed else None,
+        "due_date": due_date,
+    }
+    # dict.fromkeys drops repeated names but keeps their order
+    return row, list(dict.fromkeys(tag_names))
+
+
+def resolve_tag_ids(session: Any, names: Iterable[str]) -> Dict[str, str]:
+    """Map tag names to ids, creating the tags that do not exist yet.
+
+    Does not commit.
+
+    Args:
+        session: SQLAlchemy database session
+        names: Tag names
+
+    Returns:
+        Dict mapping every given name to its tag id
+    """
+    names = list(dict.fromkeys(names))
+    tag_ids: Dict[str, str] = {}
+    for chunk in _chunks(names, _PARAM_CHUNK):
+        tag_ids.update(
+            session.execute(select(Tag.name, Tag.id).where(Tag.name.in_(chunk))).all()
+        )
+
+    missing = [name for name in names if name not in tag_ids]
+    if not missing:
+        return tag_ids
+
+    new_tags = [{"id": str(uuid.uuid4()), "name": name} for name in missing]
+    inserted = 0
+    for chunk in _chunks(new_tags, _PARAM_CHUNK // 2):
+        result = session.execute(
+            insert(Tag.__table__).prefix_with("OR IGNORE").values(chunk)
+        )
+        inserted += result.rowcount
+
+    if inserted == len(new_tags):
+        tag_ids.update((tag["name"], tag["id"]) for tag in new_tags)
+    else:
+        # Another writer created some of the tags since the lookup
+        for chunk in _chunks(missing, _PARAM_CHUNK):
+            tag_ids.update(
+                session.execute(
+                    select(Tag.name, Tag.id).where(Tag.name.in_(chunk))
+                ).all()
+            )
+    return tag_ids
+
+
+def bulk_create_tasks(session: Any, items: List[Any]) -> List[Dict[str, Any]]:
+    """Validate and insert a batch of tasks in one transaction.
+
+    Invalid items are reported and skipped; the valid ones are inserted
+    together and committed once.
+
+    Args:
+        session: SQLAlchemy database session
+        items: Decoded JSON objects, each shaped like a ``POST /tasks`` body
+
+    Returns:
+        One result per item, in order: ``{"index": i, "id": task_id}`` for
+        created tasks, ``{"index": i, "error": message}`` for rejected ones
+    """
+    results: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    row_tags: List[List[str]] = []
+
+    for index, item in enumerate(items):
+        try:
+            row, tag_names = validate_task_item(item)
+        except ValueError as e:
+            results.append({"index": index, "error": str(e)})
+            continue
+        row["id"] = str(uuid.uuid4())
+        rows.append(row)
+        row_tags.append(tag_names)
+        results.append({"index": index, "id": row["id"]})
+
+    if not rows:
+        return results
+
+    try:
+        tag_ids = resolve_tag_ids(
+            session, (name for names in row_tags for name in names)
+        )
+        session.execute(insert(Task.__table__), rows)
+        links = [
+            {"task_id": row["id"], "tag_id": tag_ids[name]}
+            for row, names in zip(rows, row_tags)
+            for name in names
+        ]
+        if links:
+            session.execute(insert(task_tags), links)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    return results
+
+
+def select_task_ids(
+    session: Any,
+    ids: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    tag_index: Optional[TagIndex] = None,
+) -> List[str]:
+    """Resolve the tasks targeted by a bulk change.
+
+    Exactly one of ids and filters must be given.
+
+    Args:
+        session: SQLAlchemy database session
+        ids: Task ids; ids of tasks that do not exist are dropped
+        filters: Search criteria with the same names as the search endpoint
+            parameters (tags as a list); at least one is required
+        tag_index: Posting index for the tag filter
+
+    Returns:
+        Ids of the existing tasks that match
+
+    Raises:
+        ValueError: If the selector or one of its criteria is invalid
+    """
+    if (ids is None) == (filters is None):
+        raise ValueError("Expected either ids or filter.")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, str) for i in ids):
+            raise ValueError("ids must be a list of task ids.")
+        found: List[str] = []
+        for chunk in _chunks(list(dict.fromkeys(ids)), _PARAM_CHUNK):
+            found.extend(
+                session.execute(select(Task.id).where(Task.id.in_(chunk))).scalars()
+            )
+        return found
+
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError("filter must have at least one criterion.")
+    unknown = sorted(set(filters) - set(FILTER_FIELDS))
+    if unknown:
+        raise ValueError("Unknown filter fields: " + ", ".join(unknown))
+
+    criteria = dict(filters)
+    for name in ("from_date", "to_date"):
+        if criteria.get(name) is not None:
+            try:
+                criteria[name] = date.fromisoformat(criteria[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid {name} format. Expected YYYY-MM-DD.")
+    if criteria.get("completed") is not None and not isinstance(
+        criteria["completed"], bool
+    ):
+        raise ValueError("completed must be a boolean.")
+    tags = criteria.get("tags")
+    if tags is not None and (
+        not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags)
+    ):
+        raise ValueError("tags must be a list of names.")
+
+    task_query, _, _ = build_search_query(
+        session,
+        query=criteria.get("q"),
+        from_date=criteria.get("from_date"),
+        to_date=criteria.get("to_date"),
+        completed=criteria.get("completed"),
+        match_mode=criteria.get("match_mode", "all"),
+        tags=tags,
+        tags_operator=criteria.get("tags_operator", "AND"),
+        tag_index=tag_index,
+    )
+    return [task_id for (task_id,) in task_query.with_entities(Task.id)]
+
+
+def _run_chunked(
+    writer: Writer,
+    task_ids: Sequence[str],
+    chunk_size: int,
+    apply: Callable[[Any, List[str]], int],
+) -> int:
+    """Apply a change to task ids chunk by chunk, one transaction each.
+
+    Each chunk is a separate write, so other writes queued on a serialized
+    writer get their turn in between. A failure rolls back the current
+    chunk only; earlier chunks stay committed.
+    """
+    affected = 0
+    for chunk in _chunks(list(task_ids), chunk_size):
+
+        def write(session: Any, chunk: List[str] = chunk) -> int:
+            count = apply(session, chunk)
+            session.commit()
+            return count
+
+        affected += writer.run(write)
+    return affected
+
+
+def bulk_complete(
+    session: Any,
+    task_ids: Sequence[str],
+    completed: bool = True,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    writer: Optional[Writer] = None,
+) -> int:
+    """Set the completion status of many tasks.
+
+    Tasks already in that state are left untouched.
+
+    Args:
+        session: SQLAlchemy database session
+        task_ids: Ids of the tasks to change
+        completed: New completion status
+        chunk_size: Tasks updated per transaction
+        writer: Writer to run the chunks on; defaults to writing on session
+
+    Returns:
+        Number of tasks changed
+    """
+    tasks = Task.__table__
+
+    def apply(session: Any, chunk: List[str]) -> int:
+        return session.execute(
+            update(tasks)
+            .where(tasks.c.id.in_(chunk), tasks.c.completed.is_not(completed))
+            .values(
+                completed=completed,
+                completed_at=datetime.utcnow() if completed else None,
+            )
+        ).rowcount
+
+    return _run_chunked(writer or InlineWriter(session), task_ids, chunk_size, apply)
+
+
+def bulk_retag(
+    session: Any,
+    task_ids: Sequence[str],
+    add: Sequence[str] = (),
+    remove: Sequence[str] = (),
+    chunk_size: int = BULK_CHUNK_SIZE,
+    writer: Optional[Writer] = None,
+) -> Tuple[int, int]:
+    """Add tags to and remove tags from many tasks.
+
+    Tags to add are created if needed; tags already on a task are not
+    duplicated.
+
+    Args:
+        session: SQLAlchemy database session
+        task_ids: Ids of the tasks to change
+        add: Names of tags to add
+        remove: Names of tags to remove
+        chunk_size: Tasks updated per transaction
+        writer: Writer to run the changes on; defaults to writing on session
+
+    Returns:
+        Tuple of (tag links added, tag links removed)
+    """
+    writer = writer or InlineWriter(session)
+    add_ids: List[str] = []
+    if add:
+        add_ids = list(
+            writer.run(lambda session: resolve_tag_ids(session, add)).values()
+        )
+    remove_ids: List[str] = []
+    if remove:
+        remove_ids = list(
+            session.execute(select(Tag.id).where(Tag.name.in_(list(remove)))).scalars()
+        )
+
+    added = 0
+    removed = 0
+
+    def apply(session: Any, chunk: List[str]) -> int:
+        nonlocal added, removed
+        if remove_ids:
+            removed += session.execute(
+                delete(task_tags).where(
+                    task_tags.c.task_id.in_(chunk), task_tags.c.tag_id.in_(remove_ids)
+                )
+            ).rowcount
+        for tag_id in add_ids:
+            already_tagged = exists().where(
+                and_(task_tags.c.task_id == Task.id, task_tags.c.tag_id == tag_id)
+            )
+            added += session.execute(
+                insert(task_tags).from_select(
+                    ["task_id", "tag_id"],
+                    select(Task.id, literal(tag_id, Tag.id.type)).where(
+                        Task.id.in_(chunk), ~already_tagged
+                    ),
+                )
+            ).rowcount
+        return 0
+
+    _run_chunked(writer, task_ids, chunk_size, apply)
+    return added, removed
+
+
+def bulk_delete(
+    session: Any,
+    task_ids: Sequence[str],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    writer: Optional[Writer] = None,
+) -> int:
+    """Delete many tasks together with their reminders and tag links.
+
+    Args:
+        session: SQLAlchemy database session
+        task_ids: Ids of the tasks to delete
+        chunk_size: Tasks deleted per transaction
+        writer: Writer to run the chunks on; defaults to writing on session
+
+    Returns:
+        Number of tasks deleted
+    """
+    tasks = Task.__table__
+    reminders = Reminder.__table__
+
+    def apply(session: Any, chunk: List[str]) -> int:
+        session.execute(delete(task_tags).where(task_tags.c.task_id.in_(chunk)))
+        session.execute(delete(reminders).where(reminders.c.task_id.in_(chunk)))
+        return session.execute(delete(tasks).where(tasks.c.id.in_(chunk))).rowcount
+
+    return _run_chunked(writer or InlineWriter(session), task_ids, chunk_size, apply)
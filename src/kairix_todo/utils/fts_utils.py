@@ -0,0 +1,193 @@
+"""SQLite FTS5 index over task titles and additional details."""
+
+import re
+import weakref
+from collections import defaultdict
+from typing import Any, DefaultDict, Optional, Tuple
+
+from sqlalchemy import event, text
+
+from kairix_todo.models import Task
+
+FTS_TABLE = "tasks_fts"
+# Same index over archived tasks (see utils.archive)
+ARCHIVE_FTS_TABLE = "archived_tasks_fts"
+
+MATCH_MODES = ("all", "any", "phrase")
+
+
+# External-content FTS5 table: the text lives only in the content table and
+# the index is keyed on its rowid, kept in sync by the triggers below.
+def _fts_ddl(fts_table: str, content_table: str) -> Tuple[str, ...]:
+    return (
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+            title, additional_details, content='{content_table}',
+            content_rowid='rowid'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ai
+        AFTER INSERT ON {content_table} BEGIN
+            INSERT INTO {fts_table}(rowid, title, additional_details)
+            VALUES (new.rowid, new.title, new.additional_details);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_ad
+        AFTER DELETE ON {content_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, title, additional_details)
+            VALUES ('delete', old.rowid, old.title, old.additional_details);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts_table}_au
+        AFTER UPDATE OF title, additional_details ON {content_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, title, additional_details)
+            VALUES ('delete', old.rowid, old.title, old.additional_details);
+            INSERT INTO {fts_table}(rowid, title, additional_details)
+            VALUES (new.rowid, new.title, new.additional_details);
+        END
+        """,
+    )
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Engines known to have each FTS table; negative results are not cached so
+# an index installed later is picked up without a restart.
+_indexed_engines: "DefaultDict[str, weakref.WeakSet[Any]]" = defaultdict(
+    weakref.WeakSet
+)
+
+
+def fts5_available(connection: Any) -> bool:
+    """Check whether the SQLite library behind a connection includes FTS5.
+
+    Args:
+        connection: SQLAlchemy connection
+
+    Returns:
+        True if FTS5 virtual tables can be created
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    return bool(
+        connection.execute(
+            text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        ).scalar()
+    )
+
+
+def install_fts_index(
+    connection: Any, fts_table: str = FTS_TABLE, content_table: str = "tasks"
+) -> bool:
+    """Create the FTS table and its sync triggers if they do not exist yet.
+
+    A newly created index is populated from the rows already in the content
+    table, so this is safe to run against an existing database.
+
+    Args:
+        connection: SQLAlchemy connection
+        fts_table: Name of the FTS table
+        content_table: Table whose title and details are indexed
+
+    Returns:
+        True if the FTS index is available after the call
+    """
+    if not fts5_available(connection):
+        return False
+
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": fts_table},
+    ).scalar()
+
+    for statement in _fts_ddl(fts_table, content_table):
+        connection.exec_driver_sql(statement)
+
+    if not exists:
+        rebuild_fts_index(connection, fts_table)
+
+    return True
+
+
+def rebuild_fts_index(connection: Any, fts_table: str = FTS_TABLE) -> None:
+    """Rebuild an FTS index from the contents of its content table.
+
+    Needed after a ``VACUUM``, which may renumber the implicit rowids the
+    index is keyed on.
+
+    Args:
+        connection: SQLAlchemy connection
+        fts_table: Name of the FTS table
+    """
+    connection.exec_driver_sql(
+        f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"
+    )
+
+
+def has_fts_index(session: Any, fts_table: str = FTS_TABLE) -> bool:
+    """Check whether the database behind a session has an FTS index.
+
+    Args:
+        session: SQLAlchemy database session
+        fts_table: Name of the FTS table
+
+    Returns:
+        True if text search can use the FTS index
+    """
+    engine = session.get_bind()
+    if engine in _indexed_engines[fts_table]:
+        return True
+    if engine.dialect.name != "sqlite":
+        return False
+
+    exists = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": fts_table},
+    ).scalar()
+    if exists:
+        _indexed_engines[fts_table].add(engine)
+    return bool(exists)
+
+
+def build_match_expression(query: str, match_mode: str = "all") -> Optional[str]:
+    """Turn free text into a safe FTS5 MATCH expression.
+
+    Words are extracted from the text and quoted, so FTS5 operators typed by
+    the user are treated as plain text.
+
+    Args:
+        query: Free text entered by the user
+        match_mode: "all" to require every word, "any" to require at least one
+            word, or "phrase" to require the words in order
+
+    Returns:
+        The MATCH expression, or None if the text contains no words
+
+    Raises:
+        ValueError: If match_mode is not supported
+    """
+    if match_mode not in MATCH_MODES:
+        raise ValueError(
+            f"Invalid match mode '{match_mode}'. Expected one of: "
+            + ", ".join(MATCH_MODES)
+        )
+
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+
+    if match_mode == "phrase":
+        return '"' + " ".join(tokens) + '"'
+
+    # Prefix terms keep "meet" matching "meeting", close to the substring
+    # behaviour of the LIKE fallback.
+    terms = [f'"{token}"*' for token in tokens]
+    return (" OR " if match_mode == "any" else " AND ").join(terms)
+
+
+@event.listens_for(Task.__table__, "after_create")
+def _install_after_create(target: Any, connection: Any, **kwargs: Any) -> None:
+    install_fts_index(connection)
@@ -0,0 +1,89 @@
+"""Process-wide data generation counter used to invalidate read caches.
+
+Every commit of a session that wrote something bumps the generation, so a
+cached value tagged with an older generation is known to be stale. The
+counter is per process; other workers' writes are not seen.
+"""
+
+import threading
+from typing import Any
+
+from sqlalchemy import TextClause, event
+from sqlalchemy.orm import Session
+
+_WROTE_KEY = "kairix_wrote"
+
+_lock = threading.Lock()
+_generation = 0
+
+
+def current_generation() -> int:
+    """Return the current data generation."""
+    return _generation
+
+
+def bump_generation() -> int:
+    """Advance the data generation, invalidating everything cached before.
+
+    Returns:
+        The new generation
+    """
+    global _generation
+    with _lock:
+        _generation += 1
+        return _generation
+
+
+def has_uncommitted_writes(session: Any) -> bool:
+    """Check whether a session has written anything it has not committed yet.
+
+    Args:
+        session: SQLAlchemy database session
+
+    Returns:
+        True if the session has pending changes or flushed but uncommitted
+        writes
+    """
+    return bool(
+        session.info.get(_WROTE_KEY) or session.new or session.dirty or session.deleted
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush(session: Session, flush_context: Any) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+def _is_write(orm_execute_state: Any) -> bool:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        return True
+    statement = orm_execute_state.statement
+    if isinstance(statement, TextClause):
+        return not statement.text.lstrip()[:6].upper().startswith("SELECT")
+    return False
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_execute(orm_execute_state: Any) -> None:
+    # Bulk INSERT/UPDATE/DELETE statements bypass the flush
+    if _is_write(orm_execute_state):
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_on_commit(session: Session) -> None:
+    # Releasing a savepoint fires after_commit too, before anything is
+    # visible to other connections
+    if session.in_nested_transaction():
+        return
+    if session.info.pop(_WROTE_KEY, False):
+        bump_generation()
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_on_rollback(session: Session) -> None:
+    session.info.pop(_WROTE_KEY, None)
@@ -0,0 +1,212 @@
+"""Id storage modes and the migration between them.
+
+Task, tag and reminder ids are UUIDs, and they are repeated in every
+foreign key: ``task_tags`` holds two per row, ``reminders`` one more, and
+each id is also a key of the primary key index it lives in. Stored as text
+an id takes 36 bytes plus a length byte; stored as a blob it takes 16.
+
+Modes:
+    ``text``: ids stored as their 36-character strings
+    ``compact``: ids stored as 16-byte blobs, so tables, indexes and the
+        keys compared in joins shrink, and more of them fit in the page cache
+
+The API and the Python code speak string ids in both modes; the
+``UUIDString`` column type converts on the way in and out. A database's
+mode is read from its rows, so an existing database keeps working after
+it has been migrated. ``KAIRIX_ID_STORAGE`` picks the mode of a new
+database and, when set, must match the mode of an existing one.
+
+Usage:
+    PYTHONPATH=src python -m kairix_todo.utils.ids --to compact instance/tasks.db
+"""
+
+import argparse
+import os
+import time
+from typing import Any, List, Optional
+
+from sqlalchemy import create_engine, text
+
+from kairix_todo.models import compact_uuid, expand_uuid
+from kairix_todo.utils.tag_index import LOG_TABLE
+
+ID_STORAGE_ENV = "KAIRIX_ID_STORAGE"
+TEXT_IDS = "text"
+COMPACT_IDS = "compact"
+ID_STORAGES = (TEXT_IDS, COMPACT_IDS)
+
+# Every column holding a task, tag or reminder id
+ID_COLUMNS = (
+    ("tasks", "id"),
+    ("tags", "id"),
+    ("reminders", "id"),
+    ("reminders", "task_id"),
+    ("task_tags", "task_id"),
+    ("task_tags", "tag_id"),
+    (LOG_TABLE, "tag_id"),
+    ("archived_tasks", "id"),
+    ("archived_reminders", "id"),
+    ("archived_reminders", "task_id"),
+    ("archived_task_tags", "task_id"),
+    ("archived_task_tags", "tag_id"),
+)
+
+
+def id_storage_name() -> Optional[str]:
+    """Return the id storage selected for this deployment.
+
+    Returns:
+        Value of KAIRIX_ID_STORAGE, or None if unset
+    """
+    return os.environ.get(ID_STORAGE_ENV)
+
+
+def _check_mode(name: str) -> None:
+    if name not in ID_STORAGES:
+        raise ValueError(
+            f"Unknown id storage '{name}'. Expected one of: " + ", ".join(ID_STORAGES)
+        )
+
+
+def _table_exists(connection: Any, table: str) -> bool:
+    return bool(
+        connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": table},
+        ).scalar()
+    )
+
+
+def stored_id_storage(connection: Any) -> Optional[str]:
+    """Tell how a database stores its ids, from its first task or tag.
+
+    Args:
+        connection: SQLAlchemy connection
+
+    Returns:
+        TEXT_IDS or COMPACT_IDS, or None if the database has no tasks or tags
+    """
+    if connection.dialect.name != "sqlite":
+        return None
+    for table in ("tasks", "tags"):
+        if not _table_exists(connection, table):
+            continue
+        kind = connection.execute(
+            text(f"SELECT typeof(id) FROM {table} ORDER BY rowid LIMIT 1")
+        ).scalar()
+        if kind is not None:
+            return COMPACT_IDS if kind == "blob" else TEXT_IDS
+    return None
+
+
+def resolve_id_storage(engine: Any, configured: Optional[str] = None) -> str:
+    """Decide the id storage of a database.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+        configured: Mode asked for, or None to follow the database
+
+    Returns:
+        The database's mode; for an empty database, the configured mode or
+        TEXT_IDS
+
+    Raises:
+        ValueError: If the configured mode is unknown or differs from the
+            mode the database already uses
+    """
+    if configured is not None:
+        _check_mode(configured)
+    with engine.connect() as connection:
+        stored = stored_id_storage(connection)
+    if stored is None:
+        return configured or TEXT_IDS
+    if configured is not None and configured != stored:
+        raise ValueError(
+            f"The database stores {stored} ids but {ID_STORAGE_ENV} is "
+            f"'{configured}'. Migrate it first with: "
+            f"python -m kairix_todo.utils.ids --to {configured} <database>"
+        )
+    return stored
+
+
+def use_id_storage(engine: Any, name: str) -> None:
+    """Make an engine read and write ids in a storage mode.
+
+    Every engine on the same database must use the same mode.
+
+    Args:
+        engine: SQLAlchemy engine
+        name: Id storage mode
+
+    Raises:
+        ValueError: If the mode does not exist
+    """
+    _check_mode(name)
+    # Read by UUIDString when binding parameters
+    engine.dialect.kairix_compact_ids = name == COMPACT_IDS
+
+
+def migrate_id_storage(engine: Any, name: str, vacuum: bool = True) -> int:
+    """Rewrite every id of a database in a storage mode.
+
+    Runs in one transaction, so a failure leaves the database as it was.
+    The app must not be running against the database meanwhile. Version
+    counters of the rewritten rows are bumped by the usual triggers, which
+    only makes clients refetch them once.
+
+    Args:
+        engine: SQLAlchemy engine of an SQLite database
+        name: Id storage mode to migrate to
+        vacuum: Rebuild the file afterwards, so the space freed is returned
+            to the filesystem and the indexes are packed again
+
+    Returns:
+        Number of values rewritten
+
+    Raises:
+        ValueError: If the mode does not exist
+    """
+    _check_mode(name)
+    convert = compact_uuid if name == COMPACT_IDS else expand_uuid
+    # A blob only becomes text, and text only a blob, so running the same
+    # migration again rewrites nothing
+    kind = "text" if name == COMPACT_IDS else "blob"
+
+    rewritten = 0
+    with engine.begin() as connection:
+        connection.connection.driver_connection.create_function(
+            "kairix_convert_id", 1, convert, deterministic=True
+        )
+        for table, column in ID_COLUMNS:
+            if not _table_exists(connection, table):
+                continue
+            rewritten += connection.exec_driver_sql(
+                f"UPDATE {table} SET {column} = kairix_convert_id({column}) "
+                f"WHERE typeof({column}) = '{kind}'"
+            ).rowcount
+    if vacuum:
+        with engine.connect() as connection:
+            connection.execution_options(isolation_level="AUTOCOMMIT")
+            connection.exec_driver_sql("VACUUM")
+    return rewritten
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("database", help="SQLite database file")
+    parser.add_argument("--to", choices=ID_STORAGES, default=COMPACT_IDS)
+    parser.add_argument("--no-vacuum", action="store_true")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    started = time.perf_counter()
+    try:
+        rewritten = migrate_id_storage(engine, args.to, vacuum=not args.no_vacuum)
+    finally:
+        engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"Rewrote {rewritten} ids as {args.to} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Request and SQL metrics in the Prometheus text format.
+
+Every request routed to a view is measured: latency, response size, and the
+number and total duration of the SQL statements it ran, each labelled with
+the endpoint (the view's name, not the URL, so ids do not create new
+series). An in-flight gauge shows the requests being served right now.
+Streamed responses are recorded when the server closes them, so they count
+their full duration, size and queries.
+
+SQL statements are attributed through a context variable holding the
+current request's counters; statements run by the serialized writer on
+behalf of a request are counted for that request too. Recording is a few
+dictionary and list operations under a lock, with no I/O on the request
+path.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, request
+from sqlalchemy import event
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)  # fmt: skip
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# Label for requests that matched no route, so unknown URLs share a series
+UNMATCHED_ENDPOINT = "unmatched"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Histogram with fixed buckets and one series per label combination."""
+
+    def __init__(
+        self, name: str, help_text: str, labels: Sequence[str], buckets: Iterable[float]
+    ):
+        """Initialize an empty histogram.
+
+        Args:
+            name: Metric name
+            help_text: Description shown in the HELP line
+            labels: Label names
+            buckets: Upper bounds of the buckets, ascending
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        """Record one value.
+
+        Args:
+            labels: Label values, in the order of the label names
+            value: Observed value
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> Iterator[str]:
+        """Yield the metric's lines in the Prometheus text format."""
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {
+                labels: (list(counts), count, total)
+                for labels, (counts, count, total) in self._series.items()
+            }
+        for labels, (counts, count, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_format_labels(self.labels, labels, le)} "
+                    f"{cumulative}"
+                )
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labels, labels)} {total!r}"
+            yield f"{self.name}_count{_format_labels(self.labels, labels)} {count}"
+
+
+class Gauge:
+    """Gauge with one value per label combination."""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str]):
+        """Initialize the gauge.
+
+        Args:
+            name: Metric name
+            help_text: Description shown in the HELP line
+            labels: Label names
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, labels: Labels, amount: float) -> None:
+        """Change the value by an amount.
+
+        Args:
+            labels: Label values
+            amount: Amount to add (negative to subtract)
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        """Yield the metric's lines in the Prometheus text format."""
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} gauge"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labels, labels)} {value}"
+
+
+class RequestStats:
+    """One request being measured, and the SQL statements it ran."""
+
+    __slots__ = ("endpoint", "method", "started", "statements", "sql_seconds", "open")
+
+    def __init__(self, endpoint: str, method: str) -> None:
+        """Start measuring a request.
+
+        Args:
+            endpoint: Endpoint name
+            method: HTTP method
+        """
+        self.endpoint = endpoint
+        self.method = method
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.sql_seconds = 0.0
+        # Cleared once the response is handed to the server
+        self.open = True
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar(
+    "kairix_request_stats", default=None
+)
+
+
+class Metrics:
+    """The application's request metrics."""
+
+    def __init__(self) -> None:
+        """Create the metrics, all empty."""
+        self.request_seconds = Histogram(
+            "kairix_http_request_duration_seconds",
+            "Time spent serving requests, including streaming the response.",
+            ("endpoint", "method", "status"),
+            LATENCY_BUCKETS,
+        )
+        self.response_bytes = Histogram(
+            "kairix_http_response_size_bytes",
+            "Size of response bodies.",
+            ("endpoint",),
+            SIZE_BUCKETS,
+        )
+        self.sql_statements = Histogram(
+            "kairix_http_request_sql_statements",
+            "SQL statements executed per request.",
+            ("endpoint",),
+            STATEMENT_BUCKETS,
+        )
+        self.sql_seconds = Histogram(
+            "kairix_http_request_sql_duration_seconds",
+            "Time spent executing SQL statements per request.",
+            ("endpoint",),
+            LATENCY_BUCKETS,
+        )
+        self.in_flight = Gauge(
+            "kairix_http_requests_in_flight",
+            "Requests currently being served.",
+            ("endpoint",),
+        )
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format."""
+        lines: List[str] = []
+        for metric in (
+            self.request_seconds,
+            self.in_flight,
+            self.response_bytes,
+            self.sql_statements,
+            self.sql_seconds,
+        ):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def record(self, stats: RequestStats, status: int, size: int) -> None:
+        """Record a finished request.
+
+        Args:
+            stats: The request's measurements
+            status: Response status code
+            size: Response body size in bytes
+        """
+        endpoint = (stats.endpoint,)
+        self.in_flight.add(endpoint, -1)
+        self.request_seconds.observe(
+            (stats.endpoint, stats.method, str(status)),
+            time.perf_counter() - stats.started,
+        )
+        self.response_bytes.observe(endpoint, size)
+        self.sql_statements.observe(endpoint, stats.statements)
+        self.sql_seconds.observe(endpoint, stats.sql_seconds)
+
+
+def _counted(body: Iterable[bytes], sizes: List[int]) -> Iterator[bytes]:
+    for chunk in body:
+        sizes[0] += len(chunk)
+        yield chunk
+
+
+def instrument_engine(engine: Any) -> None:
+    """Count an engine's statements for the request that runs them.
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany) -> None:
+        if _current.get() is not None:
+            conn.info.setdefault("kairix_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _finish(conn, cursor, statement, parameters, context, executemany) -> None:
+        stats = _current.get()
+        starts = conn.info.get("kairix_query_start")
+        if stats is not None and starts:
+            stats.statements += 1
+            stats.sql_seconds += time.perf_counter() - starts.pop()
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context: Any) -> None:
+        starts = (
+            context.connection.info.get("kairix_query_start")
+            if context.connection
+            else None
+        )
+        if starts and _current.get() is not None:
+            starts.pop()
+
+
+def init_metrics(app: Flask, metrics: Metrics, engines: Iterable[Any]) -> None:
+    """Measure every request of an app and the SQL it runs.
+
+    Args:
+        app: Flask application
+        metrics: Metrics to record into
+        engines: Engines whose statements are counted
+    """
+    for engine in engines:
+        instrument_engine(engine)
+
+    @app.before_request
+    def _start_request() -> None:
+        stats = RequestStats(request.endpoint or UNMATCHED_ENDPOINT, request.method)
+        metrics.in_flight.add((stats.endpoint,), 1)
+        _current.set(stats)
+
+    @app.after_request
+    def _finish_request(response: Response) -> Response:
+        stats = _current.get()
+        if stats is None or not stats.open:
+            return response  # This request was not measured
+        stats.open = False
+        status = response.status_code
+
+        size = response.calculate_content_length()
+        if size is None and response.content_length is not None:
+            size = response.content_length  # e.g. error pages
+        if size is not None:
+            metrics.record(stats, status, size)
+            return response
+
+        # Streamed bodies are measured once the server has sent all of them
+        sizes = [0]
+        response.response = _counted(response.response, sizes)
+        response.call_on_close(lambda: metrics.record(stats, status, sizes[0]))
+        return response
@@ -0,0 +1,78 @@
+"""The OpenAPI spec, served from bytes prepared once.
+
+The spec file is read the first time it is requested, encoded as compact
+JSON and gzip-compressed, and later requests send those bytes as they are:
+compressed when the client accepts gzip, with an ETag so that Swagger UI's
+revalidations get a 304 without a body.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from typing import NamedTuple, Optional
+
+from flask import Request, Response
+
+from kairix_todo.utils.serializers import dumps
+
+
+class EncodedSpec(NamedTuple):
+    """The spec as sent."""
+
+    body: bytes
+    compressed: bytes
+    etag: str
+
+
+class OpenApiSpec:
+    """Serves an OpenAPI spec file."""
+
+    def __init__(self, path: str):
+        """Initialize the spec; the file is not read yet.
+
+        Args:
+            path: OpenAPI JSON file
+        """
+        self.path = path
+        self._encoded: Optional[EncodedSpec] = None
+        self._lock = threading.Lock()
+
+    def encoded(self) -> EncodedSpec:
+        """Read and encode the spec file on first use.
+
+        Returns:
+            The encoded spec
+        """
+        if self._encoded is None:
+            with self._lock:
+                if self._encoded is None:
+                    with open(self.path, "rb") as f:
+                        body = dumps(json.loads(f.read()))
+                    self._encoded = EncodedSpec(
+                        body,
+                        gzip.compress(body, compresslevel=9, mtime=0),
+                        hashlib.sha256(body).hexdigest()[:32],
+                    )
+        return self._encoded
+
+    def response(self, request: Request) -> Response:
+        """Build the response to a request for the spec.
+
+        Args:
+            request: Incoming request
+
+        Returns:
+            JSON response, gzip-encoded if the client accepts it, or a 304
+            if the client's copy is current
+        """
+        spec = self.encoded()
+        compress = request.accept_encodings["gzip"] > 0
+        response = Response(
+            spec.compressed if compress else spec.body, mimetype="application/json"
+        )
+        if compress:
+            response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        response.set_etag(f"{spec.etag}-gzip" if compress else spec.etag)
+        return response.make_conditional(request)
@@ -0,0 +1,226 @@
+"""Keyset (cursor) pagination helpers."""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, literal, tuple_
+
+from kairix_todo.models import Task
+
+# Header carrying the cursor for the page after the one returned
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CREATED_ORDER = "created_at"
+RELEVANCE_ORDER = "relevance"
+
+
+def created_order_key(model: Any = Task) -> List[Any]:
+    """Sort key for listing tasks oldest first, served by idx_task_created_at.
+
+    Args:
+        model: Task, or ArchivedTask for archived tasks
+    """
+    return [model.created_at, model.id]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("Invalid cursor.")
+    return value
+
+
+def check_limit(limit: int) -> None:
+    """Check a page size.
+
+    Args:
+        limit: Maximum number of rows per page
+
+    Raises:
+        ValueError: If limit is below 1
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1.")
+
+
+def _seek_condition(key: Sequence[Any], values: Sequence[Any]) -> Any:
+    # Bind each value with its column's type, so that ids are compared in the
+    # form they are stored in (16-byte blobs in compact id storage)
+    if len(values) != len(key):
+        raise ValueError("Invalid cursor.")
+    return tuple_(*key) > tuple_(
+        *(literal(value, column.type) for value, column in zip(values, key))
+    )
+
+
+def encode_cursor(order: str, values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor.
+
+    Args:
+        order: Name of the ordering the key belongs to
+        values: Sort key values of the last row
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = {"o": order, "k": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str) -> List[Any]:
+    """Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string from a previous response
+        order: Ordering of the current query
+
+    Returns:
+        Sort key values to seek past
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another ordering
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(value) for value in payload["k"]]
+        cursor_order = payload["o"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+    if cursor_order != order:
+        raise ValueError("Cursor does not match the ordering of this query.")
+    return values
+
+
+def keyset_page(
+    query: Any,
+    order: str,
+    key: Sequence[Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    with_total: bool = False,
+) -> Tuple[List[Task], Optional[str], Optional[int]]:
+    """Fetch one page of tasks ordered by a unique sort key.
+
+    With a cursor the query seeks directly past the previous page's last row
+    (``WHERE key > cursor``), so the cost of a page does not grow with its
+    depth. Without one, offset is applied as usual.
+
+    Args:
+        query: Task query with all filters applied
+        order: Name of the ordering, recorded in the cursor
+        key: Column expressions forming a unique ascending sort key
+        limit: Maximum number of tasks to return
+        cursor: Cursor returned with the previous page
+        offset: Number of results to skip when no cursor is given
+        with_total: Count the matching rows with a window function in the
+            same statement. Only possible without a cursor, since the seek
+            condition would exclude earlier pages from the count.
+
+    Returns:
+        Tuple of (tasks, next_cursor, total); next_cursor is None on the last
+        page, total is None unless requested and it could be computed from
+        the page (it cannot when the page is empty and offset is non-zero)
+
+    Raises:
+        ValueError: If limit is below 1, the cursor is invalid, or with_total
+            is combined with one
+    """
+    check_limit(limit)
+    if with_total and cursor:
+        raise ValueError("A window total cannot be computed for a cursor page.")
+
+    page_query = query.add_columns(*key)
+    if with_total:
+        page_query = page_query.add_columns(func.count().over())
+    page_query = page_query.order_by(*key)
+
+    if cursor:
+        page_query = page_query.filter(
+            _seek_condition(key, decode_cursor(cursor, order))
+        )
+    elif offset:
+        page_query = page_query.offset(offset)
+
+    # One extra row tells us whether there is a next page
+    rows = page_query.limit(limit + 1).all()
+
+    total = None
+    if with_total:
+        if rows:
+            total = rows[0][-1]
+        elif not offset:
+            total = 0
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(order, rows[-1][1 : len(key) + 1])
+
+    return [row[0] for row in rows], next_cursor, total
+
+
+def merged_keyset_page(
+    queries: Sequence[Tuple[Any, Sequence[Any]]],
+    order: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page over several queries sharing an ordering.
+
+    Each query is paged like keyset_page: past the cursor, or from the start
+    for up to offset + limit + 1 rows. The rows are merged by sort key, so
+    the page and its cursor are the same as for one query over the union.
+
+    Args:
+        queries: (query, key) pairs; the keys must have comparable values
+        order: Name of the ordering, recorded in the cursor
+        limit: Maximum number of rows to return
+        cursor: Cursor returned with the previous page
+        offset: Number of results to skip when no cursor is given
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        ValueError: If limit is below 1 or the cursor is invalid
+    """
+    check_limit(limit)
+    values = decode_cursor(cursor, order) if cursor else None
+    fetch = limit + 1 if cursor else offset + limit + 1
+
+    rows: List[Any] = []
+    for query, key in queries:
+        page_query = query.add_columns(*key).order_by(*key)
+        if values is not None:
+            page_query = page_query.filter(_seek_condition(key, values))
+        rows.extend(page_query.limit(fetch).all())
+
+    rows.sort(key=lambda row: tuple(row[1:]))
+    if values is None:
+        rows = rows[offset:]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(order, rows[-1][1:])
+
+    return [row[0] for row in rows], next_cursor
@@ -0,0 +1,47 @@
+"""Count the SQL statements an engine executes."""
+
+from typing import Any, List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Context manager recording every statement sent to the database.
+
+    Example:
+        with QueryCounter(engine) as counter:
+            client.get("/tasks/")
+        assert counter.count == 3
+    """
+
+    def __init__(self, engine: Any):
+        """Initialize the counter.
+
+        Args:
+            engine: SQLAlchemy engine to watch
+        """
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        """Number of statements executed so far."""
+        return len(self.statements)
+
+    def _record(
+        self,
+        conn: Any,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
@@ -0,0 +1,125 @@
+"""Upgrades of existing databases to the current schema.
+
+``create_all()`` creates missing tables but leaves existing ones as they
+are. The steps here bring a database created by an older version up to
+date; each checks the schema first, so running them on a current database
+changes nothing:
+- ``task_tags`` without its primary key is rebuilt as a WITHOUT ROWID table
+  keyed on ``(task_id, tag_id)``, dropping duplicate links on the way
+- nullable columns declared on the models but missing from their table are
+  added, and filled in from existing data where ``BACKFILLS`` says how
+- indexes declared on the models but missing from the database are created
+- if anything changed, ``ANALYZE`` refreshes the statistics the query
+  planner uses to choose between indexes
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.schema import CreateTable
+
+from kairix_todo.models import Base, task_tags
+from kairix_todo.utils.tag_index import install_posting_log
+from kairix_todo.utils.versioning import install_versioning
+
+_REBUILT_TABLE = "task_tags_rebuilt"
+
+# Statements filling in a column just added to an existing table
+BACKFILLS: Dict[Tuple[str, str], str] = {
+    # When an old task was completed is unknown; its creation is the
+    # earliest it can have been
+    ("tasks", "completed_at"): (
+        "UPDATE tasks SET completed_at = created_at WHERE completed = 1"
+    ),
+}
+
+
+def _has_primary_key(connection: Any, table_name: str) -> bool:
+    return any(
+        row[5] for row in connection.exec_driver_sql(f"PRAGMA table_info({table_name})")
+    )
+
+
+def rebuild_task_tags(connection: Any) -> None:
+    """Rebuild ``task_tags`` with the table definition of the models.
+
+    Follows SQLite's procedure for changing a table: create the new table,
+    copy the rows, drop the old one and rename the new one into place. The
+    triggers on the old table go with it and are installed again.
+
+    Args:
+        connection: SQLAlchemy connection, inside a transaction
+    """
+    ddl = str(CreateTable(task_tags).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(
+        ddl.replace(f"CREATE TABLE {task_tags.name}", f"CREATE TABLE {_REBUILT_TABLE}")
+    )
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO {_REBUILT_TABLE}(task_id, tag_id) "
+        f"SELECT task_id, tag_id FROM {task_tags.name} "
+        "WHERE task_id IS NOT NULL AND tag_id IS NOT NULL"
+    )
+    connection.exec_driver_sql(f"DROP TABLE {task_tags.name}")
+    # Triggers on other tables still name task_tags; without the legacy
+    # behaviour SQLite refuses the rename while the table is missing
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    try:
+        connection.exec_driver_sql(
+            f"ALTER TABLE {_REBUILT_TABLE} RENAME TO {task_tags.name}"
+        )
+    finally:
+        connection.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+    install_posting_log(connection)
+    install_versioning(connection)
+
+
+def upgrade_schema(connection: Any) -> List[str]:
+    """Bring an existing database up to the current schema.
+
+    Args:
+        connection: SQLAlchemy connection, inside a transaction
+
+    Returns:
+        Descriptions of the changes made; empty if the schema was current
+    """
+    if connection.dialect.name != "sqlite":
+        return []
+
+    changes = []
+    if not _has_primary_key(connection, task_tags.name):
+        rebuild_task_tags(connection)
+        changes.append(f"rebuilt {task_tags.name} with a primary key")
+
+    for table in Base.metadata.sorted_tables:
+        columns = {
+            row[1]
+            for row in connection.exec_driver_sql(f"PRAGMA table_info({table.name})")
+        }
+        if not columns:
+            continue  # Not created yet; create_all() adds it complete
+        for column in table.columns:
+            if column.name in columns or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            )
+            backfill = BACKFILLS.get((table.name, column.name))
+            if backfill is not None:
+                connection.exec_driver_sql(backfill)
+            changes.append(f"added column {table.name}.{column.name}")
+
+    existing = {
+        name
+        for (name,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    }
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                changes.append(f"created index {index.name}")
+
+    if changes:
+        connection.exec_driver_sql("ANALYZE")
+    return changes
@@ -0,0 +1,118 @@
+"""Bounded LRU cache for search results, invalidated by data generation."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from kairix_todo.utils.generation import current_generation
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def make_cache_key(fts: bool = True, **params: Any) -> Tuple[Hashable, ...]:
+    """Build a cache key from search parameters.
+
+    Parameters that are None are dropped, so equivalent searches share an
+    entry. A text query matched through the FTS index is normalized, since
+    case and whitespace do not change its results; one matched as a
+    substring is kept as it is.
+
+    Args:
+        fts: Whether the text query is served by the FTS index
+        **params: Search parameters
+
+    Returns:
+        Hashable key
+    """
+    query = params.get("query")
+    if query is not None:
+        params["query"] = (" ".join(query.lower().split()) if fts else query) or None
+    return tuple(
+        sorted((name, value) for name, value in params.items() if value is not None)
+    )
+
+
+class SearchCache:
+    """In-process LRU cache for search results.
+
+    Entries are tagged with the data generation at the time the result was
+    computed and the whole cache is dropped as soon as the generation moves,
+    so a hit never returns data older than the last commit.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Number of results kept before the least recently used
+                one is evicted
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._generation = current_generation()
+        self._lock = threading.Lock()
+
+    def _check_generation(self) -> None:
+        generation = current_generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Look up a cached result.
+
+        Args:
+            key: Key from make_cache_key
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            self._check_generation()
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: int) -> None:
+        """Store a result.
+
+        Args:
+            key: Key from make_cache_key
+            value: Result to cache
+            generation: Data generation read before the result was computed;
+                results computed across a commit are discarded
+        """
+        with self._lock:
+            self._check_generation()
+            if generation != self._generation:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "generation": self._generation,
+            }
@@ -1,23 +1,105 @@
 """Utilities for searching tasks with various filters."""
 
 from datetime import date, datetime
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple, Union
 
-from sqlalchemy import or_
+from sqlalchemy import column, func, literal_column, or_, select, table
 
-from kairix_todo.models import Task
+from kairix_todo.models import ArchivedTask, Tag, Task
+from kairix_todo.utils.fts_utils import (
+    ARCHIVE_FTS_TABLE,
+    FTS_TABLE,
+    MATCH_MODES,
+    build_match_expression,
+    has_fts_index,
+)
+from kairix_todo.utils.pagination import (
+    CREATED_ORDER,
+    RELEVANCE_ORDER,
+    created_order_key,
+    keyset_page,
+    merged_keyset_page,
+)
+from kairix_todo.utils.tag_index import TAG_OPERATORS, TagIndex, rowid_filter
 
+# rank is FTS5's hidden BM25 column; unlike bm25() it stays usable when the
+# query is wrapped for a window function.
+_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+_archive_fts = table(ARCHIVE_FTS_TABLE, column("rowid"), column("rank"))
 
-def search_tasks(
+# How search_tasks_page computes the total number of matches
+TOTAL_EXACT = "exact"
+TOTAL_ESTIMATE = "estimate"
+TOTAL_NONE = "none"
+TOTAL_MODES = (TOTAL_EXACT, TOTAL_ESTIMATE, TOTAL_NONE)
+
+# Estimated totals stop counting past this many matches
+DEFAULT_TOTAL_CAP = 1000
+
+
+class SearchPage(NamedTuple):
+    """One page of search results."""
+
+    tasks: List[Task]
+    total: Optional[int]
+    next_cursor: Optional[str]
+    # False when total is only a lower bound ("1000+")
+    total_exact: bool = True
+
+
+def served_by_fts(session: Any, query: Optional[str], match_mode: str = "all") -> bool:
+    """Check whether a text query is matched through the FTS index.
+
+    Otherwise it is matched as a substring (see build_search_query).
+
+    Args:
+        session: SQLAlchemy database session
+        query: Free text query
+        match_mode: How query words are combined ("all", "any" or "phrase")
+
+    Returns:
+        True if the query has words, the mode is valid and the index exists
+    """
+    if not query or match_mode not in MATCH_MODES:
+        return False
+    return build_match_expression(query, match_mode) is not None and has_fts_index(
+        session
+    )
+
+
+def count_matches(task_query: Any, cap: Optional[int] = None) -> int:
+    """Count the rows of a task query, optionally stopping at a cap.
+
+    Args:
+        task_query: Task or ArchivedTask query with all filters applied
+        cap: Stop counting after cap + 1 rows
+
+    Returns:
+        Number of matching rows, at most cap + 1 when a cap is given
+    """
+    if cap is None:
+        return task_query.count()
+
+    model = task_query.column_descriptions[0]["entity"]
+    bounded = task_query.with_entities(model.id).limit(cap + 1).subquery()
+    return task_query.session.execute(
+        select(func.count()).select_from(bounded)
+    ).scalar_one()
+
+
+def build_search_query(
     session: Any,
     query: Optional[str] = None,
     from_date: Optional[Union[str, date, datetime]] = None,
     to_date: Optional[Union[str, date, datetime]] = None,
     completed: Optional[bool] = None,
-    limit: int = 100,
-    offset: int = 0,
-) -> Tuple[List[Task], int]:
-    """Search for tasks with various filters.
+    match_mode: str = "all",
+    tags: Optional[List[str]] = None,
+    tags_operator: str = "AND",
+    tag_index: Optional[TagIndex] = None,
+    archived: bool = False,
+) -> Tuple[Any, str, List[Any]]:
+    """Build the filtered task query for a search.
 
     Args:
         session: SQLAlchemy database session
@@ -25,43 +107,274 @@ def search_tasks(
         from_date: Filter tasks due on or after this date
         to_date: Filter tasks due on or before this date
         completed: Filter by completion status
-        limit: Maximum number of results to return
-        offset: Number of results to skip
+        match_mode: How query words are combined ("all", "any" or "phrase")
+        tags: Filter by tag names
+        tags_operator: "AND" for tasks with every tag, "OR" for tasks with any
+        tag_index: Posting index answering the tag filter without joins;
+            falls back to EXISTS subqueries when omitted
+        archived: Search the archived tasks instead (see utils.archive); the
+            tag index only covers live tasks, so tags are matched with
+            EXISTS subqueries
 
     Returns:
-        Tuple of (tasks, total_count)
+        Tuple of (unordered query, ordering name, sort key). Text searches
+        served by the FTS index are ordered by BM25 relevance, best match
+        first; everything else by creation time.
+
+    Raises:
+        ValueError: If match_mode or tags_operator is not supported
     """
-    task_query = session.query(Task)
+    model = ArchivedTask if archived else Task
+    fts, fts_table = (
+        (_archive_fts, ARCHIVE_FTS_TABLE) if archived else (_fts, FTS_TABLE)
+    )
+    task_query = session.query(model)
+    order = CREATED_ORDER
+    key = created_order_key(model)
 
     # Text search
     if query:
-        task_query = task_query.filter(
-            or_(
-                Task.title.ilike(f"%{query}%"),
-                Task.additional_details.ilike(f"%{query}%"),
-            )
+        match = build_match_expression(query, match_mode)
+        indexed = (
+            has_fts_index(session, fts_table) if archived else has_fts_index(session)
         )
+        if match is not None and indexed:
+            task_query = task_query.join(
+                fts, fts.c.rowid == literal_column(f"{model.__tablename__}.rowid")
+            ).filter(literal_column(fts_table).match(match))
+            order = RELEVANCE_ORDER
+            key = [fts.c.rank, model.id]
+        else:
+            # SQLite builds without FTS5 (or queries without any words)
+            task_query = task_query.filter(
+                or_(
+                    model.title.ilike(f"%{query}%"),
+                    model.additional_details.ilike(f"%{query}%"),
+                )
+            )
 
     # Date filtering
     if from_date:
         # Convert datetime to date if needed
         if isinstance(from_date, datetime):
             from_date = from_date.date()
-        task_query = task_query.filter(Task.due_date >= from_date)
+        task_query = task_query.filter(model.due_date >= from_date)
     if to_date:
         # Convert datetime to date if needed
         if isinstance(to_date, datetime):
             to_date = to_date.date()
-        task_query = task_query.filter(Task.due_date <= to_date)
+        task_query = task_query.filter(model.due_date <= to_date)
 
     # Completion status
     if completed is not None:
-        task_query = task_query.filter(Task.completed == completed)
+        task_query = task_query.filter(model.completed == completed)
+
+    # Tag filtering
+    if tags:
+        tags_operator = tags_operator.upper()
+        if tags_operator not in TAG_OPERATORS:
+            raise ValueError(
+                f"Invalid tags operator '{tags_operator}'. Expected one of: "
+                + ", ".join(TAG_OPERATORS)
+            )
+        rowids = None
+        if tag_index is not None and not archived:
+            rowids = tag_index.matching_rowids(session, tags, tags_operator)
+        if rowids is not None:
+            task_query = task_query.filter(rowid_filter(rowids))
+        elif tags_operator == "OR":
+            task_query = task_query.filter(model.tags.any(Tag.name.in_(tags)))
+        else:
+            for tag in tags:
+                task_query = task_query.filter(model.tags.any(Tag.name == tag))
 
-    # Get total count before pagination
-    total_count = task_query.count()
+    return task_query, order, key
 
-    # Apply pagination
-    tasks = task_query.limit(limit).offset(offset).all()
 
-    return tasks, total_count
+def search_tasks_page(
+    session: Any,
+    query: Optional[str] = None,
+    from_date: Optional[Union[str, date, datetime]] = None,
+    to_date: Optional[Union[str, date, datetime]] = None,
+    completed: Optional[bool] = None,
+    limit: int = 100,
+    offset: int = 0,
+    match_mode: str = "all",
+    cursor: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    tags_operator: str = "AND",
+    tag_index: Optional[TagIndex] = None,
+    total_mode: str = TOTAL_EXACT,
+    total_cap: int = DEFAULT_TOTAL_CAP,
+    options: Sequence[Any] = (),
+    archive: bool = False,
+    archive_options: Sequence[Any] = (),
+) -> SearchPage:
+    """Search for tasks and return one page plus the cursor for the next.
+
+    Args:
+        session: SQLAlchemy database session
+        query: Text to search in title and description
+        from_date: Filter tasks due on or after this date
+        to_date: Filter tasks due on or before this date
+        completed: Filter by completion status
+        limit: Maximum number of results to return
+        offset: Number of results to skip (ignored when a cursor is given)
+        match_mode: How query words are combined ("all", "any" or "phrase")
+        cursor: Cursor returned with the previous page of the same search
+        tags: Filter by tag names
+        tags_operator: "AND" for tasks with every tag, "OR" for tasks with any
+        tag_index: Posting index answering the tag filter without joins
+        total_mode: "exact" counts every match in the same statement as the
+            page (a window function); "estimate" counts at most total_cap + 1
+            matches; "none" skips counting
+        total_cap: Upper bound for estimated totals
+        options: Loader options for the page query, e.g. selectinload() for
+            relationships the caller is about to read
+        archive: Also search the archived tasks, merging them into the same
+            ordering (see utils.archive)
+        archive_options: Loader options for the archived tasks' query
+
+    Returns:
+        SearchPage with the tasks, total count and next page cursor. total is
+        None when not requested; when estimated past the cap it is total_cap
+        with total_exact set to False.
+
+    Raises:
+        ValueError: If match_mode, tags_operator, total_mode or the cursor is
+            invalid
+    """
+    if total_mode not in TOTAL_MODES:
+        raise ValueError(
+            f"Invalid total mode '{total_mode}'. Expected one of: "
+            + ", ".join(TOTAL_MODES)
+        )
+
+    task_query, order, key = build_search_query(
+        session,
+        query=query,
+        from_date=from_date,
+        to_date=to_date,
+        completed=completed,
+        match_mode=match_mode,
+        tags=tags,
+        tags_operator=tags_operator,
+        tag_index=tag_index,
+    )
+
+    queries = [task_query]
+    archive_query = None
+    if archive:
+        archive_query, archive_order, archive_key = build_search_query(
+            session,
+            query=query,
+            from_date=from_date,
+            to_date=to_date,
+            completed=completed,
+            match_mode=match_mode,
+            tags=tags,
+            tags_operator=tags_operator,
+            archived=True,
+        )
+        # Both FTS indexes are installed together; without the archive's,
+        # its tasks could not be ranked alongside the live ones
+        if archive_order != order:
+            archive_query = None
+    if archive_query is not None:
+        queries.append(archive_query)
+        # BM25 ranks come from two indexes with their own statistics, so
+        # a merged relevance order is close to, not exactly, a single one
+        tasks, next_cursor = merged_keyset_page(
+            [
+                (task_query.options(*options), key),
+                (archive_query.options(*archive_options), archive_key),
+            ],
+            order,
+            limit,
+            cursor=cursor,
+            offset=offset,
+        )
+        total = None
+    else:
+        # A cursor's seek condition hides earlier pages from a window count
+        window_total = total_mode == TOTAL_EXACT and not cursor
+
+        tasks, next_cursor, total = keyset_page(
+            task_query.options(*options),
+            order,
+            key,
+            limit,
+            cursor=cursor,
+            offset=offset,
+            with_total=window_total,
+        )
+
+    if total_mode == TOTAL_NONE:
+        return SearchPage(tasks, None, next_cursor)
+
+    if total_mode == TOTAL_ESTIMATE:
+        # A short first page already is the whole result
+        if not cursor and not offset and next_cursor is None:
+            return SearchPage(tasks, len(tasks), next_cursor)
+        estimate = sum(count_matches(q, cap=total_cap) for q in queries)
+        if estimate > total_cap:
+            return SearchPage(tasks, total_cap, next_cursor, total_exact=False)
+        return SearchPage(tasks, estimate, next_cursor)
+
+    if total is None:
+        total = sum(count_matches(q) for q in queries)
+    return SearchPage(tasks, total, next_cursor)
+
+
+def search_tasks(
+    session: Any,
+    query: Optional[str] = None,
+    from_date: Optional[Union[str, date, datetime]] = None,
+    to_date: Optional[Union[str, date, datetime]] = None,
+    completed: Optional[bool] = None,
+    limit: int = 100,
+    offset: int = 0,
+    match_mode: str = "all",
+    cursor: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    tags_operator: str = "AND",
+    tag_index: Optional[TagIndex] = None,
+) -> Tuple[List[Task], int]:
+    """Search for tasks with various filters.
+
+    Args:
+        session: SQLAlchemy database session
+        query: Text to search in title and description
+        from_date: Filter tasks due on or after this date
+        to_date: Filter tasks due on or before this date
+        completed: Filter by completion status
+        limit: Maximum number of results to return
+        offset: Number of results to skip (ignored when a cursor is given)
+        match_mode: How query words are combined ("all", "any" or "phrase")
+        cursor: Cursor returned with the previous page of the same search
+        tags: Filter by tag names
+        tags_operator: "AND" for tasks with every tag, "OR" for tasks with any
+        tag_index: Posting index answering the tag filter without joins
+
+    Returns:
+        Tuple of (tasks, total_count). Text searches served by the FTS index
+        are ordered by BM25 relevance, best match first.
+
+    Raises:
+        ValueError: If match_mode, tags_operator or the cursor is invalid
+    """
+    page = search_tasks_page(
+        session,
+        query=query,
+        from_date=from_date,
+        to_date=to_date,
+        completed=completed,
+        limit=limit,
+        offset=offset,
+        match_mode=match_mode,
+        cursor=cursor,
+        tags=tags,
+        tags_operator=tags_operator,
+        tag_index=tag_index,
+    )
+    return page.tasks, page.total
@@ -0,0 +1,118 @@
+"""Request-scoped database sessions.
+
+Controllers are given a ``scoped_session`` registry instead of a session:
+every attribute access is forwarded to the session of the current thread,
+which is created on first use. At the end of each request the session is
+committed (if it wrote anything the view did not commit), or rolled back if
+the request failed, raising or answering with an error status (e.g. through
+``abort()``), and then removed, returning its connection to the pool. A
+failed request therefore never leaves a broken session or half-done writes
+behind for the next one.
+"""
+
+from typing import Any, Dict, Optional
+
+from flask import Flask, Response, g
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from kairix_todo.utils.generation import has_uncommitted_writes
+
+# Connection pool settings for file databases: enough connections for a
+# worker running several threads, and a busy timeout so concurrent writers
+# wait for SQLite's write lock instead of failing immediately
+DEFAULT_ENGINE_OPTIONS: Dict[str, Any] = {
+    "pool_size": 8,
+    "max_overflow": 8,
+    "pool_timeout": 30,
+    "connect_args": {"timeout": 15},
+}
+
+
+def is_memory_database(database_uri: str) -> bool:
+    """Check whether a URI names an in-memory SQLite database.
+
+    Args:
+        database_uri: SQLAlchemy database URI
+
+    Returns:
+        True for in-memory SQLite databases
+    """
+    return database_uri.startswith("sqlite") and (
+        ":memory:" in database_uri or database_uri.rstrip("/") == "sqlite:"
+    )
+
+
+def engine_options(database_uri: str) -> Dict[str, Any]:
+    """Return engine options suited to a database URI.
+
+    In-memory SQLite databases live in a single connection, so they keep
+    SQLAlchemy's default pool.
+
+    Args:
+        database_uri: SQLAlchemy database URI
+
+    Returns:
+        Keyword arguments for create_engine
+    """
+    if is_memory_database(database_uri):
+        return {}
+    return {
+        key: dict(value) if isinstance(value, dict) else value
+        for key, value in DEFAULT_ENGINE_OPTIONS.items()
+    }
+
+
+def create_session_registry(engine: Any) -> scoped_session:
+    """Create a registry handing each thread its own session.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        scoped_session usable wherever a session is expected
+    """
+    return scoped_session(sessionmaker(bind=engine))
+
+
+def end_request_session(
+    registry: scoped_session,
+    exception: Optional[BaseException] = None,
+    status: Optional[int] = None,
+) -> None:
+    """Finish the current thread's session at the end of a request.
+
+    Args:
+        registry: Session registry
+        exception: Exception that ended the request, if any
+        status: Status code of the response, if one was made
+    """
+    if not registry.registry.has():
+        return
+    try:
+        if exception is not None or (status is not None and status >= 400):
+            registry.rollback()
+        elif has_uncommitted_writes(registry):
+            registry.commit()
+    finally:
+        registry.remove()
+
+
+def init_session_scope(app: Flask, registry: scoped_session) -> None:
+    """Scope sessions from a registry to the requests of an app.
+
+    Args:
+        app: Flask application
+        registry: Session registry given to the controllers
+    """
+
+    # abort() reaches teardown without an exception; the response tells
+    @app.after_request
+    def _record_status(response: Response) -> Response:
+        g._session_response_status = response.status_code
+        return response
+
+    @app.teardown_appcontext
+    def _remove_session(exception: Optional[BaseException] = None) -> None:
+        end_request_session(
+            registry, exception, g.pop("_session_response_status", None)
+        )
@@ -0,0 +1,235 @@
+"""Slow query log.
+
+Any statement that takes longer than a threshold is recorded with its SQL,
+the shape of its bound parameters (types and counts, never values), its
+duration, the endpoint it ran for and SQLite's ``EXPLAIN QUERY PLAN`` for
+it, so a slow search shows whether it scanned a table, used the wrong
+index or sorted through a temporary B-tree. Entries are written as JSON
+lines to a rotating log file and the most recent ones are kept in memory
+for ``GET /admin/slow-queries``.
+
+Statements run by the serialized writer carry the endpoint of the request
+that submitted them, since the writer runs each write in the caller's
+context.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from flask import has_request_context, request
+from sqlalchemy import event
+
+SLOW_QUERY_MS_ENV = "KAIRIX_SLOW_QUERY_MS"
+SLOW_QUERY_LOG_ENV = "KAIRIX_SLOW_QUERY_LOG"
+DEFAULT_THRESHOLD_MS = 100.0
+
+# Rotating log file: 10 MB per file, 5 old files kept
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# Entries kept in memory for the admin endpoint
+DEFAULT_MAX_ENTRIES = 200
+
+# Parameter lists longer than this are summarized as counts per type
+_MAX_LISTED_PARAMETERS = 10
+
+# Statements SQLite can explain; transaction control, PRAGMAs and DDL are not
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_START_KEY = "kairix_slow_query_start"
+
+
+def slow_query_threshold_ms() -> Optional[float]:
+    """Return the threshold selected for this deployment.
+
+    Returns:
+        Value of KAIRIX_SLOW_QUERY_MS in milliseconds, DEFAULT_THRESHOLD_MS
+        if unset, or None if it is negative (logging disabled)
+    """
+    threshold = float(os.environ.get(SLOW_QUERY_MS_ENV, DEFAULT_THRESHOLD_MS))
+    return None if threshold < 0 else threshold
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Describe bound parameters without their values.
+
+    Args:
+        parameters: DBAPI parameters of one statement execution
+
+    Returns:
+        Type names in the parameters' structure; long lists become counts
+        per type, e.g. {"str": 500}
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        names = [type(value).__name__ for value in parameters]
+        if len(names) > _MAX_LISTED_PARAMETERS:
+            return dict(Counter(names))
+        return names
+    return type(parameters).__name__
+
+
+def explain_query_plan(
+    dbapi_connection: Any, statement: str, parameters: Any
+) -> List[str]:
+    """Run EXPLAIN QUERY PLAN for a statement.
+
+    Uses a plain DBAPI cursor, so the plan query itself is not seen by
+    engine events.
+
+    Args:
+        dbapi_connection: SQLite DBAPI connection the statement ran on
+        statement: SQL statement
+        parameters: Parameters of the statement
+
+    Returns:
+        Plan steps, indented by depth as in the sqlite3 shell; empty if the
+        statement cannot be explained
+    """
+    if not statement.lstrip()[:7].upper().startswith(_EXPLAINABLE):
+        return []
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        rows = cursor.fetchall()
+    except Exception as e:
+        return [f"(plan unavailable: {e})"]
+    finally:
+        cursor.close()
+
+    depths: Dict[int, int] = {0: -1}
+    plan = []
+    for row_id, parent, _, detail in rows:
+        depths[row_id] = depths.get(parent, -1) + 1
+        plan.append("  " * depths[row_id] + detail)
+    return plan
+
+
+class _LogFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating log file created, with its directory, on the first entry."""
+
+    def __init__(self, path: str):
+        super().__init__(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+        )
+
+    def _open(self) -> Any:
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class SlowQueryLog:
+    """Records statements slower than a threshold."""
+
+    def __init__(
+        self,
+        threshold_ms: float = DEFAULT_THRESHOLD_MS,
+        path: Optional[str] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        """Initialize the log.
+
+        Args:
+            threshold_ms: Statements taking at least this long are recorded
+            path: Rotating JSON-lines log file, created with its directory
+                on the first entry; entries are only kept in memory when
+                omitted
+            max_entries: Entries kept in memory
+        """
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self._logger: Optional[logging.Logger] = None
+        if path is not None:
+            handler = _LogFileHandler(path)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger = logging.getLogger(f"kairix_todo.slow_queries.{id(self)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            self._logger.addHandler(handler)
+
+    def instrument(self, engine: Any) -> None:
+        """Time every statement of an engine.
+
+        Args:
+            engine: SQLAlchemy engine
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _start(conn, cursor, statement, parameters, context, executemany) -> None:
+            conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _finish(conn, cursor, statement, parameters, context, executemany) -> None:
+            starts = conn.info.get(_START_KEY)
+            if not starts:
+                return
+            duration_ms = (time.perf_counter() - starts.pop()) * 1000
+            if duration_ms >= self.threshold_ms:
+                self._record(
+                    cursor.connection, statement, parameters, executemany, duration_ms
+                )
+
+        @event.listens_for(engine, "handle_error")
+        def _failed(context: Any) -> None:
+            starts = (
+                context.connection.info.get(_START_KEY) if context.connection else None
+            )
+            if starts:
+                starts.pop()
+
+    def entries(
+        self, limit: Optional[int] = None, endpoint: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the recorded entries, newest first.
+
+        Args:
+            limit: Most entries to return
+            endpoint: Only entries for this endpoint
+
+        Returns:
+            Entries as dicts
+        """
+        with self._lock:
+            entries = list(reversed(self._entries))
+        if endpoint is not None:
+            entries = [entry for entry in entries if entry["endpoint"] == endpoint]
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        """Forget the entries kept in memory; the log file is left alone."""
+        with self._lock:
+            self._entries.clear()
+
+    def _record(
+        self,
+        dbapi_connection: Any,
+        statement: str,
+        parameters: Any,
+        executemany: bool,
+        duration_ms: float,
+    ) -> None:
+        executions = len(parameters) if executemany else 1
+        sample = parameters[0] if executemany and parameters else parameters
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 3),
+            "endpoint": request.endpoint if has_request_context() else None,
+            "statement": statement,
+            "parameters": parameter_shape(sample),
+            "executions": executions,
+            "plan": explain_query_plan(dbapi_connection, statement, sample),
+        }
+        with self._lock:
+            self._entries.append(entry)
+        if self._logger is not None:
+            self._logger.info(json.dumps(entry))
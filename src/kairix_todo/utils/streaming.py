@@ -0,0 +1,52 @@
+"""Helpers for streaming large result sets as newline-delimited JSON."""
+
+from typing import Any, Callable, Iterable, Iterator
+
+from flask import Request, Response, stream_with_context
+
+from kairix_todo.utils.serializers import dumps
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Rows fetched from the database cursor per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Check whether a request asked for a streamed NDJSON response.
+
+    Either ``?stream=1`` or an Accept header preferring
+    ``application/x-ndjson`` over ``application/json`` selects streaming.
+
+    Args:
+        request: Incoming Flask request
+
+    Returns:
+        True if the response should be streamed
+    """
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        return True
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def ndjson_response(rows: Iterable[Any], format_row: Callable[[Any], Any]) -> Response:
+    """Stream rows as one JSON document per line.
+
+    Rows are formatted and encoded one at a time as the client reads, so
+    memory use does not depend on the number of rows and the first line is
+    sent as soon as the first row is fetched.
+
+    Args:
+        rows: Iterable of rows, typically a ``yield_per`` query
+        format_row: Turns a row into a JSON-serializable value
+
+    Returns:
+        Streaming response
+    """
+
+    def generate() -> Iterator[bytes]:
+        for row in rows:
+            yield dumps(format_row(row)) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,147 @@
+"""Process-local cache mapping tag names to ids.
+
+Tags are a small set that rarely changes, yet every task create and edit
+resolves its tag names. The cache answers known names without a query;
+unknown names are resolved (and created) in bulk through
+``resolve_tag_ids``.
+
+Names resolved inside a transaction are only cached once that transaction
+commits, so a rollback never leaves ids of tags that do not exist. Renames
+and deletes must be reported through ``invalidate``.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from kairix_todo.models import Tag
+from kairix_todo.utils.bulk_utils import resolve_tag_ids
+
+_PENDING_KEY = "kairix_pending_tags"
+
+
+def _database_key(session: Any) -> str:
+    # Keyed by URL rather than engine: reads and writes may use separate
+    # engines on the same database
+    return str(session.get_bind().url)
+
+
+class TagCache:
+    """Name to id map per database."""
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self._ids: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self, session: Any) -> int:
+        """Load every existing tag into the cache.
+
+        Args:
+            session: SQLAlchemy database session
+
+        Returns:
+            Number of cached tags
+        """
+        rows = session.execute(select(Tag.name, Tag.id)).all()
+        with self._lock:
+            ids = self._ids.setdefault(_database_key(session), {})
+            ids.update(rows)
+            return len(ids)
+
+    def resolve(self, session: Any, names: Iterable[str]) -> Dict[str, str]:
+        """Map tag names to ids, creating the tags that do not exist yet.
+
+        Known names cost no query. Does not commit.
+
+        Args:
+            session: SQLAlchemy database session
+            names: Tag names
+
+        Returns:
+            Dict mapping every given name to its tag id
+        """
+        database = _database_key(session)
+        names = list(dict.fromkeys(names))
+        with self._lock:
+            known = self._ids.get(database, {})
+            tag_ids = {name: known[name] for name in names if name in known}
+            missing = [name for name in names if name not in tag_ids]
+            self.hits += len(tag_ids)
+            self.misses += len(missing)
+
+        if missing:
+            # Concurrent creation of the same tag is settled by the database
+            # (INSERT OR IGNORE, then a re-read), not by this cache
+            resolved = resolve_tag_ids(session, missing)
+            session.info.setdefault(_PENDING_KEY, []).append((self, database, resolved))
+            tag_ids.update(resolved)
+        return tag_ids
+
+    def get_tags(self, session: Any, names: Iterable[str]) -> List[Tag]:
+        """Return Tag objects for the given names without loading them.
+
+        Tags already in the session are reused; others are attached from the
+        cached id and name, so linking them to a task needs no SELECT.
+
+        Args:
+            session: SQLAlchemy database session
+            names: Tag names
+
+        Returns:
+            Tags in the order of the (deduplicated) names
+        """
+        tags = []
+        for name, tag_id in self.resolve(session, names).items():
+            tag = Tag(id=tag_id, name=name)
+            make_transient_to_detached(tag)
+            tags.append(session.merge(tag, load=False))
+        return tags
+
+    def invalidate(self, session: Any, *names: str) -> None:
+        """Forget names whose tag was renamed or deleted.
+
+        Args:
+            session: SQLAlchemy database session
+            *names: Tag names to drop
+        """
+        with self._lock:
+            ids = self._ids.get(_database_key(session))
+            if ids is not None:
+                for name in names:
+                    ids.pop(name, None)
+
+    def clear(self) -> None:
+        """Drop every cached name."""
+        with self._lock:
+            self._ids.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of cached names."""
+        with self._lock:
+            size = sum(len(ids) for ids in self._ids.values())
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+    def _store(self, database: str, tag_ids: Dict[str, str]) -> None:
+        with self._lock:
+            self._ids.setdefault(database, {}).update(tag_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _store_on_commit(session: Session) -> None:
+    if session.in_nested_transaction():
+        return
+    pending: List[Tuple[TagCache, str, Dict[str, str]]] = session.info.pop(
+        _PENDING_KEY, []
+    )
+    for cache, database, tag_ids in pending:
+        cache._store(database, tag_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
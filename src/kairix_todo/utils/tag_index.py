@@ -0,0 +1,257 @@
+"""In-memory tag posting index for fast tag filtering in search.
+
+Each tag maps to a bitmap over task rowids, so "tasks with all of these tags"
+and "tasks with any of these tags" are bitwise AND/OR instead of one join
+per tag. The bitmaps are kept current from ``tag_postings_log``, a change
+log filled by triggers on ``task_tags``: every lookup first applies the log
+entries written since the index last looked, so changes made by any session
+or process are seen without rebuilding the whole index.
+"""
+
+import json
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, func, literal_column, select, text
+
+from kairix_todo.models import Tag, UUIDString, task_tags
+from kairix_todo.utils.generation import has_uncommitted_writes
+
+LOG_TABLE = "tag_postings_log"
+
+TAG_OPERATORS = ("AND", "OR")
+
+# Log entries kept after pruning; an index lagging further behind rebuilds
+_LOG_RETAIN = 16384
+_LOG_PRUNE_EVERY = 1024
+
+_LOG_DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {LOG_TABLE} (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_rowid INTEGER,
+        tag_id VARCHAR NOT NULL,
+        added BOOLEAN NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {LOG_TABLE}_ai AFTER INSERT ON task_tags BEGIN
+        INSERT INTO {LOG_TABLE}(task_rowid, tag_id, added)
+        VALUES ((SELECT rowid FROM tasks WHERE id = new.task_id), new.tag_id, 1);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {LOG_TABLE}_ad AFTER DELETE ON task_tags BEGIN
+        INSERT INTO {LOG_TABLE}(task_rowid, tag_id, added)
+        VALUES ((SELECT rowid FROM tasks WHERE id = old.task_id), old.tag_id, 0);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {LOG_TABLE}_prune AFTER INSERT ON {LOG_TABLE}
+    WHEN new.seq % {_LOG_PRUNE_EVERY} = 0 BEGIN
+        DELETE FROM {LOG_TABLE} WHERE seq <= new.seq - {_LOG_RETAIN};
+    END
+    """,
+)
+
+# Bit positions set in each byte value, for turning bitmaps into rowids
+_BYTE_BITS = [
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+]
+
+_logged_engines: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def install_posting_log(connection: Any) -> None:
+    """Create the posting change log and its triggers if they do not exist.
+
+    Args:
+        connection: SQLAlchemy connection
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in _LOG_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def has_posting_log(session: Any) -> bool:
+    """Check whether the database behind a session has the posting log.
+
+    Args:
+        session: SQLAlchemy database session
+
+    Returns:
+        True if a TagIndex can be used with this database
+    """
+    engine = session.get_bind()
+    if engine in _logged_engines:
+        return True
+    if engine.dialect.name != "sqlite":
+        return False
+
+    exists = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": LOG_TABLE},
+    ).scalar()
+    if exists:
+        _logged_engines.add(engine)
+    return bool(exists)
+
+
+def bit_positions(bitmap: int) -> List[int]:
+    """List the set bits of a bitmap in ascending order.
+
+    Args:
+        bitmap: Non-negative integer used as a bitmap
+
+    Returns:
+        Sorted positions of the set bits
+    """
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    positions: List[int] = []
+    for offset, value in enumerate(data):
+        if value:
+            base = offset * 8
+            positions.extend(base + bit for bit in _BYTE_BITS[value])
+    return positions
+
+
+def rowid_filter(rowids: List[int]) -> Any:
+    """Build a ``tasks.rowid IN (...)`` filter passing the ids as one JSON parameter.
+
+    Args:
+        rowids: Task rowids to keep
+
+    Returns:
+        SQL expression for Query.filter
+    """
+    values = func.json_each(json.dumps(rowids)).table_valued("value")
+    return literal_column("tasks.rowid").in_(select(values.c.value))
+
+
+class TagIndex:
+    """Per-tag bitmaps over task rowids, refreshed from the posting log."""
+
+    def __init__(self) -> None:
+        """Initialize an empty index; it is built on first use."""
+        self._postings: Dict[str, bytearray] = {}
+        self._seq: Optional[int] = None
+        self._engine: Any = None
+        self._lock = threading.Lock()
+
+    def matching_rowids(
+        self, session: Any, tags: List[str], operator: str = "AND"
+    ) -> Optional[List[int]]:
+        """Find the rowids of tasks carrying the given tags.
+
+        Args:
+            session: SQLAlchemy database session
+            tags: Tag names
+            operator: "AND" for tasks with every tag, "OR" for tasks with any
+
+        Returns:
+            Sorted task rowids, or None if the index cannot answer for this
+            session (no posting log, or uncommitted writes the log would
+            include but a rollback could take back)
+
+        Raises:
+            ValueError: If operator is not supported
+        """
+        operator = operator.upper()
+        if operator not in TAG_OPERATORS:
+            raise ValueError(
+                f"Invalid tags operator '{operator}'. Expected one of: "
+                + ", ".join(TAG_OPERATORS)
+            )
+        if has_uncommitted_writes(session) or not has_posting_log(session):
+            return None
+
+        # Tag names are resolved on every lookup so renames need no log entry
+        names = set(tags)
+        name_rows = session.execute(
+            select(Tag.name, Tag.id).where(Tag.name.in_(names))
+        ).all()
+        tag_ids = {name: tag_id for name, tag_id in name_rows}
+
+        with self._lock:
+            self._refresh(session)
+            bitmaps = [
+                int.from_bytes(self._postings.get(tag_ids[name], b""), "little")
+                for name in names
+                if name in tag_ids
+            ]
+
+        if operator == "AND":
+            if not bitmaps or len(bitmaps) < len(names):
+                return []
+            result = bitmaps[0]
+            for bitmap in bitmaps[1:]:
+                result &= bitmap
+        else:
+            result = 0
+            for bitmap in bitmaps:
+                result |= bitmap
+
+        return bit_positions(result)
+
+    def _refresh(self, session: Any) -> None:
+        engine = session.get_bind()
+        if self._seq is None or engine is not self._engine:
+            self._rebuild(session)
+            return
+
+        oldest = session.execute(text(f"SELECT min(seq) FROM {LOG_TABLE}")).scalar()
+        if oldest is not None and oldest > self._seq + 1:
+            # Entries this index has not seen were pruned
+            self._rebuild(session)
+            return
+
+        changes = session.execute(
+            text(
+                f"SELECT seq, task_rowid, tag_id, added FROM {LOG_TABLE} "
+                "WHERE seq > :seq ORDER BY seq"
+            ).columns(tag_id=UUIDString),
+            {"seq": self._seq},
+        ).all()
+        for seq, rowid, tag_id, added in changes:
+            if rowid is not None:
+                self._set(tag_id, rowid, bool(added))
+            self._seq = seq
+
+    def _rebuild(self, session: Any) -> None:
+        seq = session.execute(
+            text(f"SELECT coalesce(max(seq), 0) FROM {LOG_TABLE}")
+        ).scalar()
+        rows = session.execute(
+            text(
+                "SELECT tasks.rowid, task_tags.tag_id FROM task_tags "
+                "JOIN tasks ON tasks.id = task_tags.task_id"
+            ).columns(tag_id=UUIDString)
+        )
+        self._postings = {}
+        for rowid, tag_id in rows:
+            self._set(tag_id, rowid, True)
+        self._seq = seq
+        self._engine = session.get_bind()
+
+    def _set(self, tag_id: str, rowid: int, present: bool) -> None:
+        bitmap = self._postings.get(tag_id)
+        if bitmap is None:
+            if not present:
+                return
+            bitmap = self._postings[tag_id] = bytearray()
+        index, mask = rowid >> 3, 1 << (rowid & 7)
+        if index >= len(bitmap):
+            if not present:
+                return
+            bitmap.extend(bytes(index + 1 - len(bitmap)))
+        if present:
+            bitmap[index] |= mask
+        else:
+            bitmap[index] &= ~mask & 0xFF
+
+
+@event.listens_for(task_tags, "after_create")
+def _install_after_create(target: Any, connection: Any, **kwargs: Any) -> None:
+    install_posting_log(connection)
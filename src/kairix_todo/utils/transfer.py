@@ -0,0 +1,482 @@
+"""Streaming export and import of tasks as JSON lines or CSV.
+
+Backups and migrations move every task with its tags and reminders, which
+can be millions of rows. Both directions work in batches, so memory use
+does not grow with the size of the data:
+
+- Export reads the tasks through a streaming cursor (``yield_per``), and
+  for each batch of tasks fetches their tag names and reminders with one
+  ``IN`` query each. Records are encoded and sent as they are read.
+- Import reads records one line at a time, validates them and inserts each
+  batch with executemany inserts in one short transaction through the
+  writer, like ``POST /tasks/bulk``. Tasks whose id is already present,
+  live or archived, are skipped, so an interrupted import can simply be
+  run again.
+
+One record per task, in both formats::
+
+    {"id": "...", "title": "...", "additional_details": null,
+     "completed": true, "created_at": "2025-01-01T09:00:00",
+     "completed_at": "2025-01-02T17:30:00", "due_date": "2025-01-03",
+     "tags": ["work"], "reminders": [{"id": "...",
+     "remind_at": "2025-01-02T09:00:00", "completed": false}]}
+
+In CSV, ``tags`` and ``reminders`` hold the same lists as JSON text, and an
+empty cell is a missing value. Only title is required on import; a record
+without an id gets a new one.
+
+Usage:
+    PYTHONPATH=src python -m kairix_todo.utils.transfer export instance/tasks.db -o tasks.jsonl
+    PYTHONPATH=src python -m kairix_todo.utils.transfer import instance/tasks.db tasks.jsonl
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from kairix_todo.models import (
+    ArchivedReminder,
+    ArchivedTask,
+    Reminder,
+    Tag,
+    Task,
+    archived_task_tags,
+    task_tags,
+)
+from kairix_todo.utils.bulk_utils import resolve_tag_ids, validate_task_item
+from kairix_todo.utils.ids import resolve_id_storage, use_id_storage
+from kairix_todo.utils.serializers import dumps
+from kairix_todo.utils.streaming import NDJSON_MIMETYPE
+from kairix_todo.utils.writer import InlineWriter, Writer
+
+JSONL_FORMAT = "jsonl"
+CSV_FORMAT = "csv"
+TRANSFER_FORMATS = (JSONL_FORMAT, CSV_FORMAT)
+TRANSFER_MIMETYPES = {JSONL_FORMAT: NDJSON_MIMETYPE, CSV_FORMAT: "text/csv"}
+
+CSV_COLUMNS = (
+    "id",
+    "title",
+    "additional_details",
+    "completed",
+    "created_at",
+    "completed_at",
+    "due_date",
+    "tags",
+    "reminders",
+)
+
+# Tasks per batch: rows fetched per round trip on export, rows inserted per
+# transaction on import. Also the length of the IN lists each batch uses.
+TRANSFER_BATCH_SIZE = 500
+
+# Rejected records listed in an import report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+_REMINDER_FIELDS = ("id", "remind_at", "completed")
+
+# A record read from an import file, or the reason it could not be read
+ImportItem = Tuple[int, Any]
+ImportEntry = Tuple[Dict[str, Any], List[str], List[Dict[str, Any]]]
+
+
+def _check_format(name: str) -> None:
+    if name not in TRANSFER_FORMATS:
+        raise ValueError(
+            f"Unknown format '{name}'. Expected one of: " + ", ".join(TRANSFER_FORMATS)
+        )
+
+
+def _isoformat(value: Any) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def export_records(
+    session: Any,
+    include_archived: bool = True,
+    batch_size: int = TRANSFER_BATCH_SIZE,
+) -> Iterator[Dict[str, Any]]:
+    """Read every task with its tag names and reminders.
+
+    Args:
+        session: SQLAlchemy database session
+        include_archived: Also read the archived tasks (see utils.archive)
+        batch_size: Tasks fetched per round trip
+
+    Yields:
+        One record per task, live tasks first, each in insertion order
+    """
+    sources = [(Task.__table__, task_tags, Reminder.__table__)]
+    if include_archived:
+        sources.append(
+            (ArchivedTask.__table__, archived_task_tags, ArchivedReminder.__table__)
+        )
+
+    for tasks, links, reminders in sources:
+        result = session.execute(
+            select(
+                tasks.c.id,
+                tasks.c.title,
+                tasks.c.additional_details,
+                tasks.c.completed,
+                tasks.c.created_at,
+                tasks.c.completed_at,
+                tasks.c.due_date,
+            ).execution_options(yield_per=batch_size)
+        )
+        for partition in result.partitions():
+            ids = [row.id for row in partition]
+            tag_names: Dict[str, List[str]] = defaultdict(list)
+            for task_id, name in session.execute(
+                select(links.c.task_id, Tag.name)
+                .join(Tag, Tag.id == links.c.tag_id)
+                .where(links.c.task_id.in_(ids))
+            ):
+                tag_names[task_id].append(name)
+            task_reminders: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for reminder in session.execute(
+                select(
+                    reminders.c.task_id,
+                    reminders.c.id,
+                    reminders.c.remind_at,
+                    reminders.c.completed,
+                ).where(reminders.c.task_id.in_(ids))
+            ):
+                task_reminders[reminder.task_id].append(
+                    {
+                        "id": reminder.id,
+                        "remind_at": _isoformat(reminder.remind_at),
+                        "completed": bool(reminder.completed),
+                    }
+                )
+
+            for row in partition:
+                yield {
+                    "id": row.id,
+                    "title": row.title,
+                    "additional_details": row.additional_details,
+                    "completed": bool(row.completed),
+                    "created_at": _isoformat(row.created_at),
+                    "completed_at": _isoformat(row.completed_at),
+                    "due_date": _isoformat(row.due_date),
+                    "tags": sorted(tag_names.get(row.id, ())),
+                    "reminders": task_reminders.get(row.id, []),
+                }
+
+
+def encode_records(records: Iterable[Dict[str, Any]], name: str) -> Iterator[bytes]:
+    """Encode export records one at a time.
+
+    Args:
+        records: Records from export_records
+        name: JSONL_FORMAT or CSV_FORMAT
+
+    Yields:
+        Encoded lines; for CSV the header comes first
+
+    Raises:
+        ValueError: If the format does not exist
+    """
+    _check_format(name)
+    if name == JSONL_FORMAT:
+        for record in records:
+            yield dumps(record) + b"\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for record in records:
+        writer.writerow([_csv_cell(record[column]) for column in CSV_COLUMNS])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, list):
+        return json.dumps(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def read_records(stream: IO[bytes], name: str) -> Iterator[ImportItem]:
+    """Decode an import file one record at a time.
+
+    Args:
+        stream: Binary file or request body
+        name: JSONL_FORMAT or CSV_FORMAT
+
+    Yields:
+        (line number, record) pairs; a record that cannot be decoded is
+        replaced by the ValueError saying why
+
+    Raises:
+        ValueError: If the format does not exist
+    """
+    _check_format(name)
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if name == JSONL_FORMAT:
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, ValueError("Invalid JSON.")
+        return
+
+    reader = csv.DictReader(text)
+    for row in reader:
+        yield reader.line_num, _csv_record(row)
+
+
+def _csv_record(row: Dict[Optional[str], Any]) -> Any:
+    if None in row:
+        return ValueError("More cells than columns.")
+    record: Dict[str, Any] = {
+        column: value for column, value in row.items() if value not in ("", None)
+    }
+    if "completed" in record:
+        completed = record["completed"].lower()
+        if completed not in ("true", "false"):
+            return ValueError("completed must be true or false.")
+        record["completed"] = completed == "true"
+    for column in ("tags", "reminders"):
+        if column in record:
+            try:
+                record[column] = json.loads(record[column])
+            except ValueError:
+                return ValueError(f"{column} must be a JSON list.")
+    return record
+
+
+def _parse_datetime(value: Any, name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {name} format. Expected an ISO 8601 datetime.")
+
+
+def _check_id(value: Any, name: str) -> str:
+    if value is None:
+        return str(uuid.uuid4())
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{name} must be a non-empty string.")
+    return value
+
+
+def validate_import_record(record: Any) -> ImportEntry:
+    """Check one import record and convert it into rows.
+
+    Args:
+        record: Decoded record, shaped like an export record
+
+    Returns:
+        Tuple of (tasks row, tag names, reminders rows)
+
+    Raises:
+        ValueError: If the record is not a valid task
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object.")
+    record = dict(record)
+    task_id = _check_id(record.pop("id", None), "id")
+    created_at = _parse_datetime(record.pop("created_at", None), "created_at")
+    completed_at = _parse_datetime(record.pop("completed_at", None), "completed_at")
+    reminders = record.pop("reminders", None) or []
+
+    row, tag_names = validate_task_item(record)
+    row["id"] = task_id
+    row["created_at"] = created_at or datetime.utcnow()
+    if row["completed"] and completed_at is not None:
+        row["completed_at"] = completed_at
+
+    if not isinstance(reminders, list):
+        raise ValueError("reminders must be a list.")
+    reminder_rows = []
+    for reminder in reminders:
+        if not isinstance(reminder, dict):
+            raise ValueError("Each reminder must be an object.")
+        unknown = sorted(set(reminder) - set(_REMINDER_FIELDS))
+        if unknown:
+            raise ValueError("Unknown reminder fields: " + ", ".join(unknown))
+        remind_at = _parse_datetime(reminder.get("remind_at"), "remind_at")
+        if remind_at is None:
+            raise ValueError("Each reminder needs a remind_at.")
+        completed = reminder.get("completed", False)
+        if not isinstance(completed, bool):
+            raise ValueError("Reminder completed must be a boolean.")
+        reminder_rows.append(
+            {
+                "id": _check_id(reminder.get("id"), "Reminder id"),
+                "task_id": task_id,
+                "remind_at": remind_at,
+                "completed": completed,
+            }
+        )
+    return row, tag_names, reminder_rows
+
+
+def _insert_batch(session: Any, batch: List[ImportEntry]) -> int:
+    ids = [row["id"] for row, _, _ in batch]
+    present = set()
+    for model in (Task, ArchivedTask):
+        present.update(
+            session.execute(select(model.id).where(model.id.in_(ids))).scalars()
+        )
+
+    fresh = []
+    for entry in batch:
+        task_id = entry[0]["id"]
+        if task_id not in present:
+            present.add(task_id)
+            fresh.append(entry)
+    if not fresh:
+        return 0
+
+    tag_ids = resolve_tag_ids(
+        session, (name for _, names, _ in fresh for name in names)
+    )
+    session.execute(insert(Task.__table__), [row for row, _, _ in fresh])
+    links = [
+        {"task_id": row["id"], "tag_id": tag_ids[name]}
+        for row, names, _ in fresh
+        for name in names
+    ]
+    if links:
+        session.execute(insert(task_tags), links)
+    reminders = [reminder for _, _, rows in fresh for reminder in rows]
+    if reminders:
+        session.execute(insert(Reminder.__table__).prefix_with("OR IGNORE"), reminders)
+    session.commit()
+    return len(fresh)
+
+
+def import_records(
+    writer: Writer,
+    items: Iterable[ImportItem],
+    batch_size: int = TRANSFER_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Validate and insert records, one transaction per batch.
+
+    Invalid records are counted and skipped; a failing batch stops the
+    import, leaving earlier batches committed.
+
+    Args:
+        writer: Writer to run the batches on
+        items: (line number, record) pairs from read_records
+        batch_size: Tasks inserted per transaction
+
+    Returns:
+        Dict with the number of tasks imported, skipped because their id
+        was present and rejected, and the first MAX_REPORTED_ERRORS
+        rejections as ``{"line": n, "error": message}``
+    """
+    report: Dict[str, Any] = {"imported": 0, "skipped": 0, "rejected": 0, "errors": []}
+    batch: List[ImportEntry] = []
+
+    def flush() -> None:
+        imported = writer.run(lambda session: _insert_batch(session, batch))
+        report["imported"] += imported
+        report["skipped"] += len(batch) - imported
+        batch.clear()
+
+    for line, record in items:
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            batch.append(validate_import_record(record))
+        except ValueError as e:
+            report["rejected"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append({"line": line, "error": str(e)})
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
+
+
+def _format_from_path(path: str) -> str:
+    return CSV_FORMAT if path.lower().endswith(".csv") else JSONL_FORMAT
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write every task to a file")
+    export.add_argument("database", help="SQLite database file")
+    export.add_argument("-o", "--output", help="output file (default: stdout)")
+    export.add_argument("--format", choices=TRANSFER_FORMATS)
+    export.add_argument("--no-archived", action="store_true")
+    load = commands.add_parser("import", help="add the tasks of a file")
+    load.add_argument("database", help="SQLite database file")
+    load.add_argument("input", help="JSONL or CSV file")
+    load.add_argument("--format", choices=TRANSFER_FORMATS)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    use_id_storage(engine, resolve_id_storage(engine))
+    session = sessionmaker(bind=engine)()
+    started = time.perf_counter()
+    try:
+        if args.command == "export":
+            name = args.format or (
+                _format_from_path(args.output) if args.output else JSONL_FORMAT
+            )
+            output = open(args.output, "wb") if args.output else sys.stdout.buffer
+            count = 0
+
+            def counted(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+                nonlocal count
+                for record in records:
+                    count += 1
+                    yield record
+
+            try:
+                records = export_records(session, include_archived=not args.no_archived)
+                for chunk in encode_records(counted(records), name):
+                    output.write(chunk)
+            finally:
+                if args.output:
+                    output.close()
+            elapsed = time.perf_counter() - started
+            print(f"Exported {count} tasks in {elapsed:.1f}s", file=sys.stderr)
+        else:
+            name = args.format or _format_from_path(args.input)
+            with open(args.input, "rb") as stream:
+                report = import_records(
+                    InlineWriter(session), read_records(stream, name)
+                )
+            elapsed = time.perf_counter() - started
+            print(
+                f"Imported {report['imported']} tasks, skipped {report['skipped']}, "
+                f"rejected {report['rejected']} in {elapsed:.1f}s",
+                file=sys.stderr,
+            )
+            for error in report["errors"]:
+                print(f"  line {error['line']}: {error['error']}", file=sys.stderr)
+    finally:
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Row and collection version counters, and the ETags built from them.
+
+Every task, tag and reminder carries a ``version`` that triggers increment on
+each change, and ``collection_versions`` holds one counter per listing that
+any change to its rows increments. A task's version also moves when its
+tags or reminders change, since they are part of its representation.
+
+Because the counters are maintained by the database, writes from any session
+or process are covered, and an ETag can be checked with a single indexed
+lookup before anything is loaded or serialized.
+"""
+
+import hashlib
+import weakref
+from typing import Any, Optional
+
+from flask import Request, Response, current_app
+from sqlalchemy import event, select, text
+
+from kairix_todo.models import Base
+
+VERSIONS_TABLE = "collection_versions"
+
+TASKS_COLLECTION = "tasks"
+TAGS_COLLECTION = "tags"
+
+_VERSIONED_TABLES = ("tasks", "tags", "reminders")
+
+
+def _bump_collection(name: str) -> str:
+    return f"UPDATE {VERSIONS_TABLE} SET version = version + 1 WHERE name = '{name}';"
+
+
+# Row triggers only bump rows whose version the statement left alone, so an
+# UPDATE that sets version itself is not counted twice (and the triggers'
+# own version updates do not fire them again).
+_VERSION_DDL = (
+    f"""
+    CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (
+        name VARCHAR PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    f"""
+    INSERT OR IGNORE INTO {VERSIONS_TABLE}(name, version)
+    VALUES ('{TASKS_COLLECTION}', 1), ('{TAGS_COLLECTION}', 1)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_version_ai AFTER INSERT ON tasks BEGIN
+        {_bump_collection(TASKS_COLLECTION)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_version_au AFTER UPDATE ON tasks BEGIN
+        UPDATE tasks SET version = old.version + 1
+        WHERE rowid = new.rowid AND new.version = old.version;
+        {_bump_collection(TASKS_COLLECTION)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_version_ad AFTER DELETE ON tasks BEGIN
+        {_bump_collection(TASKS_COLLECTION)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_version_ai AFTER INSERT ON tags BEGIN
+        {_bump_collection(TAGS_COLLECTION)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_version_au AFTER UPDATE ON tags BEGIN
+        UPDATE tags SET version = old.version + 1
+        WHERE rowid = new.rowid AND new.version = old.version;
+        UPDATE tasks SET version = version + 1
+        WHERE id IN (SELECT task_id FROM task_tags WHERE tag_id = new.id);
+        {_bump_collection(TAGS_COLLECTION)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS tags_version_ad AFTER DELETE ON tags BEGIN
+        {_bump_collection(TAGS_COLLECTION)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_tags_version_ai
+    AFTER INSERT ON task_tags BEGIN
+        UPDATE tasks SET version = version + 1 WHERE id = new.task_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS task_tags_version_ad
+    AFTER DELETE ON task_tags BEGIN
+        UPDATE tasks SET version = version + 1 WHERE id = old.task_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reminders_version_ai
+    AFTER INSERT ON reminders BEGIN
+        UPDATE tasks SET version = version + 1 WHERE id = new.task_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reminders_version_au
+    AFTER UPDATE ON reminders BEGIN
+        UPDATE reminders SET version = old.version + 1
+        WHERE rowid = new.rowid AND new.version = old.version;
+        UPDATE tasks SET version = version + 1
+        WHERE id IN (old.task_id, new.task_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reminders_version_ad
+    AFTER DELETE ON reminders BEGIN
+        UPDATE tasks SET version = version + 1 WHERE id = old.task_id;
+    END
+    """,
+)
+
+_versioned_engines: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def install_versioning(connection: Any) -> None:
+    """Add the version columns, collection counters and triggers if missing.
+
+    Safe to run against an existing database: tables created before
+    versioning existed get a ``version`` column starting at 1.
+
+    Args:
+        connection: SQLAlchemy connection
+    """
+    if connection.dialect.name != "sqlite":
+        return
+
+    for table_name in _VERSIONED_TABLES:
+        columns = {
+            row[1]
+            for row in connection.exec_driver_sql(f"PRAGMA table_info({table_name})")
+        }
+        if "version" not in columns:
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table_name} "
+                "ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+            )
+
+    for statement in _VERSION_DDL:
+        connection.exec_driver_sql(statement)
+
+
+def has_versioning(session: Any) -> bool:
+    """Check whether the database behind a session has the version counters.
+
+    Args:
+        session: SQLAlchemy database session
+
+    Returns:
+        True if collection versions can be read
+    """
+    engine = session.get_bind()
+    if engine in _versioned_engines:
+        return True
+    if engine.dialect.name != "sqlite":
+        return False
+
+    exists = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": VERSIONS_TABLE},
+    ).scalar()
+    if exists:
+        _versioned_engines.add(engine)
+    return bool(exists)
+
+
+def collection_version(session: Any, name: str) -> Optional[int]:
+    """Read the current version of a collection.
+
+    Args:
+        session: SQLAlchemy database session
+        name: Collection name, e.g. TASKS_COLLECTION
+
+    Returns:
+        The version, or None if the database has no version counters
+    """
+    if not has_versioning(session):
+        return None
+    return session.execute(
+        text(f"SELECT version FROM {VERSIONS_TABLE} WHERE name = :name"),
+        {"name": name},
+    ).scalar()
+
+
+def row_version(session: Any, model: Any, row_id: str) -> Optional[int]:
+    """Read the version of one row without loading it.
+
+    Args:
+        session: SQLAlchemy database session
+        model: Task, Tag or Reminder
+        row_id: Primary key of the row
+
+    Returns:
+        The version, or None if the row does not exist
+    """
+    return session.execute(
+        select(model.version).where(model.id == row_id)
+    ).scalar_one_or_none()
+
+
+def make_etag(request: Request, *parts: Any) -> str:
+    """Build an ETag for a representation of a versioned resource.
+
+    The query string is part of the tag, since it changes the bytes sent
+    for the same version.
+
+    Args:
+        request: Incoming request
+        *parts: Resource name, id, version and response format
+
+    Returns:
+        Opaque tag value (unquoted)
+    """
+    digest = hashlib.blake2s(request.query_string, digest_size=6).hexdigest()
+    return "-".join(str(part) for part in parts) + "-" + digest
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Answer a conditional GET whose If-None-Match matches the ETag.
+
+    Args:
+        request: Incoming request
+        etag: Current ETag of the resource (unquoted)
+
+    Returns:
+        An empty 304 response, or None if the client's copy is stale
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_after_create(target: Any, connection: Any, **kwargs: Any) -> None:
+    # The triggers span several tables, so install once all of them exist
+    install_versioning(connection)
@@ -0,0 +1,348 @@
+"""Serialized database writes.
+
+SQLite lets one connection write at a time. When every request thread
+writes through its own connection, bursts of writes queue up on the
+database lock and fail with "database is locked" once the busy timeout runs
+out. Instead, mutating code is packaged as a function of a session and
+handed to a writer:
+
+    result = writer.run(lambda session: do_the_write(session))
+
+``SerializedWriter`` runs these functions one after another on a single
+thread with a single connection, so writes never contend for the lock;
+reads keep using the request-scoped sessions of the read-only pool.
+``GroupCommitWriter`` goes one step further: writes that arrive within a
+few milliseconds of each other are applied in one transaction, each inside
+its own savepoint, and acknowledged together once that transaction commits,
+so a burst of small writes costs one commit instead of one each.
+``InlineWriter`` runs them directly on the caller's session, for tests and
+in-memory databases.
+
+Write functions run outside the request context: they must not touch
+``request`` or ``current_app``, and must return plain data (e.g. a dumped
+schema) rather than ORM objects bound to the writer's session. Exceptions,
+including ``abort()``, propagate to the caller. Anything left uncommitted
+when a function returns is committed for it. Functions run in a copy of the
+caller's context variables, so per-request bookkeeping such as SQL metrics
+follows the write to the writer thread.
+"""
+
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Protocol, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+from kairix_todo.utils.generation import has_uncommitted_writes
+
+T = TypeVar("T")
+
+WriteFunction = Callable[[Any], T]
+
+# Writes waiting for the writer thread before run() blocks the caller
+DEFAULT_MAX_PENDING = 1024
+
+# How long a group commit waits for more writes after the first one, and
+# how many writes it applies at most in one transaction
+DEFAULT_GROUP_WINDOW = 0.002
+DEFAULT_GROUP_SIZE = 256
+
+WRITE_MODE_ENV = "KAIRIX_WRITE_MODE"
+SERIALIZED_MODE = "serialized"
+GROUP_MODE = "group"
+INLINE_MODE = "inline"
+WRITE_MODES = (SERIALIZED_MODE, GROUP_MODE, INLINE_MODE)
+
+Job = Tuple[WriteFunction, Future, contextvars.Context]
+
+
+class Writer(Protocol):
+    """Something that runs write functions against a session."""
+
+    def run(self, fn: WriteFunction, timeout: Optional[float] = None) -> Any:
+        """Run a write function and return its result."""
+        ...  # pragma: no cover
+
+
+class InlineWriter:
+    """Run write functions directly on the caller's session."""
+
+    def __init__(self, session: Any):
+        """Initialize the writer.
+
+        Args:
+            session: Session (or scoped_session registry) to write with
+        """
+        self.session = session
+
+    def run(self, fn: WriteFunction, timeout: Optional[float] = None) -> Any:
+        """Run a write function on the session, committing what it leaves.
+
+        Args:
+            fn: Function taking the session
+            timeout: Ignored; inline writes never wait
+
+        Returns:
+            Whatever fn returns
+        """
+        try:
+            result = fn(self.session)
+            if has_uncommitted_writes(self.session):
+                self.session.commit()
+        except BaseException:
+            self.session.rollback()
+            raise
+        return result
+
+
+class SerializedWriter:
+    """Run write functions one at a time on a dedicated thread."""
+
+    def __init__(self, engine: Any, max_pending: int = DEFAULT_MAX_PENDING):
+        """Start the writer thread.
+
+        Args:
+            engine: Engine to write through; the writer holds one of its
+                connections at a time
+            max_pending: Queued writes before callers block
+        """
+        self._session_factory = sessionmaker(bind=engine)
+        self._queue: "queue.Queue[Any]" = queue.Queue(max_pending)
+        self._thread = threading.Thread(
+            target=self._serve, name="kairix-writer", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, fn: WriteFunction, timeout: Optional[float] = None) -> Any:
+        """Queue a write function and wait for its result.
+
+        Args:
+            fn: Function taking the writer's session
+            timeout: Seconds to wait for the result
+
+        Returns:
+            Whatever fn returns
+
+        Raises:
+            RuntimeError: If the writer has been stopped
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("The database writer is not running.")
+        future: Future = Future()
+        self._queue.put((fn, future, contextvars.copy_context()))
+        return future.result(timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish the queued writes and stop the writer thread.
+
+        Args:
+            timeout: Seconds to wait for the thread
+        """
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _serve(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, future, context = item
+            if future.set_running_or_notify_cancel():
+                context.run(self._apply, fn, future)
+
+    def _apply(self, fn: WriteFunction, future: Future) -> None:
+        session: Session = self._session_factory()
+        try:
+            result = fn(session)
+            if has_uncommitted_writes(session):
+                session.commit()
+        except BaseException as e:
+            session.rollback()
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            session.close()
+
+
+class _GroupSession(Session):
+    """Session whose commit() and rollback() stop at the current savepoint.
+
+    Write functions commit as if they had the session to themselves; inside
+    a group their commit only flushes (and expires loaded objects, as a real
+    commit would) and their rollback only undoes their own savepoint.
+    """
+
+    def commit(self) -> None:
+        if self.in_nested_transaction():
+            self.flush()
+            self.expire_all()
+        else:
+            super().commit()
+
+    def rollback(self) -> None:
+        savepoint = self.get_nested_transaction()
+        if savepoint is not None:
+            savepoint.rollback()
+        else:
+            super().rollback()
+
+
+class GroupCommitWriter(SerializedWriter):
+    """Serialized writer that commits concurrent writes together."""
+
+    def __init__(
+        self,
+        engine: Any,
+        window: float = DEFAULT_GROUP_WINDOW,
+        max_group: int = DEFAULT_GROUP_SIZE,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        """Start the writer thread.
+
+        Args:
+            engine: Engine to write through
+            window: Seconds to wait for more writes after the first one of
+                a group
+            max_group: Most writes applied in one transaction
+            max_pending: Queued writes before callers block
+        """
+        self.window = window
+        self.max_group = max_group
+        super().__init__(engine, max_pending)
+        self._session_factory = sessionmaker(bind=engine, class_=_GroupSession)
+
+    def _serve(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            group = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(group) < self.max_group:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+            self._apply_group(
+                [job for job in group if job[1].set_running_or_notify_cancel()]
+            )
+            if stopping:
+                return
+
+    def _apply_group(self, jobs: List[Job]) -> None:
+        if not jobs:
+            return
+        session: Session = self._session_factory()
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        try:
+            # Take the write lock up front; pysqlite would otherwise start
+            # the transaction lazily and the first RELEASE would commit
+            connection = session.connection()
+            if connection.dialect.name == "sqlite":
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+            for fn, future, context in jobs:
+                outcome = context.run(self._apply_savepoint, session, fn)
+                outcomes.append((future, *outcome))
+            session.commit()
+        except BaseException as e:
+            session.rollback()
+            for _, future, _ in jobs:
+                future.set_exception(e)
+            return
+        finally:
+            session.close()
+
+        for future, succeeded, outcome in outcomes:
+            if succeeded:
+                future.set_result(outcome)
+            else:
+                future.set_exception(outcome)
+
+    def _apply_savepoint(self, session: Session, fn: WriteFunction) -> Tuple[bool, Any]:
+        # A failed write takes back what it recorded in session.info too,
+        # e.g. tag ids that are cached when the transaction commits
+        info = {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in session.info.items()
+        }
+        savepoint = session.begin_nested()
+        try:
+            result = fn(session)
+            if savepoint.is_active:
+                savepoint.commit()
+        except Exception as e:
+            if savepoint.is_active:
+                savepoint.rollback()
+            session.info.clear()
+            session.info.update(info)
+            return False, e
+        return True, result
+
+
+def read_only_engine(engine: Any) -> Any:
+    """Make every new connection of an engine refuse writes.
+
+    Args:
+        engine: SQLite engine used for reads only
+
+    Returns:
+        The same engine
+    """
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def _query_only(dbapi_connection: Any, connection_record: Any) -> None:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("PRAGMA query_only = ON")
+            finally:
+                cursor.close()
+
+    return engine
+
+
+def write_mode_name() -> str:
+    """Return the write mode selected for this deployment.
+
+    Returns:
+        Value of KAIRIX_WRITE_MODE, or "serialized" if unset
+    """
+    return os.environ.get(WRITE_MODE_ENV, SERIALIZED_MODE)
+
+
+def create_writer(mode: str, engine: Any, session: Any) -> Writer:
+    """Create the writer for a write mode.
+
+    Args:
+        mode: "serialized" for a dedicated writer thread, "group" for a
+            writer thread that commits concurrent writes together, "inline"
+            to write on the request's own session
+        engine: Engine the serialized writer writes through
+        session: Session registry inline writes use
+
+    Returns:
+        Writer
+
+    Raises:
+        ValueError: If the mode does not exist
+    """
+    if mode == SERIALIZED_MODE:
+        return SerializedWriter(engine)
+    if mode == GROUP_MODE:
+        return GroupCommitWriter(engine)
+    if mode == INLINE_MODE:
+        return InlineWriter(session)
+    raise ValueError(
+        f"Unknown write mode '{mode}'. Expected one of: " + ", ".join(WRITE_MODES)
+    )
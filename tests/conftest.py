@@ -11,10 +11,12 @@ from sqlalchemy.orm import Session, sessionmaker
 # Add kairix_todo to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
+from kairix_todo.controller.bulk_controller import BulkController
 from kairix_todo.controller.search_controller import SearchController
 from kairix_todo.controller.tag_controller import TagController
 from kairix_todo.controller.task_controller import TaskController
 from kairix_todo.models import Base
+from kairix_todo.utils.tag_cache import TagCache
 
 
 @pytest.fixture
@@ -23,13 +25,16 @@ def app(db_session: Session) -> Generator[Flask, None, None]:
     app.config["TESTING"] = True
 
     # Register controllers
-    task_controller = TaskController(db_session)
-    tag_controller = TagController(db_session)
+    tag_cache = TagCache()
+    task_controller = TaskController(db_session, tag_cache=tag_cache)
+    tag_controller = TagController(db_session, tag_cache=tag_cache)
     search_controller = SearchController(db_session)
+    bulk_controller = BulkController(db_session)
 
     app.register_blueprint(task_controller.blueprint)
     app.register_blueprint(tag_controller.blueprint)
     app.register_blueprint(search_controller.blueprint)
+    app.register_blueprint(bulk_controller.blueprint)
 
     yield app
 
@@ -0,0 +1,39 @@
+"""Tests for the admin controller."""
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from kairix_todo.controller.admin_controller import AdminController
+from kairix_todo.utils.slow_queries import SlowQueryLog
+
+
+def test_slow_queries_endpoint(tmp_path) -> None:
+    """Test slow queries can be listed, filtered and cleared."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'admin.db'}")
+    log = SlowQueryLog(threshold_ms=0)
+    log.instrument(engine)
+    app = Flask(__name__)
+    app.register_blueprint(AdminController(log).blueprint)
+
+    @app.route("/work")
+    def work():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {}
+
+    client = app.test_client()
+    client.get("/work")
+    engine.dispose()
+
+    data = client.get("/admin/slow-queries").get_json()
+    assert data["threshold_ms"] == 0
+    assert [entry["statement"] for entry in data["entries"]] == [
+        "SELECT 2",
+        "SELECT 1",
+    ]
+    assert len(client.get("/admin/slow-queries?limit=1").get_json()["entries"]) == 1
+    assert client.get("/admin/slow-queries?endpoint=other").get_json()["entries"] == []
+
+    assert client.delete("/admin/slow-queries").status_code == 204
+    assert client.get("/admin/slow-queries").get_json()["entries"] == []
@@ -0,0 +1,215 @@
+"""Tests for the bulk task endpoints."""
+
+import json
+from datetime import date
+
+from flask.testing import FlaskClient
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Tag, Task
+from kairix_todo.utils.query_counter import QueryCounter
+
+
+def test_bulk_create(client: FlaskClient, db_session: Session) -> None:
+    """Test creating several tasks with shared and existing tags."""
+    db_session.add(Tag(name="work"))
+    db_session.commit()
+
+    response = client.post(
+        "/tasks/bulk",
+        json=[
+            {"title": "Report", "tags": ["work", "urgent"], "due_date": "2025-03-01"},
+            {"title": "Email", "tags": ["work", "work"], "completed": True},
+            {"title": "Nap"},
+        ],
+    )
+
+    assert response.status_code == 201
+    results = response.get_json()
+    assert [result["index"] for result in results] == [0, 1, 2]
+
+    report = db_session.get(Task, results[0]["id"])
+    assert sorted(tag.name for tag in report.tags) == ["urgent", "work"]
+    assert report.due_date == date(2025, 3, 1)
+    assert db_session.get(Task, results[1]["id"]).completed is True
+    assert db_session.query(Tag).count() == 2
+
+    # Bulk-created tasks are searchable like any other
+    assert len(client.get("/tasks/search?q=report").get_json()) == 1
+    assert len(client.get("/tasks/search?tags=work").get_json()) == 2
+
+
+def test_bulk_create_partial_failure(client: FlaskClient, db_session: Session) -> None:
+    """Test that invalid items are reported while valid ones are created."""
+    response = client.post(
+        "/tasks/bulk",
+        json=[{"title": "Valid"}, {"title": ""}, {"title": "Bad date", "due_date": 5}],
+    )
+
+    assert response.status_code == 207
+    results = response.get_json()
+    assert "id" in results[0]
+    assert results[1] == {"index": 1, "error": "Title cannot be empty"}
+    assert "due_date" in results[2]["error"]
+    assert db_session.query(Task).count() == 1
+
+    response = client.post("/tasks/bulk", json=[{"title": "x", "owner": "me"}])
+    assert response.status_code == 400
+    assert response.get_json()[0]["error"] == "Unknown fields: owner"
+
+
+def test_bulk_create_rejects_non_array(client: FlaskClient) -> None:
+    """Test that the body must be a JSON array."""
+    assert client.post("/tasks/bulk", json={"title": "x"}).status_code == 400
+
+
+def test_bulk_create_statement_count(client: FlaskClient, db_session: Session) -> None:
+    """Test that the number of statements does not grow with the batch size."""
+
+    def count(size: int, prefix: str) -> int:
+        items = [
+            {"title": f"{prefix} {i}", "tags": [f"{prefix}-{i % 5}", "shared"]}
+            for i in range(size)
+        ]
+        with QueryCounter(db_session.get_bind()) as counter:
+            response = client.post("/tasks/bulk", json=items)
+        assert response.status_code == 201
+        return counter.count
+
+    assert count(2, "small") == count(200, "large")
+
+
+def _seed(db_session: Session) -> dict:
+    work = Tag(name="work")
+    tasks = {
+        "report": Task(title="Write report", tags=[work]),
+        "email": Task(title="Send email", tags=[work]),
+        "nap": Task(title="Take a nap"),
+    }
+    db_session.add_all(tasks.values())
+    db_session.commit()
+    return {name: task.id for name, task in tasks.items()}
+
+
+def test_bulk_complete_by_ids(client: FlaskClient, db_session: Session) -> None:
+    """Test completing tasks by id, ignoring unknown ids."""
+    ids = _seed(db_session)
+
+    response = client.post(
+        "/tasks/bulk/complete", json={"ids": [ids["report"], ids["nap"], "missing"]}
+    )
+    assert response.status_code == 200
+    assert response.get_json() == {"matched": 2, "updated": 2}
+
+    # Already completed tasks are not rewritten
+    response = client.post("/tasks/bulk/complete", json={"ids": [ids["report"]]})
+    assert response.get_json() == {"matched": 1, "updated": 0}
+
+    db_session.expire_all()
+    assert db_session.get(Task, ids["report"]).completed is True
+    assert db_session.get(Task, ids["email"]).completed is False
+
+
+def test_bulk_complete_by_filter(client: FlaskClient, db_session: Session) -> None:
+    """Test completing the tasks matched by a search filter."""
+    ids = _seed(db_session)
+
+    response = client.post(
+        "/tasks/bulk/complete", json={"filter": {"tags": ["work"], "q": "report"}}
+    )
+    assert response.get_json() == {"matched": 1, "updated": 1}
+    db_session.expire_all()
+    assert db_session.get(Task, ids["report"]).completed is True
+
+    response = client.post(
+        "/tasks/bulk/complete", json={"filter": {"completed": True}, "completed": False}
+    )
+    assert response.get_json() == {"matched": 1, "updated": 1}
+
+
+def test_bulk_retag(client: FlaskClient, db_session: Session) -> None:
+    """Test adding and removing tags without duplicating links."""
+    ids = _seed(db_session)
+
+    response = client.post(
+        "/tasks/bulk/retag",
+        json={"filter": {"tags": ["work"]}, "add": ["done", "work"], "remove": []},
+    )
+    assert response.get_json() == {"matched": 2, "added": 2, "removed": 0}
+
+    response = client.post(
+        "/tasks/bulk/retag", json={"ids": list(ids.values()), "remove": ["work"]}
+    )
+    assert response.get_json() == {"matched": 3, "added": 0, "removed": 2}
+
+    db_session.expire_all()
+    assert [tag.name for tag in db_session.get(Task, ids["email"]).tags] == ["done"]
+    assert db_session.get(Task, ids["nap"]).tags == []
+    assert len(client.get("/tasks/search?tags=done").get_json()) == 2
+
+
+def test_bulk_delete(client: FlaskClient, db_session: Session) -> None:
+    """Test deleting tasks along with their reminders and tag links."""
+    ids = _seed(db_session)
+    client.post(
+        f"/tasks/{ids['report']}/reminders", json={"remind_at": "2025-01-01T09:00"}
+    )
+
+    response = client.post("/tasks/bulk/delete", json={"filter": {"tags": ["work"]}})
+    assert response.get_json() == {"matched": 2, "deleted": 2}
+
+    db_session.expire_all()
+    assert [task.id for task in db_session.query(Task)] == [ids["nap"]]
+    assert db_session.get(Tag, db_session.query(Tag.id).scalar()).tasks == []
+
+
+def test_bulk_change_selector_errors(client: FlaskClient, db_session: Session) -> None:
+    """Test that bulk changes need exactly one valid selector."""
+    ids = _seed(db_session)
+
+    for body in (
+        {},
+        {"ids": [ids["nap"]], "filter": {"q": "nap"}},
+        {"filter": {}},
+        {"filter": {"owner": "me"}},
+        {"filter": {"from_date": "soon"}},
+        {"ids": "all"},
+    ):
+        assert client.post("/tasks/bulk/delete", json=body).status_code == 400
+    assert db_session.query(Task).count() == 3
+
+
+def test_export_and_import(client: FlaskClient, db_session: Session) -> None:
+    """Test exporting tasks and importing the file back."""
+    db_session.add(Task(title="Report", tags=[Tag(name="work")]))
+    db_session.commit()
+
+    response = client.get("/tasks/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert "attachment" in response.headers["Content-Disposition"]
+    lines = response.data.decode().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["tags"] == ["work"]
+
+    csv_response = client.get("/tasks/export?format=csv")
+    assert csv_response.mimetype == "text/csv"
+    assert csv_response.data.decode().splitlines()[0].startswith("id,title,")
+
+    new_task = json.dumps({"title": "Dishes", "tags": ["home"]}).encode()
+    response = client.post(
+        "/tasks/import",
+        data=response.data + new_task,
+        content_type="application/x-ndjson",
+    )
+    assert response.status_code == 200
+    report = response.get_json()
+    assert report["imported"] == 1
+    assert report["skipped"] == 1
+
+    response = client.post(
+        "/tasks/import", data=csv_response.data, content_type="text/csv"
+    )
+    assert response.get_json()["skipped"] == 1
+
+    assert client.get("/tasks/export?format=xml").status_code == 400
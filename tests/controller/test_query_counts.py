@@ -0,0 +1,70 @@
+"""Tests that read endpoints issue a fixed number of SQL statements."""
+
+from datetime import datetime
+from typing import List
+
+import pytest
+from flask.testing import FlaskClient
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Reminder, Tag, Task
+from kairix_todo.utils.generation import bump_generation
+from kairix_todo.utils.query_counter import QueryCounter
+
+
+def _add_tasks(db_session: Session, count: int) -> List[str]:
+    tags = db_session.query(Tag).order_by(Tag.name).all() or [
+        Tag(name=f"tag-{i}") for i in range(3)
+    ]
+    tasks = []
+    for i in range(count):
+        task = Task(title=f"Report {i}", tags=tags[: i % 3 + 1])
+        task.reminders = [Reminder(remind_at=datetime(2025, 1, 1 + i % 28))]
+        tasks.append(task)
+    db_session.add_all(tasks)
+    db_session.commit()
+    task_ids = [task.id for task in tasks]
+    # Start every request from an empty identity map, like a fresh session
+    db_session.expunge_all()
+    return task_ids
+
+
+def _count(client: FlaskClient, db_session: Session, url: str) -> int:
+    # Measure the database work, not the search result cache
+    bump_generation()
+    with QueryCounter(db_session.get_bind()) as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/tasks/",
+        "/tasks/?limit=50",
+        "/tasks/search?limit=50",
+        "/tasks/search?q=report&limit=50",
+        "/tasks/search?tags=tag-1&limit=50",
+    ],
+)
+def test_list_queries_independent_of_size(
+    client: FlaskClient, db_session: Session, url: str
+) -> None:
+    """Test that listing 1 or 25 tasks costs the same number of statements."""
+    _add_tasks(db_session, 1)
+    # Warm up per-engine checks and in-memory indexes
+    client.get(url)
+    small = _count(client, db_session, url)
+
+    _add_tasks(db_session, 24)
+    large = _count(client, db_session, url)
+
+    assert large == small
+
+
+def test_get_task_single_statement(client: FlaskClient, db_session: Session) -> None:
+    """Test that fetching a task loads it with its relationships in one query."""
+    task_id = _add_tasks(db_session, 3)[1]
+
+    assert _count(client, db_session, f"/tasks/{task_id}") == 1
@@ -7,6 +7,8 @@ import pytest
 from flask.testing import FlaskClient
 
 from kairix_todo.models import Task
+from kairix_todo.utils.archive import archive_completed
+from kairix_todo.utils.writer import InlineWriter
 
 
 def test_search_endpoint_basic(client: FlaskClient, db_session) -> None:
@@ -213,3 +215,171 @@ def test_search_response_format(client: FlaskClient, db_session) -> None:
     assert task_data["additional_details"] == "Test description"
     assert task_data["completed"] is False
     assert task_data["reminders"] == []
+
+
+def test_search_invalid_match_mode(client: FlaskClient) -> None:
+    """Test that an unknown match mode is rejected."""
+    response = client.get("/tasks/search?q=team&match_mode=fuzzy")
+
+    assert response.status_code == 400
+
+
+def test_search_with_cursor(client: FlaskClient, db_session) -> None:
+    """Test cursor pagination through the search endpoint."""
+    tasks = [Task(title=f"Task {i}") for i in range(5)]
+
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    response = client.get("/tasks/search?limit=3")
+    first_page = json.loads(response.data)
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/tasks/search?limit=3&cursor={cursor}")
+    second_page = json.loads(response.data)
+
+    assert len(first_page) == 3
+    assert len(second_page) == 2
+    assert "X-Next-Cursor" not in response.headers
+    assert not {t["id"] for t in first_page} & {t["id"] for t in second_page}
+
+
+def test_search_invalid_cursor(client: FlaskClient) -> None:
+    """Test that a malformed cursor is rejected."""
+    response = client.get("/tasks/search?cursor=garbage")
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_search_invalid_limit(client: FlaskClient, db_session, limit: int) -> None:
+    """Test that a limit below 1 is rejected by every search path."""
+    db_session.add(Task(title="Task"))
+    db_session.commit()
+
+    for params in ("", "&completed=true", "&q=Task"):
+        response = client.get(f"/tasks/search?limit={limit}{params}")
+        assert response.status_code == 400
+
+        response = client.get(
+            f"/tasks/search?limit={limit}{params}",
+            headers={"Accept": "application/x-ndjson"},
+        )
+        assert response.status_code == 400
+
+
+def test_search_include_total(client: FlaskClient, db_session) -> None:
+    """Test the total count header for each include_total mode."""
+    db_session.add_all([Task(title=f"Task {i}") for i in range(3)])
+    db_session.commit()
+
+    response = client.get("/tasks/search?limit=1")
+    assert "X-Total-Count" not in response.headers
+
+    response = client.get("/tasks/search?limit=1&include_total=true")
+    assert response.headers["X-Total-Count"] == "3"
+
+    response = client.get("/tasks/search?limit=1&include_total=estimate")
+    assert response.headers["X-Total-Count"] == "3"
+
+    response = client.get("/tasks/search?include_total=maybe")
+    assert response.status_code == 400
+
+
+def test_search_results_cached_until_write(client: FlaskClient, db_session) -> None:
+    """Test that repeated searches hit the cache and writes invalidate it."""
+    db_session.add(Task(title="Team sync"))
+    db_session.commit()
+
+    first = client.get("/tasks/search?q=team")
+    second = client.get("/tasks/search?q=TEAM")
+
+    assert first.data == second.data
+    stats = client.get("/tasks/search/cache").get_json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    client.post("/tasks/", json={"title": "Team retro"})
+
+    response = client.get("/tasks/search?q=team")
+    assert len(json.loads(response.data)) == 2
+
+
+def test_search_with_tags(client: FlaskClient) -> None:
+    """Test tag filtering through the search endpoint."""
+    client.post("/tasks/", json={"title": "Report", "tags": ["work", "urgent"]})
+    client.post("/tasks/", json={"title": "Email", "tags": ["work"]})
+    client.post("/tasks/", json={"title": "Dishes", "tags": ["home"]})
+
+    response = client.get("/tasks/search?tags=work,urgent")
+    data = json.loads(response.data)
+    assert [task["title"] for task in data] == ["Report"]
+
+    response = client.get("/tasks/search?tags=urgent,home&tags_operator=or")
+    data = json.loads(response.data)
+    assert sorted(task["title"] for task in data) == ["Dishes", "Report"]
+
+    response = client.get("/tasks/search?tags=work&tags_operator=xor")
+    assert response.status_code == 400
+
+
+def test_search_streams_ndjson(client: FlaskClient, db_session) -> None:
+    """Test that search results can be streamed as NDJSON."""
+    db_session.add_all([Task(title=f"Report {i}") for i in range(3)])
+    db_session.add(Task(title="Groceries"))
+    db_session.commit()
+
+    response = client.get(
+        "/tasks/search?q=report", headers={"Accept": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert len(lines) == 3
+    assert all(line["title"].startswith("Report") for line in lines)
+
+    response = client.get("/tasks/search?stream=1&limit=2")
+    assert len(response.data.decode().splitlines()) == 2
+
+
+def test_search_completed_includes_archive(client: FlaskClient, db_session) -> None:
+    """Test that searches for completed tasks also return archived ones."""
+    old = Task(title="Old report", completed=True)
+    old.completed_at = datetime.utcnow() - timedelta(days=100)
+    db_session.add_all([old, Task(title="New report", completed=True)])
+    db_session.add(Task(title="Open report"))
+    db_session.commit()
+    archive_completed(InlineWriter(db_session), 30)
+
+    response = client.get("/tasks/search?completed=true&include_total=true")
+    assert response.headers["X-Total-Count"] == "2"
+    assert [task["title"] for task in response.get_json()] == [
+        "Old report",
+        "New report",
+    ]
+
+    response = client.get(
+        "/tasks/search?q=report&completed=true&offset=1",
+        headers={"Accept": "application/x-ndjson"},
+    )
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert len(lines) == 1
+
+    response = client.get("/tasks/search?completed=false")
+    assert [task["title"] for task in response.get_json()] == ["Open report"]
+
+
+def test_search_cache_keeps_substring_queries_apart(
+    client: FlaskClient, db_session, monkeypatch
+) -> None:
+    """Test that queries differing in spaces are cached apart without FTS."""
+    monkeypatch.setattr(
+        "kairix_todo.utils.search_utils.has_fts_index", lambda session: False
+    )
+    db_session.add_all([Task(title="Plan  B"), Task(title="Plan B")])
+    db_session.commit()
+
+    for query, title in (("plan  b", "Plan  B"), ("plan b", "Plan B")):
+        response = client.get("/tasks/search", query_string={"q": query})
+        assert [task["title"] for task in response.get_json()] == [title]
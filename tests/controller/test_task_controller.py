@@ -1,6 +1,10 @@
+import json
 from datetime import datetime
 
-from kairix_todo.models import Reminder, Tag, Task
+from kairix_todo.models import ArchivedReminder, ArchivedTask, Reminder, Tag, Task
+from kairix_todo.utils.archive import archive_completed
+from kairix_todo.utils.query_counter import QueryCounter
+from kairix_todo.utils.writer import InlineWriter
 
 
 def test_create_task(client, db_session):
@@ -66,6 +70,63 @@ def test_get_task(client, db_session):
     assert data["title"] == "Fetch Me"
 
 
+def test_get_archived_task(client, db_session):
+    task = Task(title="Archived", completed=True, tags=[Tag(name="old")])
+    task.completed_at = datetime(2020, 1, 1)
+    db_session.add(task)
+    db_session.commit()
+    task_id = task.id
+    archive_completed(InlineWriter(db_session), 30)
+    db_session.expunge_all()
+
+    response = client.get(f"/tasks/{task_id}")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["title"] == "Archived"
+    assert [tag["name"] for tag in data["tags"]] == ["old"]
+
+    cached = client.get(
+        f"/tasks/{task_id}", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert cached.status_code == 304
+
+    # Renaming or deleting its tag changes the archived task's representation
+    tag_id = data["tags"][0]["id"]
+    assert client.put(f"/tags/{tag_id}", json={"name": "older"}).status_code == 200
+    renamed = client.get(
+        f"/tasks/{task_id}", headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert renamed.status_code == 200
+    assert [tag["name"] for tag in renamed.get_json()["tags"]] == ["older"]
+
+    assert client.delete(f"/tags/{tag_id}").status_code == 204
+    untagged = client.get(
+        f"/tasks/{task_id}", headers={"If-None-Match": renamed.headers["ETag"]}
+    )
+    assert untagged.status_code == 200
+    assert untagged.get_json()["tags"] == []
+
+
+def test_delete_archived_task(client, db_session):
+    task = Task(title="Archived", completed=True, tags=[Tag(name="old")])
+    task.completed_at = datetime(2020, 1, 1)
+    task.reminders.append(Reminder(remind_at=datetime(2020, 1, 2)))
+    db_session.add(task)
+    db_session.commit()
+    task_id = task.id
+    archive_completed(InlineWriter(db_session), 30)
+    db_session.expunge_all()
+
+    # Archived tasks are read-only, but can be deleted
+    assert client.patch(f"/tasks/{task_id}", json={"title": "New"}).status_code == 404
+    assert client.delete(f"/tasks/{task_id}").status_code == 204
+    assert client.get(f"/tasks/{task_id}").status_code == 404
+    assert client.delete(f"/tasks/{task_id}").status_code == 404
+    for model in (ArchivedReminder, ArchivedTask):
+        assert db_session.query(model).count() == 0
+    assert db_session.query(Tag).count() == 1
+
+
 def test_list_tasks(client, db_session):
     tasks = [Task(title="Task 1"), Task(title="Task 2")]
     db_session.add_all(tasks)
@@ -77,6 +138,52 @@ def test_list_tasks(client, db_session):
     assert len(data) == 2
 
 
+def test_list_tasks_with_cursor(client, db_session):
+    tasks = [Task(title=f"Task {i}") for i in range(5)]
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    response = client.get("/tasks/?limit=2")
+    assert response.status_code == 200
+    pages = [response.get_json()]
+    while "X-Next-Cursor" in response.headers:
+        cursor = response.headers["X-Next-Cursor"]
+        response = client.get(f"/tasks/?limit=2&cursor={cursor}")
+        assert response.status_code == 200
+        pages.append(response.get_json())
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    ids = [task["id"] for page in pages for task in page]
+    assert sorted(ids) == sorted(task.id for task in tasks)
+
+
+def test_list_tasks_invalid_cursor(client, db_session):
+    response = client.get("/tasks/?cursor=garbage")
+    assert response.status_code == 400
+
+
+def test_list_tasks_invalid_limit(client, db_session):
+    db_session.add(Task(title="Task"))
+    db_session.commit()
+
+    assert client.get("/tasks/?limit=0").status_code == 400
+    assert client.get("/tasks/?limit=-1").status_code == 400
+
+
+def test_list_tasks_streams_ndjson(client, db_session):
+    tasks = [Task(title=f"Task {i}") for i in range(3)]
+    db_session.add_all(tasks)
+    db_session.commit()
+    client.post(f"/tasks/{tasks[0].id}/reminders", json={"remind_at": "2023-10-10"})
+
+    response = client.get("/tasks/?stream=1")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines == client.get("/tasks/").get_json()
+    assert len(lines[0]["reminders"]) == 1
+
+
 def test_search_tasks(client, db_session):
     task1 = Task(title="Searchable Task 1")
     task2 = Task(title="Searchable Task 2")
@@ -201,3 +308,85 @@ def test_delete_tag(client, db_session):
 
     response = client.delete(f"/tags/{tag.id}")
     assert response.status_code == 204
+
+
+def test_list_tasks_conditional_get(client, db_session):
+    db_session.add(Task(title="Cached"))
+    db_session.commit()
+
+    response = client.get("/tasks/")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/tasks/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    # Different query strings are different representations
+    paged = client.get("/tasks/?limit=1", headers={"If-None-Match": etag})
+    assert paged.status_code == 200
+
+    db_session.add(Task(title="New"))
+    db_session.commit()
+    response = client.get("/tasks/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()) == 2
+
+
+def test_get_task_conditional_get(client, db_session):
+    task = Task(title="Cached")
+    db_session.add(task)
+    db_session.commit()
+    task_id = task.id
+
+    etag = client.get(f"/tasks/{task_id}").headers["ETag"]
+    db_session.expunge_all()
+
+    with QueryCounter(db_session.get_bind()) as counter:
+        cached = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert counter.count == 1
+    assert not db_session.identity_map
+
+    client.post(f"/tasks/{task_id}/reminders", json={"remind_at": "2025-01-01T09:00"})
+    response = client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.get_json()["reminders"]) == 1
+
+    missing = client.get("/tasks/missing", headers={"If-None-Match": etag})
+    assert missing.status_code == 404
+
+
+def test_tags_conditional_get(client, db_session):
+    tag = Tag(name="Cached")
+    db_session.add(tag)
+    db_session.commit()
+    tag_id = tag.id
+
+    list_etag = client.get("/tags/").headers["ETag"]
+    tag_etag = client.get(f"/tags/{tag_id}").headers["ETag"]
+    assert client.get("/tags/", headers={"If-None-Match": list_etag}).status_code == 304
+    assert (
+        client.get(f"/tags/{tag_id}", headers={"If-None-Match": tag_etag}).status_code
+        == 304
+    )
+
+    client.put(f"/tags/{tag_id}", json={"name": "Renamed"})
+    assert client.get("/tags/", headers={"If-None-Match": list_etag}).status_code == 200
+    assert (
+        client.get(f"/tags/{tag_id}", headers={"If-None-Match": tag_etag}).status_code
+        == 200
+    )
+
+
+def test_create_task_reuses_renamed_tag_names(client, db_session):
+    client.post("/tasks/", json={"title": "First", "tags": ["work"]})
+    tag = db_session.query(Tag).filter_by(name="work").one()
+
+    client.put(f"/tags/{tag.id}", json={"name": "office"})
+    response = client.post("/tasks/", json={"title": "Second", "tags": ["work"]})
+
+    assert response.status_code == 201
+    assert response.get_json()["tags"][0]["id"] != tag.id
+    assert sorted(tag.name for tag in db_session.query(Tag)) == ["office", "work"]
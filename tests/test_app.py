@@ -0,0 +1,137 @@
+"""Tests for the application factory."""
+
+from typing import Generator
+
+import pytest
+from flask import Flask
+
+from kairix_todo.app import EXTENSION_KEY, create_app
+from kairix_todo.utils.writer import GROUP_MODE, INLINE_MODE, SERIALIZED_MODE
+
+
+@pytest.fixture
+def factory_app(tmp_path) -> Generator[Flask, None, None]:
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tasks.db'}",
+            "SLOW_QUERY_LOG": str(tmp_path / "slow_queries.log"),
+            "WRITE_MODE": INLINE_MODE,
+            "ARCHIVE_AFTER_DAYS": None,
+        }
+    )
+    yield app
+    app.extensions[EXTENSION_KEY].shutdown()
+
+
+def test_database_prepared_on_first_request(factory_app: Flask, tmp_path) -> None:
+    """Test creating the app leaves the database alone until a request."""
+    assert not (tmp_path / "tasks.db").exists()
+    assert "ID_STORAGE" not in factory_app.config
+
+    client = factory_app.test_client()
+    assert client.get("/health").get_json() == {"status": "running"}
+    assert (tmp_path / "tasks.db").exists()
+    assert factory_app.config["ID_STORAGE"] == "text"
+
+    response = client.post("/tasks/", json={"title": "Boot", "tags": ["work"]})
+    assert response.status_code == 201
+    assert len(client.get("/tasks/").get_json()) == 1
+
+
+def test_slow_query_log_created_on_first_entry(tmp_path) -> None:
+    """Test creating the app does not create the slow query log."""
+    log_path = tmp_path / "logs" / "slow_queries.log"
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tasks.db'}",
+            "SLOW_QUERY_LOG": str(log_path),
+            "SLOW_QUERY_MS": 0,
+            "WRITE_MODE": INLINE_MODE,
+            "ARCHIVE_AFTER_DAYS": None,
+        }
+    )
+    try:
+        assert not log_path.parent.exists()
+        assert app.test_client().get("/tasks/").status_code == 200
+        assert log_path.exists()
+    finally:
+        app.extensions[EXTENSION_KEY].shutdown()
+
+
+def test_apps_are_independent(factory_app: Flask, tmp_path) -> None:
+    """Test two apps from the factory keep their own databases."""
+    other = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'other.db'}",
+            "SLOW_QUERY_LOG": str(tmp_path / "other.log"),
+            "WRITE_MODE": INLINE_MODE,
+            "ARCHIVE_AFTER_DAYS": None,
+        }
+    )
+    try:
+        factory_app.test_client().post("/tasks/", json={"title": "Mine"})
+        assert other.test_client().get("/tasks/").get_json() == []
+    finally:
+        other.extensions[EXTENSION_KEY].shutdown()
+
+
+@pytest.mark.parametrize("write_mode", [SERIALIZED_MODE, GROUP_MODE])
+def test_writer_thread_modes(tmp_path, write_mode: str) -> None:
+    """Test requests write through the writer thread and read what it wrote."""
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tasks.db'}",
+            "SLOW_QUERY_LOG": str(tmp_path / "slow_queries.log"),
+            "WRITE_MODE": write_mode,
+            "ARCHIVE_AFTER_DAYS": None,
+        }
+    )
+    services = app.extensions[EXTENSION_KEY]
+    assert services.read_engine is not services.engine
+    try:
+        client = app.test_client()
+        created = client.post("/tasks/", json={"title": "Queued", "tags": ["work"]})
+        assert created.status_code == 201
+        task_id = created.get_json()["id"]
+
+        assert client.patch(f"/tasks/{task_id}/complete").status_code == 200
+        assert client.get(f"/tasks/{task_id}").get_json()["completed"] is True
+        assert [tag["name"] for tag in client.get("/tags/").get_json()] == ["work"]
+    finally:
+        services.shutdown()
+
+
+def test_memory_database_writes_inline(tmp_path) -> None:
+    """Test an in-memory database is not split across a writer and readers."""
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "SLOW_QUERY_LOG": str(tmp_path / "slow_queries.log"),
+            "WRITE_MODE": SERIALIZED_MODE,
+            "ARCHIVE_AFTER_DAYS": None,
+        }
+    )
+    services = app.extensions[EXTENSION_KEY]
+    try:
+        assert app.config["WRITE_MODE"] == INLINE_MODE
+        assert services.read_engine is services.engine
+
+        client = app.test_client()
+        assert client.post("/tasks/", json={"title": "Memory"}).status_code == 201
+        assert len(client.get("/tasks/").get_json()) == 1
+    finally:
+        services.shutdown()
+
+
+def test_swagger_json(factory_app: Flask) -> None:
+    """Test the OpenAPI spec is served compressed when accepted."""
+    client = factory_app.test_client()
+    plain = client.get("/api/swagger.json")
+    assert plain.status_code == 200
+    assert "Content-Encoding" not in plain.headers
+    assert "/tasks/{task_id}" in plain.get_json()["paths"]
+
+    compressed = client.get("/api/swagger.json", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert len(compressed.data) < len(plain.data)
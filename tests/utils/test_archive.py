@@ -0,0 +1,147 @@
+"""Tests for archiving completed tasks."""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import (
+    ArchivedReminder,
+    ArchivedTask,
+    Reminder,
+    Tag,
+    Task,
+    archived_task_tags,
+)
+from kairix_todo.utils.archive import archive_batch, archive_completed
+from kairix_todo.utils.search_utils import search_tasks_page
+from kairix_todo.utils.writer import InlineWriter
+
+NOW = datetime(2026, 6, 1)
+
+
+def _add_task(session: Session, title: str, completed_days_ago=None) -> Task:
+    task = Task(title=title, tags=[_tag(session, "work")])
+    if completed_days_ago is not None:
+        task.completed = True
+        task.completed_at = NOW - timedelta(days=completed_days_ago)
+    task.reminders.append(Reminder(remind_at=NOW))
+    session.add(task)
+    session.commit()
+    return task
+
+
+def _tag(session: Session, name: str) -> Tag:
+    tag = session.execute(select(Tag).where(Tag.name == name)).scalar()
+    return tag or Tag(name=name)
+
+
+def test_completed_at_follows_completion(db_session: Session) -> None:
+    """Test completing a task stamps completed_at and reopening clears it."""
+    task = Task(title="Report")
+    db_session.add(task)
+    db_session.commit()
+    assert task.completed_at is None
+
+    task.completed = True
+    db_session.commit()
+    stamped = task.completed_at
+    assert stamped is not None
+
+    task.completed = True
+    assert task.completed_at == stamped
+
+    task.completed = False
+    db_session.commit()
+    assert task.completed_at is None
+
+
+def test_archive_completed(db_session: Session) -> None:
+    """Test old completed tasks move with their tags and reminders."""
+    old = _add_task(db_session, "Old report", completed_days_ago=100)
+    recent = _add_task(db_session, "Recent report", completed_days_ago=5)
+    open_task = _add_task(db_session, "Open report")
+    old_id = old.id
+
+    moved = archive_completed(InlineWriter(db_session), 30, batch_size=1, now=NOW)
+    assert moved == 1
+
+    remaining = db_session.execute(select(Task.id)).scalars().all()
+    assert sorted(remaining) == sorted([recent.id, open_task.id])
+    archived = db_session.get(ArchivedTask, old_id)
+    assert archived.title == "Old report"
+    assert archived.completed
+    assert [tag.name for tag in archived.tags] == ["work"]
+    assert len(archived.reminders) == 1
+    assert (
+        db_session.execute(
+            select(func.count()).select_from(Reminder).where(Reminder.task_id == old_id)
+        ).scalar()
+        == 0
+    )
+
+    # Nothing is left to move
+    assert archive_batch(db_session, NOW - timedelta(days=30)) == 0
+
+
+def test_deleting_tag_removes_archived_links(db_session: Session) -> None:
+    """Test archived tasks lose the links to a deleted tag."""
+    task = _add_task(db_session, "Old report", completed_days_ago=100)
+    task_id = task.id
+    archive_completed(InlineWriter(db_session), 30, now=NOW)
+
+    db_session.delete(_tag(db_session, "work"))
+    db_session.commit()
+
+    links = db_session.execute(
+        select(func.count()).select_from(archived_task_tags)
+    ).scalar()
+    assert links == 0
+    assert db_session.get(ArchivedTask, task_id) is not None
+    assert (
+        db_session.execute(select(func.count()).select_from(ArchivedReminder)).scalar()
+        == 1
+    )
+
+
+def test_search_includes_archive(db_session: Session) -> None:
+    """Test completed searches merge archived tasks into the same ordering."""
+    for days in (100, 90, 80):
+        _add_task(db_session, f"Archived report {days}", completed_days_ago=days)
+    archive_completed(InlineWriter(db_session), 30, now=NOW)
+    for days in (3, 2):
+        _add_task(db_session, f"Live report {days}", completed_days_ago=days)
+    _add_task(db_session, "Open report")
+
+    page = search_tasks_page(db_session, completed=True, archive=True, limit=2)
+    assert page.total == 5
+    titles = [task.title for task in page.tasks]
+    while page.next_cursor:
+        page = search_tasks_page(
+            db_session,
+            completed=True,
+            archive=True,
+            limit=2,
+            cursor=page.next_cursor,
+        )
+        titles.extend(task.title for task in page.tasks)
+    # Created oldest first, archived or not
+    assert titles == [
+        "Archived report 100",
+        "Archived report 90",
+        "Archived report 80",
+        "Live report 3",
+        "Live report 2",
+    ]
+
+    page = search_tasks_page(
+        db_session, query="archived", completed=True, archive=True, offset=1
+    )
+    assert page.total == 3
+    assert len(page.tasks) == 2
+
+    page = search_tasks_page(db_session, completed=True, tags=["work"], archive=True)
+    assert page.total == 5
+
+    page = search_tasks_page(db_session, completed=True)
+    assert page.total == 2
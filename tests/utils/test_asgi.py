@@ -0,0 +1,188 @@
+"""Tests for serving the WSGI app over ASGI."""
+
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+from flask import Flask, Response, request, stream_with_context
+
+from kairix_todo.utils import asgi
+from kairix_todo.utils.asgi import AsgiAdapter, build_environ
+
+
+def _flask_app() -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return {"body": request.get_json(), "q": request.args.get("q")}, 201
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            for n in range(3):
+                yield f"{request.path}:{n}\n"
+
+        return Response(stream_with_context(generate()), mimetype="text/plain")
+
+    @app.route("/size", methods=["POST"])
+    def size():
+        total = 0
+        while True:
+            chunk = request.stream.read(1000)
+            if not chunk:
+                return {"size": total}
+            total += len(chunk)
+
+    return app
+
+
+def _request(
+    adapter: AsgiAdapter,
+    method: str,
+    path: str,
+    body_chunks: List[bytes] = (),
+    query: bytes = b"",
+    headers: List[Any] = (),
+) -> List[Dict[str, Any]]:
+    """Run one HTTP request through the adapter and return what it sent."""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True}
+        for chunk in body_chunks
+    ] + [{"type": "http.request", "body": b"", "more_body": False}]
+    sent: List[Dict[str, Any]] = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": [(b"content-type", b"application/json"), *headers],
+    }
+    asyncio.run(adapter(scope, receive, send))
+    return sent
+
+
+def test_request_and_response() -> None:
+    """Test that a request body arriving in chunks reaches the view."""
+    adapter = AsgiAdapter(_flask_app())
+    sent = _request(adapter, "POST", "/echo", [b'{"title": ', b'"a"}'], b"q=x")
+
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == 201
+    assert (b"content-type", b"application/json") in sent[0]["headers"]
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert json.loads(body) == {"body": {"title": "a"}, "q": "x"}
+    assert sent[-1]["more_body"] is False
+
+
+def test_large_body_streamed(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a body over the buffer size reaches the view as a stream."""
+    monkeypatch.setattr(asgi, "BODY_BUFFER_SIZE", 4096)
+    monkeypatch.setattr(asgi, "BODY_QUEUE_CHUNKS", 2)
+    adapter = AsgiAdapter(_flask_app())
+    sent = _request(adapter, "POST", "/size", [b"x" * 1500] * 20)
+
+    assert sent[0]["status"] == 200
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert json.loads(body) == {"size": 30000}
+
+
+def test_body_too_large(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that bodies over the limit get a 413, declared or not."""
+    monkeypatch.setattr(asgi, "BODY_BUFFER_SIZE", 4096)
+    adapter = AsgiAdapter(_flask_app(), max_body_size=10000)
+
+    # Rejected by its Content-Length before any of it is read
+    sent = _request(
+        adapter,
+        "POST",
+        "/size",
+        [b"x" * 20000],
+        headers=[(b"content-length", b"20000")],
+    )
+    assert sent[0]["status"] == 413
+
+    # Rejected while buffering, and while streaming to the view
+    for chunk_size in (20000, 1500):
+        chunks = [b"x" * chunk_size] * (20000 // chunk_size)
+        sent = _request(adapter, "POST", "/size", chunks)
+        assert sent[0]["status"] == 413
+
+
+def test_streamed_response() -> None:
+    """Test that streamed responses are sent chunk by chunk."""
+    adapter = AsgiAdapter(_flask_app())
+    sent = _request(adapter, "GET", "/stream")
+
+    chunks = [message["body"] for message in sent[1:] if message["body"]]
+    assert chunks == [b"/stream:0\n", b"/stream:1\n", b"/stream:2\n"]
+
+
+def test_concurrent_requests_share_few_workers() -> None:
+    """Test that more open requests than workers are all served."""
+    adapter = AsgiAdapter(_flask_app(), workers=2)
+    statuses = []
+
+    async def one(n: int) -> None:
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            # Idle clients: the body arrives late, costing no worker
+            await asyncio.sleep(0.01)
+            return messages.pop(0)
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        scope = {"type": "http", "method": "GET", "path": "/stream", "headers": []}
+        await adapter(scope, receive, send)
+
+    async def main() -> None:
+        await asyncio.gather(*(one(n) for n in range(50)))
+
+    asyncio.run(main())
+    assert statuses == [200] * 50
+
+
+def test_lifespan_shutdown() -> None:
+    """Test that shutdown callbacks run when the server stops."""
+    stopped = []
+    adapter = AsgiAdapter(_flask_app(), on_shutdown=[lambda: stopped.append(True)])
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(adapter({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert stopped == [True]
+
+
+def test_build_environ_headers() -> None:
+    """Test that repeated headers are joined and paths are passed through."""
+    environ = build_environ(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/tasks/search",
+            "query_string": b"q=caf%C3%A9",
+            "headers": [(b"accept", b"text/plain"), (b"accept", b"*/*")],
+        },
+        b"",
+    )
+    assert environ["PATH_INFO"] == "/tasks/search"
+    assert environ["QUERY_STRING"] == "q=caf%C3%A9"
+    assert environ["HTTP_ACCEPT"] == "text/plain,*/*"
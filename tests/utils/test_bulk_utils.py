@@ -0,0 +1,68 @@
+"""Tests for the bulk write helpers."""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Tag, Task
+from kairix_todo.utils.bulk_utils import (
+    bulk_complete,
+    resolve_tag_ids,
+    validate_task_item,
+)
+
+
+def test_validate_task_item() -> None:
+    """Test converting bulk items into rows."""
+    row, tags = validate_task_item({"title": "Report", "tags": ["a", "b", "a"]})
+    assert row["title"] == "Report"
+    assert row["completed"] is False
+    assert tags == ["a", "b"]
+
+    for item in (
+        "Report",
+        {"title": "  "},
+        {"title": "Report", "completed": "yes"},
+        {"title": "Report", "due_date": "tomorrow"},
+        {"title": "Report", "tags": "work"},
+        {"title": "Report", "tags": [""]},
+    ):
+        with pytest.raises(ValueError):
+            validate_task_item(item)
+
+
+def test_resolve_tag_ids(db_session: Session) -> None:
+    """Test resolving existing tags and creating missing ones."""
+    work = Tag(name="work")
+    db_session.add(work)
+    db_session.commit()
+
+    tag_ids = resolve_tag_ids(db_session, ["work", "home", "home"])
+    db_session.commit()
+
+    assert tag_ids["work"] == work.id
+    home = db_session.query(Tag).filter_by(name="home").one()
+    assert tag_ids["home"] == home.id
+    assert resolve_tag_ids(db_session, []) == {}
+
+
+def test_bulk_complete_commits_per_chunk(db_session: Session) -> None:
+    """Test that chunked updates commit once per chunk."""
+    tasks = [Task(title=f"Task {i}") for i in range(7)]
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    commits = []
+
+    def on_commit(session: Session) -> None:
+        commits.append(session)
+
+    event.listen(db_session, "after_commit", on_commit)
+    try:
+        updated = bulk_complete(db_session, [task.id for task in tasks], chunk_size=3)
+    finally:
+        event.remove(db_session, "after_commit", on_commit)
+
+    assert updated == 7
+    assert len(commits) == 3
+    assert db_session.query(Task).filter_by(completed=True).count() == 7
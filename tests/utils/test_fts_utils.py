@@ -0,0 +1,82 @@
+"""Tests for the FTS5 index utilities."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Task
+from kairix_todo.utils.fts_utils import (
+    FTS_TABLE,
+    build_match_expression,
+    has_fts_index,
+    install_fts_index,
+)
+
+
+def _fts_rowids(db_session: Session, match: str) -> list:
+    return [
+        row[0]
+        for row in db_session.execute(
+            text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"),
+            {"q": match},
+        )
+    ]
+
+
+def test_build_match_expression_modes() -> None:
+    """Test that each match mode produces the expected expression."""
+    assert build_match_expression("team meeting") == '"team"* AND "meeting"*'
+    assert build_match_expression("team meeting", "any") == '"team"* OR "meeting"*'
+    assert build_match_expression("team meeting", "phrase") == '"team meeting"'
+
+
+def test_build_match_expression_neutralizes_operators() -> None:
+    """Test that FTS5 syntax typed by the user is treated as plain words."""
+    assert build_match_expression('title:"x" OR NEAR(y') == (
+        '"title"* AND "x"* AND "OR"* AND "NEAR"* AND "y"*'
+    )
+    assert build_match_expression("%%") is None
+
+
+def test_build_match_expression_invalid_mode() -> None:
+    """Test that an unknown match mode is rejected."""
+    with pytest.raises(ValueError):
+        build_match_expression("team", "fuzzy")
+
+
+def test_index_created_with_schema(db_session: Session) -> None:
+    """Test that create_all installs the FTS index."""
+    assert has_fts_index(db_session)
+
+
+def test_index_follows_task_changes(db_session: Session) -> None:
+    """Test that the triggers keep the index in sync with the tasks table."""
+    task = Task(title="Quarterly report", additional_details="Finance")
+    db_session.add(task)
+    db_session.commit()
+    assert len(_fts_rowids(db_session, "quarterly")) == 1
+
+    task.title = "Annual report"
+    db_session.commit()
+    assert _fts_rowids(db_session, "quarterly") == []
+    assert len(_fts_rowids(db_session, "annual")) == 1
+
+    db_session.delete(task)
+    db_session.commit()
+    assert _fts_rowids(db_session, "annual") == []
+
+
+def test_install_backfills_existing_rows(db_session: Session) -> None:
+    """Test that installing the index on an existing database indexes old rows."""
+    db_session.add(Task(title="Legacy task"))
+    db_session.commit()
+
+    db_session.execute(text(f"DROP TABLE {FTS_TABLE}"))
+    for suffix in ("ai", "ad", "au"):
+        db_session.execute(text(f"DROP TRIGGER {FTS_TABLE}_{suffix}"))
+    db_session.commit()
+
+    assert install_fts_index(db_session.connection())
+    db_session.commit()
+
+    assert len(_fts_rowids(db_session, "legacy")) == 1
@@ -0,0 +1,51 @@
+"""Tests for the data generation counter."""
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Task
+from kairix_todo.utils.generation import current_generation
+
+
+def test_commit_with_changes_bumps_generation(db_session: Session) -> None:
+    """Test that committing a write moves the generation."""
+    before = current_generation()
+
+    db_session.add(Task(title="New task"))
+    db_session.commit()
+
+    assert current_generation() > before
+
+
+def test_bulk_statement_bumps_generation(db_session: Session) -> None:
+    """Test that bulk UPDATE statements, which skip the flush, are tracked."""
+    db_session.add(Task(title="New task"))
+    db_session.commit()
+    before = current_generation()
+
+    db_session.execute(update(Task).values(completed=True))
+    db_session.commit()
+
+    assert current_generation() > before
+
+
+def test_read_only_commit_keeps_generation(db_session: Session) -> None:
+    """Test that committing without writes leaves cached data valid."""
+    before = current_generation()
+
+    db_session.query(Task).all()
+    db_session.commit()
+
+    assert current_generation() == before
+
+
+def test_rolled_back_write_keeps_generation(db_session: Session) -> None:
+    """Test that a write that is rolled back does not invalidate caches."""
+    before = current_generation()
+
+    db_session.add(Task(title="Discarded"))
+    db_session.flush()
+    db_session.rollback()
+    db_session.commit()
+
+    assert current_generation() == before
@@ -0,0 +1,116 @@
+"""Tests for id storage modes and their migration."""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from kairix_todo.controller.bulk_controller import BulkController
+from kairix_todo.controller.search_controller import SearchController
+from kairix_todo.controller.task_controller import TaskController
+from kairix_todo.models import Base, Reminder, Tag, Task, compact_uuid, expand_uuid
+from kairix_todo.utils.ids import (
+    COMPACT_IDS,
+    TEXT_IDS,
+    migrate_id_storage,
+    resolve_id_storage,
+    use_id_storage,
+)
+from kairix_todo.utils.tag_index import TagIndex
+
+
+def _id_types(engine) -> set:
+    with engine.connect() as connection:
+        return {
+            kind
+            for table, column in (
+                ("tasks", "id"),
+                ("tags", "id"),
+                ("reminders", "task_id"),
+                ("task_tags", "tag_id"),
+            )
+            for (kind,) in connection.execute(
+                text(f"SELECT DISTINCT typeof({column}) FROM {table}")
+            )
+        }
+
+
+def test_uuid_conversion() -> None:
+    """Test only canonical UUID strings are compacted, and back."""
+    value = str(uuid.uuid4())
+    assert len(compact_uuid(value)) == 16
+    assert expand_uuid(compact_uuid(value)) == value
+    assert compact_uuid("not-a-uuid") == "not-a-uuid"
+    assert compact_uuid(value.upper()) == value.upper()
+    assert expand_uuid("plain") == "plain"
+
+
+def test_compact_ids_through_the_api(tmp_path) -> None:
+    """Test the API speaks string ids while the database stores blobs."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'compact.db'}")
+    use_id_storage(engine, resolve_id_storage(engine, COMPACT_IDS))
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    app = Flask(__name__)
+    tag_index = TagIndex()
+    app.register_blueprint(TaskController(session).blueprint)
+    app.register_blueprint(SearchController(session, tag_index=tag_index).blueprint)
+    app.register_blueprint(BulkController(session, tag_index=tag_index).blueprint)
+    client = app.test_client()
+
+    created = client.post("/tasks/", json={"title": "Report", "tags": ["work"]})
+    task_id = created.get_json()["id"]
+    assert str(uuid.UUID(task_id)) == task_id
+    assert client.get(f"/tasks/{task_id}").get_json()["tags"][0]["name"] == "work"
+    assert client.get("/tasks/not-a-uuid").status_code == 404
+
+    response = client.post(
+        "/tasks/bulk/retag", json={"ids": [task_id], "add": ["urgent"]}
+    )
+    assert response.get_json()["added"] == 1
+    found = client.get("/tasks/search?tags=work,urgent").get_json()
+    assert [task["id"] for task in found] == [task_id]
+    assert _id_types(engine) == {"blob"}
+
+    session.close()
+    engine.dispose()
+
+
+def test_migrate_id_storage(tmp_path) -> None:
+    """Test an existing database is migrated both ways with ids preserved."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    task = Task(title="Report", tags=[Tag(name="work")])
+    task.reminders.append(Reminder(remind_at=datetime(2025, 1, 1)))
+    session.add(task)
+    session.commit()
+    task_id, tag_id = task.id, task.tags[0].id
+    session.close()
+    assert resolve_id_storage(engine) == TEXT_IDS
+
+    assert migrate_id_storage(engine, COMPACT_IDS) == 7
+    assert migrate_id_storage(engine, COMPACT_IDS) == 0
+    assert _id_types(engine) == {"blob"}
+    assert resolve_id_storage(engine) == COMPACT_IDS
+    with pytest.raises(ValueError):
+        resolve_id_storage(engine, TEXT_IDS)
+
+    use_id_storage(engine, COMPACT_IDS)
+    session = sessionmaker(bind=engine)()
+    task = session.get(Task, task_id)
+    assert [tag.id for tag in task.tags] == [tag_id]
+    assert task.reminders[0].task_id == task_id
+    assert TagIndex().matching_rowids(session, ["work"]) == [1]
+    session.close()
+
+    migrate_id_storage(engine, TEXT_IDS, vacuum=False)
+    assert _id_types(engine) == {"text"}
+    use_id_storage(engine, TEXT_IDS)
+    session = sessionmaker(bind=engine)()
+    assert session.get(Task, task_id).tags[0].id == tag_id
+    session.close()
+    engine.dispose()
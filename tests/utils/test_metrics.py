@@ -0,0 +1,90 @@
+"""Tests for request and SQL metrics."""
+
+import re
+
+from flask import Flask, Response, stream_with_context
+from sqlalchemy import create_engine, text
+
+from kairix_todo.utils.metrics import Histogram, Metrics, init_metrics
+from kairix_todo.utils.writer import SerializedWriter
+
+
+def _sample(rendered: str, line_prefix: str) -> float:
+    match = re.search(rf"^{re.escape(line_prefix)} (\S+)$", rendered, re.MULTILINE)
+    assert match, f"{line_prefix} not in output"
+    return float(match.group(1))
+
+
+def test_histogram_render() -> None:
+    """Test bucket counts are cumulative and labels are escaped."""
+    histogram = Histogram("h", "Help.", ("endpoint",), (1, 5))
+    for value in (0.5, 3, 3, 10):
+        histogram.observe(('a"b',), value)
+
+    lines = list(histogram.render())
+    assert lines[:2] == ["# HELP h Help.", "# TYPE h histogram"]
+    assert 'h_bucket{endpoint="a\\"b",le="1"} 1' in lines
+    assert 'h_bucket{endpoint="a\\"b",le="5"} 3' in lines
+    assert 'h_bucket{endpoint="a\\"b",le="+Inf"} 4' in lines
+    assert 'h_sum{endpoint="a\\"b"} 16.5' in lines
+    assert 'h_count{endpoint="a\\"b"} 4' in lines
+
+
+def test_request_metrics(tmp_path) -> None:
+    """Test latency, size and SQL counts per endpoint, writer included."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    writer = SerializedWriter(engine)
+    app = Flask(__name__)
+    metrics = Metrics()
+    init_metrics(app, metrics, [engine])
+
+    @app.route("/items/<item_id>")
+    def get_item(item_id):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        writer.run(lambda session: session.execute(text("SELECT 2")))
+        return {"id": item_id}
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            yield "a" * 10
+            yield "b" * 5
+
+        return Response(stream_with_context(generate()))
+
+    client = app.test_client()
+    for item_id in ("1", "2"):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    client.get("/stream").close()
+    assert client.get("/missing").status_code == 404
+    writer.stop()
+    engine.dispose()
+
+    rendered = metrics.render()
+    assert (
+        _sample(
+            rendered,
+            "kairix_http_request_duration_seconds_count"
+            '{endpoint="get_item",method="GET",status="200"}',
+        )
+        == 2
+    )
+    # Two statements per request, one of them on the writer thread
+    assert (
+        _sample(rendered, 'kairix_http_request_sql_statements_sum{endpoint="get_item"}')
+        == 4
+    )
+    assert (
+        _sample(rendered, 'kairix_http_response_size_bytes_sum{endpoint="stream"}')
+        == 15
+    )
+    assert (
+        _sample(
+            rendered,
+            "kairix_http_request_duration_seconds_count"
+            '{endpoint="unmatched",method="GET",status="404"}',
+        )
+        == 1
+    )
+    assert _sample(rendered, 'kairix_http_requests_in_flight{endpoint="get_item"}') == 0
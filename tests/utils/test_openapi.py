@@ -0,0 +1,53 @@
+"""Tests for serving the OpenAPI spec."""
+
+import gzip
+import json
+
+from flask import Flask, request
+
+from kairix_todo.utils.openapi import OpenApiSpec
+
+
+def _client(spec: OpenApiSpec):
+    app = Flask(__name__)
+
+    @app.route("/spec")
+    def serve():
+        return spec.response(request)
+
+    return app.test_client()
+
+
+def test_spec_read_once(tmp_path) -> None:
+    """Test the file is read on first use and its encoding reused."""
+    path = tmp_path / "openapi.json"
+    path.write_text(json.dumps({"openapi": "3.0.0", "paths": {}}, indent=4))
+    spec = OpenApiSpec(str(path))
+
+    encoded = spec.encoded()
+    path.unlink()
+    assert spec.encoded() is encoded
+    assert json.loads(encoded.body) == {"openapi": "3.0.0", "paths": {}}
+    assert gzip.decompress(encoded.compressed) == encoded.body
+
+
+def test_conditional_requests(tmp_path) -> None:
+    """Test each encoding gets its own ETag and a matching one gets a 304."""
+    path = tmp_path / "openapi.json"
+    path.write_text(json.dumps({"openapi": "3.0.0"}))
+    client = _client(OpenApiSpec(str(path)))
+
+    plain = client.get("/spec")
+    compressed = client.get("/spec", headers={"Accept-Encoding": "gzip"})
+    assert plain.headers["Vary"] == "Accept-Encoding"
+    assert plain.headers["ETag"] != compressed.headers["ETag"]
+
+    response = client.get(
+        "/spec",
+        headers={
+            "Accept-Encoding": "gzip",
+            "If-None-Match": compressed.headers["ETag"],
+        },
+    )
+    assert response.status_code == 304
+    assert response.data == b""
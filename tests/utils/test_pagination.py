@@ -0,0 +1,127 @@
+"""Tests for the keyset pagination helpers."""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import ArchivedTask, Base, Task
+from kairix_todo.utils.ids import COMPACT_IDS, use_id_storage
+from kairix_todo.utils.pagination import (
+    CREATED_ORDER,
+    RELEVANCE_ORDER,
+    created_order_key,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+    merged_keyset_page,
+)
+
+
+def test_cursor_round_trip() -> None:
+    """Test that cursor values survive encoding, including datetimes."""
+    created = datetime(2025, 4, 1, 9, 30, 15, 123456)
+    cursor = encode_cursor(CREATED_ORDER, [created, "task-id"])
+
+    assert decode_cursor(cursor, CREATED_ORDER) == [created, "task-id"]
+
+
+def test_invalid_cursor() -> None:
+    """Test that malformed cursors are rejected."""
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", CREATED_ORDER)
+
+
+def test_cursor_for_other_ordering() -> None:
+    """Test that a cursor cannot be reused with a different ordering."""
+    cursor = encode_cursor(RELEVANCE_ORDER, [-1.5, "task-id"])
+
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, CREATED_ORDER)
+
+
+def test_keyset_page_walks_all_rows(db_session: Session) -> None:
+    """Test that following cursors visits every task exactly once, in order."""
+    tasks = [Task(title=f"Task {i}") for i in range(7)]
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor, _ = keyset_page(
+            db_session.query(Task),
+            CREATED_ORDER,
+            created_order_key(),
+            3,
+            cursor=cursor,
+        )
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert [(t.created_at, t.id) for t in seen] == sorted(
+        (t.created_at, t.id) for t in tasks
+    )
+
+
+def test_keyset_page_cursor_survives_inserts(db_session: Session) -> None:
+    """Test that rows added before the cursor position do not shift later pages."""
+    db_session.add_all([Task(title=f"Task {i}") for i in range(4)])
+    db_session.commit()
+
+    first, cursor, _ = keyset_page(
+        db_session.query(Task), CREATED_ORDER, created_order_key(), 2
+    )
+    # An older task appears after the first page was served
+    db_session.add(Task(title="Backdated", created_at=datetime(2000, 1, 1)))
+    db_session.commit()
+
+    second, _, _ = keyset_page(
+        db_session.query(Task), CREATED_ORDER, created_order_key(), 2, cursor=cursor
+    )
+
+    assert len(second) == 2
+    assert not {t.id for t in first} & {t.id for t in second}
+    assert all(t.title != "Backdated" for t in second)
+
+
+def test_cursor_ties_with_compact_ids(tmp_path) -> None:
+    """Test that paging past equal created_at values seeks by the stored id."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'compact.db'}")
+    use_id_storage(engine, COMPACT_IDS)
+    Base.metadata.create_all(engine)
+    created = datetime(2025, 1, 1)
+    with Session(engine) as session:
+        session.add_all([Task(title=f"Task {i}", created_at=created) for i in range(5)])
+        session.commit()
+        expected = sorted(task.id for task in session.query(Task))
+
+        seen = []
+        cursor = None
+        while True:
+            page, cursor, _ = keyset_page(
+                session.query(Task), CREATED_ORDER, created_order_key(), 2, cursor
+            )
+            seen.extend(task.id for task in page)
+            assert len(seen) <= len(expected)  # No page is served twice
+            if cursor is None:
+                break
+        assert seen == expected
+
+        queries = [
+            (session.query(Task), created_order_key()),
+            (session.query(ArchivedTask), created_order_key(ArchivedTask)),
+        ]
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = merged_keyset_page(queries, CREATED_ORDER, 2, cursor)
+            seen.extend(task.id for task in page)
+            assert len(seen) <= len(expected)  # No page is served twice
+            if cursor is None:
+                break
+        assert seen == expected
+    engine.dispose()
@@ -0,0 +1,21 @@
+"""Tests for the SQL statement counter."""
+
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Task
+from kairix_todo.utils.query_counter import QueryCounter
+
+
+def test_counts_statements_inside_block(db_session: Session) -> None:
+    """Test that only statements run inside the block are counted."""
+    engine = db_session.get_bind()
+    db_session.query(Task).all()
+
+    with QueryCounter(engine) as counter:
+        db_session.query(Task).all()
+        db_session.query(Task).count()
+
+    db_session.query(Task).all()
+
+    assert counter.count == 2
+    assert all("FROM tasks" in statement for statement in counter.statements)
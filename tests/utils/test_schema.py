@@ -0,0 +1,69 @@
+"""Tests for upgrading existing databases."""
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Base, Tag, Task
+from kairix_todo.utils.schema import upgrade_schema
+from kairix_todo.utils.tag_index import LOG_TABLE, TagIndex
+
+
+def _old_database(path) -> object:
+    """Create a database with the schema from before the join indexes."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for index in ("idx_reminder_task_id", "idx_task_open_due_date"):
+            connection.execute(text(f"DROP INDEX {index}"))
+        connection.execute(text("DROP TABLE task_tags"))
+        connection.execute(
+            text(
+                "CREATE TABLE task_tags (task_id VARCHAR REFERENCES tasks (id), "
+                "tag_id VARCHAR REFERENCES tags (id))"
+            )
+        )
+    return engine
+
+
+def test_upgrade_schema(tmp_path) -> None:
+    """Test task_tags gets its primary key and missing indexes are created."""
+    engine = _old_database(tmp_path / "old.db")
+    with Session(engine) as session:
+        task = Task(title="Report")
+        tag = Tag(name="work")
+        session.add_all([task, tag])
+        session.commit()
+        task_id, tag_id = task.id, tag.id
+    with engine.begin() as connection:
+        for _ in range(2):
+            connection.execute(
+                text("INSERT INTO task_tags VALUES (:task, :tag)"),
+                {"task": task_id, "tag": tag_id},
+            )
+
+    with engine.begin() as connection:
+        changes = upgrade_schema(connection)
+    assert "rebuilt task_tags with a primary key" in changes
+    assert "created index idx_reminder_task_id" in changes
+    assert "created index idx_task_open_due_date" in changes
+    with engine.begin() as connection:
+        assert upgrade_schema(connection) == []
+
+    with engine.connect() as connection:
+        primary_key = [
+            row[1]
+            for row in connection.execute(text("PRAGMA table_info(task_tags)"))
+            if row[5]
+        ]
+        assert primary_key == ["task_id", "tag_id"]
+        assert connection.execute(text("SELECT count(*) FROM task_tags")).scalar() == 1
+        assert connection.execute(text("SELECT version FROM tasks")).scalar() == 1
+
+    # The triggers of the rebuilt table are back
+    with Session(engine) as session:
+        session.add(Task(title="Email", tags=[session.get(Tag, tag_id)]))
+        session.commit()
+        assert session.execute(text(f"SELECT count(*) FROM {LOG_TABLE}")).scalar() == 1
+        assert len(TagIndex().matching_rowids(session, ["work"])) == 2
+        assert session.get(Task, task_id).tags[0].name == "work"
+    engine.dispose()
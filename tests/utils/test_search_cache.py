@@ -0,0 +1,70 @@
+"""Tests for the search result cache."""
+
+from kairix_todo.utils.generation import bump_generation, current_generation
+from kairix_todo.utils.search_cache import SearchCache, make_cache_key
+
+
+def test_cache_key_normalizes_parameters() -> None:
+    """Test that equivalent searches share a key."""
+    assert make_cache_key(query="  Team   Meeting", completed=None) == make_cache_key(
+        query="team meeting"
+    )
+    assert make_cache_key(query="team", limit=10) != make_cache_key(
+        query="team", limit=20
+    )
+    # Substring matching sees case and every space
+    assert make_cache_key(fts=False, query="Team  Meeting") != make_cache_key(
+        fts=False, query="team meeting"
+    )
+
+
+def test_cache_hit_and_miss_counters() -> None:
+    """Test that lookups are counted."""
+    cache = SearchCache()
+    key = make_cache_key(query="team")
+
+    assert cache.get(key) is None
+    cache.put(key, "result", current_generation())
+    assert cache.get(key) == "result"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    """Test that the cache stays bounded and keeps recently used entries."""
+    cache = SearchCache(max_entries=2)
+    generation = current_generation()
+
+    cache.put("a", 1, generation)
+    cache.put("b", 2, generation)
+    cache.get("a")
+    cache.put("c", 3, generation)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_invalidated_by_new_generation() -> None:
+    """Test that a commit elsewhere drops cached results."""
+    cache = SearchCache()
+    cache.put("a", 1, current_generation())
+
+    bump_generation()
+
+    assert cache.get("a") is None
+
+
+def test_cache_discards_results_computed_across_a_commit() -> None:
+    """Test that a result computed before a commit is not stored after it."""
+    cache = SearchCache()
+    generation = current_generation()
+
+    bump_generation()
+    cache.put("a", 1, generation)
+
+    assert cache.get("a") is None
@@ -3,10 +3,17 @@
 from datetime import datetime, timedelta
 
 import pytest
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from kairix_todo.models import Task
-from kairix_todo.utils.search_utils import search_tasks
+from kairix_todo.models import Tag, Task
+from kairix_todo.utils.search_utils import (
+    TOTAL_ESTIMATE,
+    TOTAL_NONE,
+    search_tasks,
+    search_tasks_page,
+)
+from kairix_todo.utils.tag_index import TagIndex
 
 
 def test_search_by_title(db_session: Session) -> None:
@@ -235,3 +242,194 @@ def test_empty_results(db_session: Session) -> None:
     # Should return empty results
     assert count == 0
     assert len(results) == 0
+
+
+def test_search_ranked_by_relevance(db_session: Session) -> None:
+    """Test that text search results are ordered by BM25 relevance."""
+    task1 = Task(title="Weekly sync", additional_details="Budget notes")
+    task2 = Task(title="Budget review", additional_details="Budget for the budget")
+    task3 = Task(title="Budget", additional_details="Draft")
+
+    db_session.add_all([task1, task2, task3])
+    db_session.commit()
+
+    results, count = search_tasks(db_session, query="budget")
+
+    assert count == 3
+    assert results[-1].title == "Weekly sync"
+
+
+def test_search_matches_word_prefixes(db_session: Session) -> None:
+    """Test that search words match the start of longer words."""
+    task1 = Task(title="Meeting notes")
+    task2 = Task(title="Groceries")
+
+    db_session.add_all([task1, task2])
+    db_session.commit()
+
+    results, count = search_tasks(db_session, query="meet")
+
+    assert count == 1
+    assert results[0].title == "Meeting notes"
+
+
+def test_search_match_modes(db_session: Session) -> None:
+    """Test the all, any and phrase match modes."""
+    task1 = Task(title="Project kickoff meeting")
+    task2 = Task(title="Meeting about the project")
+    task3 = Task(title="Project plan")
+
+    db_session.add_all([task1, task2, task3])
+    db_session.commit()
+
+    _, count = search_tasks(db_session, query="project meeting")
+    assert count == 2
+
+    _, count = search_tasks(db_session, query="kickoff plan", match_mode="any")
+    assert count == 2
+
+    results, count = search_tasks(
+        db_session, query="kickoff meeting", match_mode="phrase"
+    )
+    assert count == 1
+    assert results[0].title == "Project kickoff meeting"
+
+
+def test_search_falls_back_without_fts(db_session: Session, monkeypatch) -> None:
+    """Test that text search still works when FTS5 is unavailable."""
+    monkeypatch.setattr(
+        "kairix_todo.utils.search_utils.has_fts_index", lambda session: False
+    )
+    task1 = Task(title="Teamwork")
+    task2 = Task(title="Solo work")
+
+    db_session.add_all([task1, task2])
+    db_session.commit()
+
+    # Substring matching only the LIKE fallback provides
+    results, count = search_tasks(db_session, query="amwo")
+
+    assert count == 1
+    assert results[0].title == "Teamwork"
+
+
+def test_search_cursor_pagination(db_session: Session) -> None:
+    """Test walking ranked search results with cursors."""
+    tasks = [
+        Task(title=" ".join(["report"] * (i % 3 + 1)), additional_details=f"#{i}")
+        for i in range(8)
+    ]
+    db_session.add_all(tasks)
+    db_session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        page = search_tasks_page(db_session, query="report", limit=3, cursor=cursor)
+        assert page.total == 8
+        seen.extend(task.id for task in page.tasks)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(seen) == 8
+    assert len(set(seen)) == 8
+
+    ranked, _ = search_tasks(db_session, query="report", limit=8)
+    assert seen == [task.id for task in ranked]
+
+
+def test_search_exact_total_in_one_statement(db_session: Session) -> None:
+    """Test that the exact total comes from the page query itself."""
+    db_session.add_all([Task(title=f"Report {i}") for i in range(6)])
+    db_session.commit()
+
+    # Warm up the per-engine FTS availability check
+    search_tasks_page(db_session, query="report")
+
+    statements = []
+    engine = db_session.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        page = search_tasks_page(db_session, query="report", limit=2)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert page.total == 6
+    assert len(page.tasks) == 2
+    assert len([s for s in statements if s.lstrip().startswith("SELECT")]) == 1
+
+
+def test_search_total_modes(db_session: Session) -> None:
+    """Test skipped and estimated totals."""
+    db_session.add_all([Task(title=f"Report {i}") for i in range(6)])
+    db_session.commit()
+
+    page = search_tasks_page(db_session, limit=2, total_mode=TOTAL_NONE)
+    assert page.total is None
+    assert len(page.tasks) == 2
+
+    page = search_tasks_page(
+        db_session, limit=2, total_mode=TOTAL_ESTIMATE, total_cap=4
+    )
+    assert page.total == 4
+    assert page.total_exact is False
+
+    page = search_tasks_page(
+        db_session, limit=2, total_mode=TOTAL_ESTIMATE, total_cap=10
+    )
+    assert page.total == 6
+    assert page.total_exact is True
+
+    with pytest.raises(ValueError):
+        search_tasks_page(db_session, total_mode="approximate")
+
+
+def test_search_exact_total_past_last_page(db_session: Session) -> None:
+    """Test that the total is still exact for offsets past the last result."""
+    db_session.add_all([Task(title=f"Report {i}") for i in range(3)])
+    db_session.commit()
+
+    page = search_tasks_page(db_session, limit=2, offset=10)
+
+    assert page.tasks == []
+    assert page.total == 3
+
+
+@pytest.mark.parametrize("use_index", [True, False])
+def test_search_by_tags(db_session: Session, use_index: bool) -> None:
+    """Test AND/OR tag filtering, with and without the posting index."""
+    work = Tag(name="work")
+    urgent = Tag(name="urgent")
+    task1 = Task(title="Report", tags=[work, urgent])
+    task2 = Task(title="Email", tags=[work])
+    task3 = Task(title="Dishes", tags=[urgent])
+
+    db_session.add_all([task1, task2, task3])
+    db_session.commit()
+
+    tag_index = TagIndex() if use_index else None
+
+    results, count = search_tasks(
+        db_session, tags=["work", "urgent"], tag_index=tag_index
+    )
+    assert count == 1
+    assert results[0].title == "Report"
+
+    results, count = search_tasks(
+        db_session, tags=["work", "urgent"], tags_operator="OR", tag_index=tag_index
+    )
+    assert count == 3
+
+    results, count = search_tasks(
+        db_session, query="email", tags=["work"], tag_index=tag_index
+    )
+    assert count == 1
+    assert results[0].title == "Email"
+
+    with pytest.raises(ValueError):
+        search_tasks(db_session, tags=["work"], tags_operator="NOT")
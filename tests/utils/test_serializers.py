@@ -0,0 +1,115 @@
+"""Parity tests for the compiled serializers."""
+
+from datetime import date, datetime
+
+import pytest
+from flask import Flask, jsonify
+from marshmallow import Schema, fields, post_dump
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import (
+    Reminder,
+    ReminderSchema,
+    Tag,
+    TagSchema,
+    Task,
+    TaskSchema,
+)
+from kairix_todo.utils import serializers
+from kairix_todo.utils.serializers import compile_serializer, dumps, json_response
+
+
+@pytest.fixture
+def tasks(db_session: Session) -> list:
+    work = Tag(name="work")
+    cafe = Tag(name="café ☕")
+    tasks = [
+        Task(title="Plain"),
+        Task(
+            title="Everything",
+            additional_details='Line one\nline "two" </script>',
+            completed=True,
+            due_date=date(2025, 4, 30),
+            tags=[work, cafe],
+            reminders=[
+                Reminder(remind_at=datetime(2025, 4, 29, 9, 0, 0, 123456)),
+                Reminder(remind_at=datetime(2025, 4, 30, 8, 30), completed=True),
+            ],
+        ),
+        Task(title="Ünïcödé", due_date=date(2025, 1, 1), tags=[work]),
+    ]
+    db_session.add_all(tasks)
+    db_session.commit()
+    return tasks
+
+
+def test_compiled_dump_matches_marshmallow(tasks: list) -> None:
+    """Test that compiled dumps equal marshmallow dumps for every model."""
+    for schema, objects in (
+        (TaskSchema(), tasks),
+        (TagSchema(), tasks[1].tags),
+        (ReminderSchema(), tasks[1].reminders),
+    ):
+        serialize = compile_serializer(schema)
+        for obj in objects:
+            assert serialize(obj) == schema.dump(obj)
+
+
+def test_compiled_json_bytes_match_jsonify(tasks: list, monkeypatch) -> None:
+    """Test that responses are byte-for-byte identical to jsonify."""
+    # The standard library encoder reproduces jsonify exactly, non-ASCII included
+    monkeypatch.setattr(serializers, "orjson", None)
+    schema = TaskSchema()
+    serialize = compile_serializer(schema)
+    app = Flask(__name__)
+
+    with app.app_context():
+        expected = jsonify(TaskSchema(many=True).dump(tasks)).get_data()
+        actual = json_response([serialize(task) for task in tasks]).get_data()
+
+    assert actual == expected
+
+
+def test_orjson_bytes_match_jsonify_for_ascii(tasks: list) -> None:
+    """Test that the orjson encoder matches jsonify for ASCII payloads."""
+    pytest.importorskip("orjson")
+    schema = TaskSchema()
+    serialize = compile_serializer(schema)
+    app = Flask(__name__)
+    ascii_tasks = [tasks[0]]
+
+    with app.app_context():
+        expected = jsonify(TaskSchema(many=True).dump(ascii_tasks)).get_data()
+        actual = json_response([serialize(task) for task in ascii_tasks]).get_data()
+
+    assert actual == expected
+
+
+def test_dumps_sorts_keys() -> None:
+    """Test that keys are sorted like jsonify sorts them."""
+    assert dumps({"b": 1, "a": [True, None]}) == b'{"a":[true,null],"b":1}'
+
+
+def test_schema_with_dump_hook_uses_marshmallow() -> None:
+    """Test that schemas with dump hooks are not compiled."""
+
+    class ShoutSchema(Schema):
+        name = fields.Str()
+
+        @post_dump
+        def shout(self, data, **kwargs):
+            data["name"] = data["name"].upper()
+            return data
+
+    schema = ShoutSchema()
+
+    assert compile_serializer(schema)(Tag(name="work")) == {"name": "WORK"}
+
+
+def test_list_endpoint_output_unchanged(client, db_session, tasks: list) -> None:
+    """Test that GET /tasks returns what the marshmallow path returned."""
+    response = client.get("/tasks/")
+
+    assert response.get_json() == TaskSchema(many=True).dump(
+        db_session.query(Task).order_by(Task.created_at, Task.id).all()
+    )
@@ -0,0 +1,113 @@
+"""Tests for request-scoped sessions."""
+
+import threading
+
+import pytest
+from flask import Flask, abort
+from sqlalchemy import create_engine
+
+from kairix_todo.controller.task_controller import TaskController
+from kairix_todo.models import Base, Task
+from kairix_todo.utils.sessions import (
+    create_session_registry,
+    engine_options,
+    init_session_scope,
+)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'tasks.db'}"
+    engine = create_engine(uri, **engine_options(uri))
+    Base.metadata.create_all(engine)
+    registry = create_session_registry(engine)
+    yield registry
+    registry.remove()
+    engine.dispose()
+
+
+@pytest.fixture
+def scoped_app(registry) -> Flask:
+    app = Flask(__name__)
+    init_session_scope(app, registry)
+    app.register_blueprint(TaskController(registry).blueprint)
+
+    @app.route("/add-uncommitted")
+    def add_uncommitted():
+        registry.add(Task(title="Committed at teardown"))
+        return "ok"
+
+    @app.route("/reject")
+    def reject():
+        registry.add(Task(title="Rejected"))
+        abort(409, description="Conflict.")
+
+    @app.route("/fail")
+    def fail():
+        registry.add(Task(title="Never stored"))
+        registry.flush()
+        raise RuntimeError("boom")
+
+    return app
+
+
+def test_engine_options() -> None:
+    """Test that file databases get a pool and a busy timeout."""
+    options = engine_options("sqlite:///tasks.db")
+    assert options["pool_size"] > 1
+    assert options["connect_args"]["timeout"] > 0
+    assert engine_options("sqlite:///:memory:") == {}
+
+
+def test_session_removed_after_request(scoped_app, registry) -> None:
+    """Test that every request starts with a fresh session."""
+    client = scoped_app.test_client()
+    assert client.post("/tasks/", json={"title": "Stored"}).status_code == 201
+    assert not registry.registry.has()
+
+    assert client.get("/add-uncommitted").status_code == 200
+    assert not registry.registry.has()
+    titles = {task.title for task in registry.query(Task)}
+    assert titles == {"Stored", "Committed at teardown"}
+
+
+def test_failed_request_is_rolled_back(scoped_app, registry) -> None:
+    """Test that an exception does not leak into later requests."""
+    scoped_app.config["PROPAGATE_EXCEPTIONS"] = False
+    client = scoped_app.test_client()
+
+    assert client.get("/fail").status_code == 500
+    assert not registry.registry.has()
+
+    response = client.get("/tasks/")
+    assert response.status_code == 200
+    assert response.get_json() == []
+
+
+def test_aborted_request_is_rolled_back(scoped_app, registry) -> None:
+    """Test that writes left by a request ending in an error status are dropped."""
+    client = scoped_app.test_client()
+
+    assert client.get("/reject").status_code == 409
+    assert not registry.registry.has()
+    assert registry.query(Task).count() == 0
+
+
+def test_threads_get_their_own_session(registry) -> None:
+    """Test that concurrent threads never share a session."""
+    sessions = []
+    barrier = threading.Barrier(4)
+
+    def work() -> None:
+        barrier.wait()
+        sessions.append(registry())
+        registry.query(Task).count()
+        registry.remove()
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 4
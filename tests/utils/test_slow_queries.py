@@ -0,0 +1,68 @@
+"""Tests for the slow query log."""
+
+import json
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from kairix_todo.utils.slow_queries import SlowQueryLog, parameter_shape
+
+
+def test_parameter_shape() -> None:
+    """Test parameter types are kept and values are not."""
+    assert parameter_shape(("secret", 3)) == ["str", "int"]
+    assert parameter_shape({"title": "secret"}) == {"title": "str"}
+    assert parameter_shape(tuple(str(n) for n in range(500))) == {"str": 500}
+
+
+def test_slow_queries_logged_with_plan(tmp_path) -> None:
+    """Test slow statements are recorded with plan, shape and endpoint."""
+    path = tmp_path / "slow.log"
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    log = SlowQueryLog(threshold_ms=0, path=str(path))
+    log.instrument(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name)"))
+        connection.execute(text("CREATE INDEX ix_items_name ON items (name)"))
+
+    app = Flask(__name__)
+
+    @app.route("/items/<name>")
+    def find_item(name):
+        with engine.connect() as connection:
+            connection.execute(
+                text("SELECT id FROM items WHERE name = :name"), {"name": name}
+            )
+        return {}
+
+    assert app.test_client().get("/items/secret").status_code == 200
+    engine.dispose()
+
+    entry = log.entries(endpoint="find_item")[0]
+    assert entry["statement"] == "SELECT id FROM items WHERE name = ?"
+    assert entry["parameters"] == ["str"]
+    assert entry["executions"] == 1
+    assert any("ix_items_name" in step for step in entry["plan"])
+    # DDL has no plan and ran outside a request
+    assert log.entries()[-1]["plan"] == []
+    assert log.entries()[-1]["endpoint"] is None
+    assert len(log.entries(limit=1)) == 1
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines[-1]["endpoint"] == "find_item"
+    assert "secret" not in path.read_text()
+
+
+def test_fast_queries_not_logged(tmp_path) -> None:
+    """Test statements under the threshold and failed ones are not recorded."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'fast.db'}")
+    log = SlowQueryLog(threshold_ms=60_000)
+    log.instrument(engine)
+    with engine.connect() as connection:
+        try:
+            connection.execute(text("SELECT * FROM missing"))
+        except Exception:
+            connection.rollback()
+        connection.execute(text("SELECT 1"))
+    engine.dispose()
+    assert log.entries() == []
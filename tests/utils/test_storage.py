@@ -0,0 +1,40 @@
+"""Tests for SQLite storage profiles."""
+
+import pytest
+from sqlalchemy import create_engine
+
+from kairix_todo.utils.storage import (
+    STORAGE_PROFILES,
+    apply_storage_profile,
+    profile_pragmas,
+    read_pragmas,
+)
+
+
+def test_profile_pragmas() -> None:
+    """Test building the PRAGMA statements of a profile."""
+    pragmas = profile_pragmas("balanced")
+    assert pragmas[0] == "PRAGMA journal_mode = WAL"
+    assert "PRAGMA synchronous = NORMAL" in pragmas
+
+    with pytest.raises(ValueError):
+        profile_pragmas("turbo")
+
+
+@pytest.mark.parametrize("name", list(STORAGE_PROFILES))
+def test_apply_storage_profile(tmp_path, name: str) -> None:
+    """Test that every new connection gets the profile's settings."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    apply_storage_profile(engine, name)
+
+    with engine.connect() as connection:
+        values = read_pragmas(connection, name)
+    engine.dispose()
+
+    assert values["busy_timeout"] == 15000
+    if name != "default":
+        assert values["journal_mode"] == "wal"
+    if name == "balanced":
+        assert values["synchronous"] == 1  # NORMAL
+        assert values["temp_store"] == 2  # MEMORY
+        assert values["cache_size"] == -65536
@@ -0,0 +1,42 @@
+"""Tests for the NDJSON streaming helpers."""
+
+import json
+
+from flask import Flask, request
+
+from kairix_todo.utils.streaming import NDJSON_MIMETYPE, ndjson_response, wants_ndjson
+
+
+def test_wants_ndjson() -> None:
+    """Test content negotiation for streamed responses."""
+    app = Flask(__name__)
+
+    with app.test_request_context("/?stream=1"):
+        assert wants_ndjson(request)
+    with app.test_request_context("/", headers={"Accept": NDJSON_MIMETYPE}):
+        assert wants_ndjson(request)
+    with app.test_request_context("/", headers={"Accept": "application/json"}):
+        assert not wants_ndjson(request)
+    with app.test_request_context("/", headers={"Accept": "*/*"}):
+        assert not wants_ndjson(request)
+
+
+def test_ndjson_response_is_lazy() -> None:
+    """Test that rows are produced only as the response is consumed."""
+    app = Flask(__name__)
+    produced = []
+
+    def rows():
+        for i in range(3):
+            produced.append(i)
+            yield {"n": i}
+
+    with app.test_request_context("/"):
+        response = ndjson_response(rows(), lambda row: row)
+        assert response.mimetype == NDJSON_MIMETYPE
+        assert produced == []
+
+        chunks = iter(response.response)
+        assert json.loads(next(chunks)) == {"n": 0}
+        assert produced == [0]
+        assert [json.loads(chunk) for chunk in chunks] == [{"n": 1}, {"n": 2}]
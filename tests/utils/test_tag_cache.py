@@ -0,0 +1,78 @@
+"""Tests for the tag name to id cache."""
+
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Tag, Task
+from kairix_todo.utils.query_counter import QueryCounter
+from kairix_todo.utils.tag_cache import TagCache
+
+
+def test_warm_cache_resolves_without_queries(db_session: Session) -> None:
+    """Test that warmed names are resolved without touching the database."""
+    work = Tag(name="work")
+    db_session.add(work)
+    db_session.commit()
+
+    work_id = work.id
+    cache = TagCache()
+    assert cache.warm(db_session) == 1
+
+    with QueryCounter(db_session.get_bind()) as counter:
+        assert cache.resolve(db_session, ["work"]) == {"work": work_id}
+    assert counter.count == 0
+    assert cache.stats() == {"hits": 1, "misses": 0, "size": 1}
+
+
+def test_new_tags_cached_after_commit(db_session: Session) -> None:
+    """Test that created tags are cached only once their transaction commits."""
+    cache = TagCache()
+
+    tag_ids = cache.resolve(db_session, ["home"])
+    db_session.rollback()
+    assert cache.stats()["size"] == 0
+    assert db_session.query(Tag).count() == 0
+
+    tag_ids = cache.resolve(db_session, ["home"])
+    db_session.commit()
+    assert cache.stats()["size"] == 1
+    assert db_session.get(Tag, tag_ids["home"]).name == "home"
+
+
+def test_get_tags_links_without_loading(db_session: Session) -> None:
+    """Test that cached tags can be attached to tasks without a SELECT."""
+    db_session.add(Tag(name="work"))
+    db_session.commit()
+    cache = TagCache()
+    cache.warm(db_session)
+    db_session.expunge_all()
+
+    task = Task(title="Report")
+    with QueryCounter(db_session.get_bind()) as counter:
+        task.tags = cache.get_tags(db_session, ["work", "work"])
+        db_session.add(task)
+        db_session.commit()
+    assert not any(
+        statement.lstrip().upper().startswith("SELECT")
+        for statement in counter.statements
+    )
+
+    db_session.expire_all()
+    assert [tag.name for tag in db_session.get(Task, task.id).tags] == ["work"]
+    assert db_session.query(Tag).count() == 1
+
+
+def test_invalidate(db_session: Session) -> None:
+    """Test dropping renamed tags from the cache."""
+    tag = Tag(name="work")
+    db_session.add(tag)
+    db_session.commit()
+    cache = TagCache()
+    cache.warm(db_session)
+
+    tag.name = "office"
+    db_session.commit()
+    cache.invalidate(db_session, "work")
+
+    new_id = cache.resolve(db_session, ["work"])["work"]
+    db_session.commit()
+    assert new_id != tag.id
@@ -0,0 +1,115 @@
+"""Tests for the tag posting index."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Tag, Task
+from kairix_todo.utils.tag_index import LOG_TABLE, TagIndex, bit_positions
+
+
+def _rowids(db_session: Session, *tasks: Task) -> list:
+    ids = {task.id for task in tasks}
+    rows = db_session.execute(text("SELECT rowid, id FROM tasks")).all()
+    return sorted(rowid for rowid, task_id in rows if task_id in ids)
+
+
+@pytest.fixture
+def tagged(db_session: Session) -> dict:
+    work = Tag(name="work")
+    urgent = Tag(name="urgent")
+    home = Tag(name="home")
+    tasks = {
+        "report": Task(title="Report", tags=[work, urgent]),
+        "email": Task(title="Email", tags=[work]),
+        "dishes": Task(title="Dishes", tags=[home, urgent]),
+        "nap": Task(title="Nap"),
+    }
+    db_session.add_all(tasks.values())
+    db_session.commit()
+    return tasks
+
+
+def test_bit_positions() -> None:
+    """Test decoding bitmaps into sorted positions."""
+    assert bit_positions(0) == []
+    assert bit_positions(0b1011) == [0, 1, 3]
+    assert bit_positions(1 << 200 | 1 << 9) == [9, 200]
+
+
+def test_and_or_lookups(db_session: Session, tagged: dict) -> None:
+    """Test intersections and unions of tag postings."""
+    index = TagIndex()
+
+    assert index.matching_rowids(db_session, ["work", "urgent"]) == _rowids(
+        db_session, tagged["report"]
+    )
+    assert index.matching_rowids(db_session, ["work", "home"], "or") == _rowids(
+        db_session, tagged["report"], tagged["email"], tagged["dishes"]
+    )
+    assert index.matching_rowids(db_session, ["work", "missing"]) == []
+    assert index.matching_rowids(db_session, ["home", "missing"], "OR") == _rowids(
+        db_session, tagged["dishes"]
+    )
+
+    with pytest.raises(ValueError):
+        index.matching_rowids(db_session, ["work"], "XOR")
+
+
+def test_index_follows_changes(db_session: Session, tagged: dict) -> None:
+    """Test that tag edits, task deletion and tag renames are picked up."""
+    index = TagIndex()
+    assert index.matching_rowids(db_session, ["home"]) == _rowids(
+        db_session, tagged["dishes"]
+    )
+
+    nap = tagged["nap"]
+    nap.tags = db_session.query(Tag).filter(Tag.name == "home").all()
+    db_session.commit()
+    assert index.matching_rowids(db_session, ["home"]) == _rowids(
+        db_session, tagged["dishes"], nap
+    )
+
+    db_session.delete(tagged["dishes"])
+    db_session.commit()
+    assert index.matching_rowids(db_session, ["home"]) == _rowids(db_session, nap)
+    assert index.matching_rowids(db_session, ["urgent"]) == _rowids(
+        db_session, tagged["report"]
+    )
+
+    db_session.query(Tag).filter(Tag.name == "home").one().name = "house"
+    db_session.commit()
+    assert index.matching_rowids(db_session, ["home"]) == []
+    assert index.matching_rowids(db_session, ["house"]) == _rowids(db_session, nap)
+
+
+def test_index_rebuilds_after_log_pruned(db_session: Session, tagged: dict) -> None:
+    """Test that an index that missed pruned log entries rebuilds itself."""
+    index = TagIndex()
+    index.matching_rowids(db_session, ["work"])
+
+    tagged["nap"].tags = db_session.query(Tag).filter(Tag.name == "work").all()
+    tagged["dishes"].tags = []
+    db_session.commit()
+    db_session.execute(
+        text(f"DELETE FROM {LOG_TABLE} WHERE seq < (SELECT max(seq) FROM {LOG_TABLE})")
+    )
+    db_session.commit()
+
+    assert index.matching_rowids(db_session, ["work"]) == _rowids(
+        db_session, tagged["report"], tagged["email"], tagged["nap"]
+    )
+    assert index.matching_rowids(db_session, ["urgent"]) == _rowids(
+        db_session, tagged["report"]
+    )
+
+
+def test_index_skipped_with_uncommitted_writes(
+    db_session: Session, tagged: dict
+) -> None:
+    """Test that the index does not answer for sessions with pending writes."""
+    index = TagIndex()
+    db_session.add(Task(title="Pending", tags=[Tag(name="draft")]))
+    db_session.flush()
+
+    assert index.matching_rowids(db_session, ["draft"]) is None
@@ -0,0 +1,129 @@
+"""Tests for streaming export and import."""
+
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Base, Reminder, Tag, Task
+from kairix_todo.utils.archive import archive_completed
+from kairix_todo.utils.query_counter import QueryCounter
+from kairix_todo.utils.transfer import (
+    CSV_FORMAT,
+    JSONL_FORMAT,
+    encode_records,
+    export_records,
+    import_records,
+    read_records,
+)
+from kairix_todo.utils.writer import InlineWriter
+
+
+def _seed(session: Session) -> None:
+    done = Task(title="Filed taxes", completed=True, tags=[Tag(name="home")])
+    done.completed_at = datetime(2020, 4, 1, 12, 0)
+    session.add(done)
+    task = Task(
+        title='Write, then "review"',
+        additional_details="Line one\nline two",
+        tags=[Tag(name="work"), Tag(name="urgent")],
+    )
+    task.reminders.append(Reminder(remind_at=datetime(2025, 1, 2, 9, 0)))
+    session.add(task)
+    session.commit()
+
+
+def _export(session: Session, name: str) -> bytes:
+    return b"".join(encode_records(export_records(session), name))
+
+
+@pytest.mark.parametrize("name", [JSONL_FORMAT, CSV_FORMAT])
+def test_round_trip(db_session: Session, tmp_path, name: str) -> None:
+    """Test an export imports into an empty database as the same records."""
+    _seed(db_session)
+    archive_completed(InlineWriter(db_session), 30)
+    data = _export(db_session, name)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'copy.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        report = import_records(
+            InlineWriter(session), read_records(io.BytesIO(data), name)
+        )
+        assert report == {"imported": 2, "skipped": 0, "rejected": 0, "errors": []}
+        # Archived tasks come back as live ones
+        copied = sorted(export_records(session), key=lambda record: record["id"])
+        original = sorted(export_records(db_session), key=lambda record: record["id"])
+        assert copied == original
+        assert len(original) == 2
+
+        # Running the same import again adds nothing
+        report = import_records(
+            InlineWriter(session), read_records(io.BytesIO(data), name)
+        )
+        assert report["imported"] == 0
+        assert report["skipped"] == 2
+    engine.dispose()
+
+
+def test_export_batches(db_session: Session) -> None:
+    """Test tags and reminders are fetched once per batch, not per task."""
+    db_session.add_all(
+        [Task(title=f"Task {i}", tags=[Tag(name=f"tag {i}")]) for i in range(10)]
+    )
+    db_session.commit()
+
+    with QueryCounter(db_session.get_bind()) as counter:
+        records = list(export_records(db_session, include_archived=False, batch_size=4))
+    assert len(records) == 10
+    assert records[3]["tags"] == ["tag 3"]
+    # One task query, then a tag and a reminder query for each of 3 batches
+    assert counter.count == 1 + 3 * 2
+
+
+def test_import_rejects_invalid_records(db_session: Session) -> None:
+    """Test invalid records are reported by line and the rest imported."""
+    lines = [
+        json.dumps({"title": "Valid", "tags": ["work"]}),
+        "",
+        "{not json",
+        json.dumps({"title": ""}),
+        json.dumps({"title": "Bad reminder", "reminders": [{"completed": True}]}),
+        json.dumps({"title": "Bad date", "created_at": "yesterday"}),
+    ]
+    data = "\n".join(lines).encode()
+
+    report = import_records(
+        InlineWriter(db_session), read_records(io.BytesIO(data), JSONL_FORMAT)
+    )
+    assert report["imported"] == 1
+    assert report["rejected"] == 4
+    assert [error["line"] for error in report["errors"]] == [3, 4, 5, 6]
+    assert db_session.execute(select(func.count()).select_from(Task)).scalar() == 1
+
+
+def test_import_csv_cells(db_session: Session) -> None:
+    """Test CSV cells are converted and empty cells left out."""
+    data = (
+        "title,completed,due_date,tags,reminders\n"
+        'Report,true,2025-03-01,"[""work""]",\n'
+        "Dishes,,,,\n"
+        "Broken,maybe,,,\n"
+    ).encode()
+
+    report = import_records(
+        InlineWriter(db_session), read_records(io.BytesIO(data), CSV_FORMAT)
+    )
+    assert report["imported"] == 2
+    assert report["errors"] == [
+        {"line": 4, "error": "completed must be true or false."}
+    ]
+    report_task = db_session.execute(
+        select(Task).where(Task.title == "Report")
+    ).scalar()
+    assert report_task.completed
+    assert report_task.completed_at is not None
+    assert [tag.name for tag in report_task.tags] == ["work"]
@@ -0,0 +1,109 @@
+"""Tests for row and collection version counters."""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from kairix_todo.models import Reminder, Tag, Task
+from kairix_todo.utils.versioning import (
+    TAGS_COLLECTION,
+    TASKS_COLLECTION,
+    collection_version,
+    install_versioning,
+    row_version,
+)
+
+
+def _task_version(db_session: Session, task: Task) -> int:
+    return row_version(db_session, Task, task.id)
+
+
+def test_task_changes_bump_versions(db_session: Session) -> None:
+    """Test that task writes bump the row and the collection version."""
+    start = collection_version(db_session, TASKS_COLLECTION)
+    task = Task(title="Write report")
+    db_session.add(task)
+    db_session.commit()
+
+    assert _task_version(db_session, task) == 1
+    assert collection_version(db_session, TASKS_COLLECTION) == start + 1
+
+    task.completed = True
+    db_session.commit()
+    assert _task_version(db_session, task) == 2
+    assert collection_version(db_session, TASKS_COLLECTION) == start + 2
+
+    db_session.delete(task)
+    db_session.commit()
+    assert row_version(db_session, Task, task.id) is None
+    assert collection_version(db_session, TASKS_COLLECTION) == start + 3
+
+
+def test_related_changes_bump_task_version(db_session: Session) -> None:
+    """Test that tag and reminder changes move the owning task's version."""
+    tag = Tag(name="work")
+    task = Task(title="Write report")
+    db_session.add(task)
+    db_session.commit()
+    version = _task_version(db_session, task)
+
+    task.tags.append(tag)
+    db_session.commit()
+    assert _task_version(db_session, task) == version + 1
+
+    tag.name = "office"
+    db_session.commit()
+    assert _task_version(db_session, task) == version + 2
+    assert row_version(db_session, Tag, tag.id) == 2
+
+    reminder = Reminder(task_id=task.id, remind_at=datetime(2025, 1, 1))
+    db_session.add(reminder)
+    db_session.commit()
+    assert _task_version(db_session, task) == version + 3
+
+    reminder.completed = True
+    db_session.commit()
+    assert _task_version(db_session, task) == version + 4
+    assert row_version(db_session, Reminder, reminder.id) == 2
+
+
+def test_tag_changes_bump_tags_collection(db_session: Session) -> None:
+    """Test that the tags collection version follows tag writes only."""
+    start = collection_version(db_session, TAGS_COLLECTION)
+    db_session.add(Tag(name="work"))
+    db_session.commit()
+    assert collection_version(db_session, TAGS_COLLECTION) == start + 1
+
+    db_session.add(Task(title="Untagged"))
+    db_session.commit()
+    assert collection_version(db_session, TAGS_COLLECTION) == start + 1
+
+
+def test_install_on_existing_database() -> None:
+    """Test that tables created before versioning get a version column."""
+    engine = create_engine("sqlite:///:memory:")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE tasks (id VARCHAR PRIMARY KEY)")
+        connection.exec_driver_sql("CREATE TABLE tags (id VARCHAR PRIMARY KEY)")
+        connection.exec_driver_sql(
+            "CREATE TABLE task_tags (task_id VARCHAR, tag_id VARCHAR)"
+        )
+        connection.exec_driver_sql(
+            "CREATE TABLE reminders (id VARCHAR PRIMARY KEY, task_id VARCHAR)"
+        )
+        connection.exec_driver_sql("INSERT INTO tasks (id) VALUES ('old')")
+
+        install_versioning(connection)
+        # A second run is a no-op
+        install_versioning(connection)
+
+        assert (
+            connection.execute(
+                text("SELECT version FROM tasks WHERE id = 'old'")
+            ).scalar()
+            == 1
+        )
+        connection.exec_driver_sql("UPDATE tasks SET id = 'renamed'")
+        assert connection.execute(text("SELECT version FROM tasks")).scalar() == 2
+    engine.dispose()
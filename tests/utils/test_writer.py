@@ -0,0 +1,174 @@
+"""Tests for serialized database writes."""
+
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+from werkzeug.exceptions import NotFound
+
+from kairix_todo.models import Base, Tag, Task
+from kairix_todo.utils.storage import apply_storage_profile
+from kairix_todo.utils.tag_cache import TagCache
+from kairix_todo.utils.writer import (
+    GroupCommitWriter,
+    InlineWriter,
+    SerializedWriter,
+    create_writer,
+    read_only_engine,
+)
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Create a file database with the schema and return its URI."""
+    uri = f"sqlite:///{tmp_path / 'tasks.db'}"
+    engine = create_engine(uri)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return uri
+
+
+def _count_tasks(session) -> int:
+    return session.scalar(select(func.count()).select_from(Task))
+
+
+def test_serialized_writer_concurrent_writes(database) -> None:
+    """Test that writes from many threads all land without lock errors."""
+    engine = create_engine(database)
+    apply_storage_profile(engine, "default")
+    writer = SerializedWriter(engine)
+    errors = []
+
+    def create(index: int) -> None:
+        for n in range(25):
+            try:
+                writer.run(lambda session: session.add(Task(title=f"{index}-{n}")))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=create, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert writer.run(_count_tasks) == 200
+    writer.stop()
+    engine.dispose()
+
+
+def test_serialized_writer_propagates_errors(database) -> None:
+    """Test that a failing write is rolled back and re-raised to the caller."""
+    engine = create_engine(database)
+    writer = SerializedWriter(engine)
+
+    def fail(session):
+        session.add(Task(title="never stored"))
+        session.flush()
+        raise NotFound()
+
+    with pytest.raises(NotFound):
+        writer.run(fail)
+    assert writer.run(_count_tasks) == 0
+
+    # The writer keeps serving after an error
+    task_id = writer.run(lambda session: _add_task(session, "kept"))
+    assert task_id is not None
+
+    writer.stop()
+    with pytest.raises(RuntimeError):
+        writer.run(_count_tasks)
+    engine.dispose()
+
+
+def _add_task(session, title: str) -> str:
+    task = Task(title=title)
+    session.add(task)
+    session.commit()
+    return task.id
+
+
+def _run_together(writer, functions):
+    """Submit write functions from one thread each and collect the outcomes."""
+    outcomes = [None] * len(functions)
+
+    def submit(index: int) -> None:
+        try:
+            outcomes[index] = writer.run(functions[index])
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [
+        threading.Thread(target=submit, args=(i,)) for i in range(len(functions))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_group_commit_writer(database) -> None:
+    """Test that concurrent writes share commits and fail independently."""
+    engine = create_engine(database)
+    writer = GroupCommitWriter(engine, window=0.2)
+    tag_cache = TagCache()
+    commits = []
+
+    def count_commit(session) -> None:
+        # Releasing a savepoint fires after_commit as well
+        if not session.in_nested_transaction():
+            commits.append(session)
+
+    def create(title: str):
+        return lambda session: _add_task(session, title)
+
+    def fail(session):
+        tag_cache.resolve(session, ["orphan"])
+        session.add(Task(title="rolled back"))
+        session.commit()
+        raise NotFound()
+
+    event.listen(Session, "after_commit", count_commit)
+    try:
+        outcomes = _run_together(writer, [create("a"), fail, create("b"), create("c")])
+    finally:
+        event.remove(Session, "after_commit", count_commit)
+
+    assert isinstance(outcomes[1], NotFound)
+    assert all(isinstance(outcome, str) for i, outcome in enumerate(outcomes) if i != 1)
+    assert len(commits) < 4
+    assert writer.run(_count_tasks) == 3
+    assert writer.run(lambda session: session.scalar(select(Tag.id))) is None
+    assert tag_cache.stats()["size"] == 0
+
+    writer.stop()
+    engine.dispose()
+
+
+def test_read_only_engine_refuses_writes(database) -> None:
+    """Test that sessions on a read-only engine can read but not write."""
+    engine = read_only_engine(create_engine(database))
+    session = sessionmaker(bind=engine)()
+
+    assert _count_tasks(session) == 0
+    session.add(Task(title="blocked"))
+    with pytest.raises(OperationalError):
+        session.commit()
+    session.close()
+    engine.dispose()
+
+
+def test_inline_writer(db_session) -> None:
+    """Test that inline writes commit what the function leaves pending."""
+    writer = InlineWriter(db_session)
+
+    writer.run(lambda session: session.add(Task(title="inline")))
+    db_session.rollback()
+    assert _count_tasks(db_session) == 1
+
+    with pytest.raises(ValueError):
+        writer.run(lambda session: create_writer("turbo", None, session))